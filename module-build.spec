@@ -46,6 +46,8 @@ A library and a cli tool for building module streams.
 %{python3_sitelib}/module_build/
 %{python3_sitelib}/module_build-*.egg-info/
 %{_bindir}/module-build
+%{_bindir}/module-build-agent
+%{_bindir}/module-build-daemon
 
 
 %changelog
@@ -1,33 +1,90 @@
 import copy
+import glob
+import hashlib
+import json
 import os
 import shutil
 import subprocess
+import tempfile
+import threading
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from multiprocessing import Manager, Pool
 from pathlib import Path
 from sys import stdout
-from time import sleep
+from time import monotonic, sleep
 
 import mockbuild.config
-from module_build.constants import SRPM_EXTENSION
-from module_build.log import logger
-from module_build.metadata import (generate_and_populate_output_mmd,
+from module_build.buildorder import (derive_buildorder,
+                                     find_relaxed_components,
+                                     get_rpm_provides, get_srpm_buildrequires)
+from module_build.cache import BuildCache, get_file_digest
+from module_build.constants import (BATCH_MODULE_NAME, BATCH_MODULE_STREAM,
+                                    COMBINED_REPO_FOLDER,
+                                    CREATEREPO_INTERMEDIATE_OPTIONS,
+                                    DERIVED_BUILDORDER_FILENAME,
+                                    DURATION_FILENAME,
+                                    MOCK_CONFIG_OPTIONS, PLAN_DEFAULT_DURATION,
+                                    REPOS_METADATA_FOLDER, ROOT_BATCH_FOLDER,
+                                    SCM_SRPM_FOLDER, SRPM_EXTENSION,
+                                    TMPFS_BASE_SIZE_MB, TMPFS_SRPM_SIZE_FACTOR,
+                                    WORKERS_AUTO)
+from module_build.depcheck import (BuildRequiresResolver, check_batches,
+                                   get_srpm_buildrequires_deps)
+from module_build.log import bind_build_context, logger
+from module_build.metadata import (create_module_index,
+                                   generate_and_populate_output_mmd,
                                    generate_module_stream_version, mmd_to_str)
-from module_build.mock.config import MockConfig
+from module_build.mock.config import MockConfig, get_config_files
 from module_build.mock.info import MockBuildInfo
+from module_build.mock.repos import download_repos_metadata
+from module_build.mock.resources import MockBuildResources, get_auto_workers
 from module_build.modulemd import Modulemd
+from module_build.plan import estimate_context
+from module_build.remote.pool import RemoteBuildPool
+from module_build.remote.server import RepoServer
 
 
 class MockBuilder:
     # TODO enable building only specific contexts
     # TODO enable multiprocess queues for component building.
-    def __init__(self, mock_cfg_path, workdir, external_repos, rootdir, srpm_dir, workers):
+    def __init__(self, mock_cfg_path, workdir, external_repos, rootdir, srpm_dir, workers, tmpfs_size=None, remote_workers=None,
+                 serve_address=None, cache=None, process_pool=None, combined_repo=False, derive_buildorder=False,
+                 check_buildrequires=False, shared_srpms=False):
         self.states = ["init", "building", "failed", "finished"]
         self.workdir = workdir
         self.mock_cfg_path = mock_cfg_path
         self.external_repos = external_repos
         self.rootdir = rootdir
+        # the buildroots are spread over all provided rootdirs
+        self.rootdirs = [rootdir] if isinstance(rootdir, str) else list(rootdir or [])
         self.workers = workers
+        self.tmpfs_size = tmpfs_size
+        self.srpm_dir = srpm_dir
+        # URLs of the agents which run the buildroots on remote hosts
+        self.remote_workers = remote_workers or []
+        self.serve_address = serve_address
+        self.repo_server = None
+        self.cache = cache or BuildCache()
+        # a long living `multiprocessing.Pool`, `Manager` and `MockBuildResources` shared with other builds
+        self.process_pool = process_pool
+        # the final repos of all built contexts are combined into one repo at the end of the build
+        self.combined_repo = combined_repo
+        # the buildorder is derived from the BuildRequires of the SRPMs instead of the modulemd
+        self.derive_buildorder = derive_buildorder
+        self.derived_buildorder = None
+        # the BuildRequires of all the components are checked before the build starts
+        self.check_buildrequires = check_buildrequires
+        # the pools add the artifacts to the final repo from their own threads
+        self.final_repo_lock = threading.Lock()
+        # the SRPMs are built from SCM once before the contexts instead of by every buildroot
+        self.shared_srpms = shared_srpms
+        # SRPMs built from SCM by `_build_scm_srpms` by the names and refs of the components
+        self.scm_srpms = {}
+        self.scm_srpms_lock = threading.Lock()
+        # the SRPMs built from SCM are used also by the builders of other architectures
+        self.share_scm_srpms = False
 
         self.mock_info = MockBuildInfo()
 
@@ -35,25 +92,276 @@ class MockBuilder:
         if srpm_dir:
             self._map_srpm_files(srpm_dir)
 
-    def build(self, module_stream, resume, context_to_build=None):
+    def build(self, module_stream, resume, context_to_build=None, rebuild=None):
+        # the remote agents download the batch repos, external repos and SRPMs from us
+        if self.remote_workers:
+            self.repo_server = RepoServer([self.workdir, self.srpm_dir] + self.external_repos, self.serve_address)
+            self.repo_server.start()
+
+        try:
+            self._build_module_stream(module_stream, resume, context_to_build, rebuild)
+        finally:
+            if self.repo_server:
+                self.repo_server.stop()
+                self.repo_server = None
+
+        if self.combined_repo:
+            self.create_combined_repo()
+
+    def _build_module_stream(self, module_stream, resume, context_to_build, rebuild=None):
         # first we must process the metadata provided by the module stream
         # components need to be organized to `build_batches`
         logger.info("Processing buildorder of the module stream.")
-        self.create_build_contexts(module_stream)
+        self.create_build_contexts(module_stream, resume)
 
         if context_to_build:
             if context_to_build not in self.build_contexts:
                 raise Exception("The '{context}' does not exists in this module stream!".format(context=context_to_build))
 
+        if self.derive_buildorder:
+            self._save_derived_buildorder(module_stream)
+
         if resume:
             msg = "------------- Resuming Module Build --------------"
             logger.info(msg)
             self.find_and_set_resume_point()
 
+        if rebuild:
+            msg = "------------- Rebuilding Components --------------"
+            logger.info(msg)
+            self.prepare_rebuild(module_stream, rebuild, context_to_build)
+            # the reused batches and components are skipped the same way as on resume
+            resume = True
+
+        if self.shared_srpms:
+            # the builders of all architectures share the SRPMs, those are discarded by `MultiArchBuilder`
+            if rebuild and not self.share_scm_srpms:
+                self.discard_scm_srpms(module_stream, rebuild)
+            self._build_scm_srpms(module_stream, resume, context_to_build)
+
         # Check if every component got SRPM if SRPM is enabled
-        if self.mock_info.srpms_enabled():
+        if self.srpm_dir and self.mock_info.srpms_enabled():
             self._precheck_rpm_mapping(context_to_build)
 
+            if self.check_buildrequires:
+                self._precheck_buildrequires(module_stream.version, context_to_build)
+
+        # a finished context is finalized in the background while the next context is building.
+        # The build finishes only after all its contexts are finalized.
+        with ThreadPoolExecutor() as finalizer:
+            finalizations = self._build_contexts(module_stream, resume, context_to_build, finalizer)
+
+        for finalization in finalizations:
+            finalization.result()
+
+    def _build_scm_srpms(self, module_stream, resume, context_to_build):
+        """Builds the SRPMs of the components from SCM in parallel before the contexts are built.
+        The SRPM of every name and ref is built only once and it is used by the buildroots of
+        all contexts. Nothing is built when every component is built only by one buildroot and
+        the SRPMs are not shared with other architectures.
+
+        :param module_stream: module stream to build
+        :type module_stream: ModuleStream
+        :param resume: resume the previous build
+        :type resume: bool
+        :param context_to_build: the only context which is built, all contexts when None
+        :type context_to_build: str
+        """
+        builds = OrderedDict()
+
+        for context_name, build_context in self.build_contexts.items():
+            if context_to_build and context_to_build != context_name:
+                continue
+
+            if build_context["status"]["state"] == self.states[3] and resume:
+                continue
+
+            for position in sorted(build_context["build_batches"]):
+                batch = build_context["build_batches"][position]
+
+                if batch["batch_state"] == self.states[3] and resume:
+                    continue
+
+                for index, component in enumerate(batch["components"]):
+                    if (batch["curr_comp"] > index and resume) or component["name"] in batch["reused_components"]:
+                        continue
+
+                    builds.setdefault((component["name"], component["ref"]), []).append((component, context_name))
+
+        if not self.share_scm_srpms and all(len(b) < 2 for b in builds.values()):
+            return
+
+        srpms_dir = self._get_scm_srpms_dir(module_stream)
+
+        # the builders of all architectures share the SRPMs, the first one builds them
+        with self.scm_srpms_lock:
+            missing = [key for key in builds if key not in self.scm_srpms]
+
+            if missing:
+                msg = "------------- Building {num} SRPMs --------------".format(num=len(missing))
+                logger.info(msg)
+
+                workers = self.workers if self.workers != WORKERS_AUTO else get_auto_workers(len(missing), self.rootdirs)
+                with ThreadPoolExecutor(workers) as executor:
+                    futures = []
+                    for index, key in enumerate(missing):
+                        component, context_name = builds[key][0]
+                        rootdir = self.rootdirs[index % len(self.rootdirs)] if self.rootdirs else None
+                        futures.append(executor.submit(
+                            bind_build_context(self._build_scm_srpm), component, context_name, srpms_dir, module_stream.version, rootdir
+                        ))
+
+                failed = []
+                for key, future in zip(missing, futures):
+                    try:
+                        self.scm_srpms[key] = future.result()
+                    except Exception as e:
+                        logger.error(str(e))
+                        failed.append(key[0])
+
+                if failed:
+                    raise Exception("Building of the SRPMs of the components {names} failed!".format(names=failed))
+
+            for name, ref in builds:
+                srpm_path = self.scm_srpms[(name, ref)]
+                old_path = self.mock_info.get_srpm_path(name)
+
+                # the SRPM of a previous ref of the component is replaced
+                if old_path != srpm_path:
+                    if old_path:
+                        self.mock_info.remove_srpm(old_path)
+                    self.mock_info.add_srpm(name, srpm_path)
+
+    def discard_scm_srpms(self, module_stream, names):
+        """Discards the SRPMs built from SCM of components, so they are built again from the
+        current state of their refs. It is used for the components which are rebuilt.
+
+        :param module_stream: module stream which is built
+        :type module_stream: ModuleStream
+        :param names: names of the components
+        :type names: list
+        """
+        srpms_dir = self._get_scm_srpms_dir(module_stream)
+
+        with self.scm_srpms_lock:
+            for component in module_stream.components:
+                if component["name"] not in names:
+                    continue
+
+                srpm_path = self.scm_srpms.pop((component["name"], component["ref"]), None)
+                # the buildroots must not get the SRPM when it is not built again before them
+                if srpm_path:
+                    self.mock_info.remove_srpm(srpm_path)
+
+                result_dir_path = self._get_scm_srpm_result_dir(srpms_dir, component)
+
+                if os.path.isdir(result_dir_path):
+                    msg = "Discarding the SRPM of component '{name}' built from SCM...".format(name=component["name"])
+                    logger.info(msg)
+                    shutil.rmtree(result_dir_path)
+
+    def _get_scm_srpms_dir(self, module_stream):
+        return os.path.join(self.workdir, SCM_SRPM_FOLDER, "{name}:{stream}:{version}".format(
+            name=module_stream.name, stream=module_stream.stream, version=module_stream.version
+        ))
+
+    def _get_scm_srpm_result_dir(self, srpms_dir, component):
+        return os.path.join(srpms_dir, "{name}-{ref}".format(name=component["name"], ref=component["ref"].replace("/", "_")))
+
+    def _build_scm_srpm(self, component, context_name, srpms_dir, version, rootdir=None):
+        """Builds the SRPM of a component from SCM with mock. A SRPM which was already built
+        by a previous build of the module stream version is reused.
+
+        :param component: component metadata
+        :type component: dict
+        :param context_name: context which provides the modules of the buildroot
+        :type context_name: str
+        :param srpms_dir: dir where the result dirs of the SRPM builds are created
+        :type srpms_dir: str
+        :param version: version of the module stream
+        :type version: int
+        :param rootdir: dir where mock creates the buildroot
+        :type rootdir: str
+        :return: path to the SRPM
+        :rtype: str
+        """
+        result_dir_path = self._get_scm_srpm_result_dir(srpms_dir, component)
+        srpm_paths = [os.path.realpath(p) for p in glob.glob(os.path.join(result_dir_path, "*." + SRPM_EXTENSION))]
+
+        if srpm_paths and os.path.isfile(os.path.join(result_dir_path, "finished")):
+            msg = "Reusing the SRPM of component '{name}': {path}".format(name=component["name"], path=srpm_paths[0])
+            logger.info(msg)
+            return srpm_paths[0]
+
+        shutil.rmtree(result_dir_path, ignore_errors=True)
+        os.makedirs(result_dir_path)
+
+        context = self.build_contexts[context_name]
+        mock_config = MockConfig(self.mock_cfg_path)
+        mock_config.enable_mbs("distgit", component["name"], component["ref"])
+        mock_config.enable_package_cache()
+        mock_config.enable_modules(context["modular_deps"]["buildtime"])
+        mock_config.enable_modules(context["srpm_buildroot_profiles"], True)
+        mock_config.add_macros(context["rpm_macros"])
+        mock_cfg_path = mock_config.write_config(result_dir_path, component["name"])
+        # the chroot must not collide with the SRPM builds of other module streams
+        unique_ext = "srpm-{name}-{version}".format(name=component["name"], version=version)
+
+        mock_cmd = [
+            "mock",
+            "-v",
+            "-r",
+            mock_cfg_path,
+            "--resultdir={result_dir_path}".format(result_dir_path=result_dir_path),
+            "--buildsrpm",
+            "--uniqueext={unique_ext}".format(unique_ext=unique_ext),
+        ]
+
+        for repo in self.external_repos:
+            mock_cmd.append("--addrepo=file://{repo}".format(repo=repo))
+
+        if rootdir:
+            chroot = "{root}-{unique_ext}".format(root=mock_config.get_root_name(), unique_ext=unique_ext)
+            mock_cmd.append("--rootdir={rootdir}".format(rootdir=os.path.join(rootdir, chroot)))
+
+        msg = "Building the SRPM of component '{name}' with command:\n{cmd}".format(name=component["name"], cmd=mock_cmd)
+        logger.info(msg)
+        stdout_log_file_path = os.path.join(result_dir_path, "mock_stdout.log")
+
+        with open(stdout_log_file_path, "w") as f:
+            returncode = subprocess.call(mock_cmd, stdout=f, stderr=f)
+
+        srpm_paths = [os.path.realpath(p) for p in glob.glob(os.path.join(result_dir_path, "*." + SRPM_EXTENSION))]
+        if returncode != 0 or not srpm_paths:
+            raise RuntimeError("Building of the SRPM of component '{name}' failed, see: {path}".format(
+                name=component["name"], path=stdout_log_file_path
+            ))
+
+        with open(os.path.join(result_dir_path, "finished"), "w") as f:
+            f.write("finished")
+
+        msg = "Built the SRPM of component '{name}': {path}".format(name=component["name"], path=srpm_paths[0])
+        logger.info(msg)
+
+        return srpm_paths[0]
+
+    def _build_contexts(self, module_stream, resume, context_to_build, finalizer):
+        """Builds the contexts of the module stream. The finalization of every built context is
+        submitted to the finalizer.
+
+        :param module_stream: module stream to build
+        :type module_stream: ModuleStream
+        :param resume: resume the previous build
+        :type resume: bool
+        :param context_to_build: the only context which is built, all contexts when None
+        :type context_to_build: str
+        :param finalizer: executor which finalizes the built contexts
+        :type finalizer: concurrent.futures.Executor
+        :return: futures of the finalizations
+        :rtype: list
+        """
+        finalizations = []
+
         # when the metadata processing is done, we can ge to the building of the defined `contexts`
         for context_name, build_context in self.build_contexts.items():
             # check if there is a specified context to be build and if the current context is the
@@ -85,7 +393,7 @@ class MockBuilder:
                 os.makedirs(batch_repo_path)
                 msg = "Initializing batch repo for the first time..."
                 logger.info(msg)
-                self.call_createrepo_c_on_dir(batch_repo_path)
+                self.call_createrepo_c_on_dir(batch_repo_path, intermediate=True)
 
             sorted_batches = sorted(build_context["build_batches"])
             # the keys in `build_context["build_batches"]` represent the `buildorder` of the context
@@ -113,7 +421,18 @@ class MockBuilder:
 
                 # Setup Pool queue for Buildroots. This needs to be setup every time we start new batch because
                 # old Pool cannot be reused. Setting up workers is expensive but amount of batches shoould be low.
-                self.pool = self._create_workers_pool(self.workers) if self.workers > 1 else None
+                num_jobs = len(batch["components"]) - len(batch["reused_components"]) - (batch["curr_comp"] if resume else 0)
+                workers = self._get_batch_workers(num_jobs)
+                if workers > 1 or self.remote_workers or self.process_pool:
+                    self.pool = self._create_workers_pool(
+                        workers,
+                        num_jobs,
+                        partial(self._add_artifacts_to_final_repo, context_name),
+                        name="batch {num} of {nsvca}".format(num=position, nsvca=build_context["nsvca"]),
+                    )
+                else:
+                    self.pool = None
+                    resources = MockBuildResources(1, num_jobs)
 
                 for index, component in enumerate(batch["components"]):
 
@@ -124,6 +443,13 @@ class MockBuilder:
                         logger.info(msg)
                         continue
 
+                    if component["name"] in batch["reused_components"]:
+                        msg = ("The component '{name}' of batch number '{num}' of context '{context}' is not rebuilt. Skipping...").format(
+                            name=component["name"], num=position, context=context_name
+                        )
+                        logger.info(msg)
+                        continue
+
                     if self.mock_info.srpms_enabled():
                         srpm_path = self.mock_info.get_srpm_path(component["name"], component["ref"])
                         logger.info(f"Found SRPM for: {component['name']}")
@@ -159,7 +485,7 @@ class MockBuilder:
                             build_context["rpm_suffix"],
                             batch_repo,
                             self.external_repos,
-                            self.rootdir,
+                            self.rootdirs,
                             srpm_path,
                         )
                     else:
@@ -172,15 +498,18 @@ class MockBuilder:
                             build_context["rpm_suffix"],
                             batch_repo,
                             self.external_repos,
-                            self.rootdir,
+                            self.rootdirs,
                             srpm_path,
+                            resources=resources,
                         )
 
                         buildroot.run()
 
                         # In Pool mode to avoid compilications with shared memory
                         # aritifacts are returned after successfoul build in separated process.
-                        batch["finished_builds"] += buildroot.get_artifacts()
+                        artifacts = buildroot.get_artifacts()
+                        batch["finished_builds"] += artifacts
+                        self._add_artifacts_to_final_repo(context_name, artifacts)
 
                         # Using Pool mode, BUILDING status will be assigned not when task is selected from the pool
                         # but when it's added to pool.
@@ -193,7 +522,8 @@ class MockBuilder:
                 if self.pool:
                     self.pool.wait()
                     build_context["status"]["num_finished_comps"] = int(self.pool.finished_tasks)
-                    batch["finished_builds"] = list(self.pool.artifacts)
+                    # the artifacts of the reused components are already in the list
+                    batch["finished_builds"] += list(self.pool.artifacts)
 
                     if self.pool.failed:
                         raise Exception("Some components failed during build process. Please investigate.")
@@ -206,12 +536,127 @@ class MockBuilder:
                 build_context["build_batches"][position]["batch_state"] = self.states[3]
 
             build_context["status"]["state"] = self.states[3]
-            self.finalize_build_context(context_name)
+            finalizations.append(finalizer.submit(bind_build_context(self.finalize_build_context), context_name))
+
+        return finalizations
+
+    def create_build_plan(self, module_stream, context_to_build=None):
+        """Creates the build plan of a module stream without building anything. The plan
+        contains the build batches of every context, the digests of the mock configs of the
+        components and their SRPMs. The critical path and the makespan are estimated from the
+        recorded durations of previous builds of the components.
+
+        :param module_stream: a module stream object
+        :type module_stream: :class:`module_build.stream.ModuleBuild` object
+        :param context_to_build: name of the only context which should be planned
+        :type context_to_build: str
+        :return: JSON serializable build plan
+        :rtype: dict
+        """
+        self.create_build_contexts(module_stream)
+
+        if context_to_build and context_to_build not in self.build_contexts:
+            raise Exception("The '{context}' does not exists in this module stream!".format(context=context_to_build))
+
+        recorded = {}
+        for component in module_stream.components:
+            duration = self.cache.lookup("durations", self._get_duration_key(component), persistent=True)
+            if duration:
+                recorded[component["name"]] = duration["seconds"]
+
+        # components which were never built are expected to take as long as an average component
+        default_duration = sum(recorded.values()) / len(recorded) if recorded else PLAN_DEFAULT_DURATION
+
+        # with `--workers auto` the batches use at most as many workers as the host can run
+        workers = self.workers
+        if workers == WORKERS_AUTO:
+            workers = get_auto_workers(len(module_stream.components), self.rootdirs)
+
+        plan = {
+            "module_stream": "{name}:{stream}:{version}".format(name=module_stream.name, stream=module_stream.stream, version=module_stream.version),
+            "mock_cfg": {
+                "path": self.mock_cfg_path,
+                "digest": get_file_digest(*get_config_files(self.mock_cfg_path)),
+            },
+            "workers": workers,
+            "contexts": {},
+            "makespan": 0.0,
+        }
+
+        if self.derive_buildorder:
+            plan["relaxed_buildorder"] = self.derived_buildorder["relaxed"]
+
+        for context_name, build_context in self.build_contexts.items():
+            if context_to_build and context_to_build != context_name:
+                continue
+
+            batches = []
+            durations = []
+            for position in sorted(build_context["build_batches"]):
+                batch = build_context["build_batches"][position]
+                components = []
+
+                for component in batch["components"]:
+                    srpm_path = None
+                    if self.mock_info.srpms_enabled():
+                        srpm_path = self.mock_info.get_srpm_path(component["name"], component["ref"])
+
+                    mock_cfg = self.generate_and_process_mock_cfg(component, context_name, position)
+
+                    components.append({
+                        "name": component["name"],
+                        "ref": component["ref"],
+                        "srpm": str(srpm_path) if srpm_path else None,
+                        "mock_cfg_digest": mock_cfg.get_digest(),
+                        "duration": recorded.get(component["name"], default_duration),
+                        "recorded_duration": component["name"] in recorded,
+                    })
+
+                batches.append({
+                    "position": position,
+                    "modular_batch_deps": batch["modular_batch_deps"],
+                    "components": components,
+                })
+                durations.append([(c["name"], c["duration"]) for c in components])
+
+            estimate = estimate_context(durations, workers)
+            plan["contexts"][context_name] = dict(nsvca=build_context["nsvca"], batches=batches, **estimate)
+            # the contexts are built one after another
+            plan["makespan"] += estimate["makespan"]
+
+        return plan
+
+    def _get_batch_workers(self, jobs):
+        """Returns the number of buildroots which will run at the same time in a batch. With
+        `--workers auto` it is selected from the resources of the host and the size of the
+        batch, so a batch with one component is built without a pool.
+
+        :param jobs: number of components which will be built in the batch
+        :type jobs: int
+        :return: number of workers
+        :rtype: int
+        """
+        if self.workers != WORKERS_AUTO:
+            return self.workers
+
+        workers = get_auto_workers(jobs, self.rootdirs)
+        msg = "Selected {workers} workers for {jobs} components of the batch.".format(workers=workers, jobs=jobs)
+        logger.info(msg)
+
+        return workers
+
+    def _create_workers_pool(self, processess, jobs, on_finished=None, name=None):
+        if self.remote_workers:
+            logger.info(f"Creating pool with remote workers: {self.remote_workers}")
+
+            return RemoteBuildPool(self.remote_workers, self.repo_server, on_finished=on_finished)
+
+        if self.process_pool:
+            return MockBuildPool(processess, jobs, *self.process_pool, on_finished=on_finished, name=name)
 
-    def _create_workers_pool(self, processess):
         logger.info(f"Creating pool with {processess} mock workers...")
 
-        return MockBuildPool(processess)
+        return MockBuildPool(processess, jobs, on_finished=on_finished)
 
     def _map_srpm_files(self, srpm_dir):
         """
@@ -227,63 +672,102 @@ class MockBuilder:
         srpm_dir = srpm_dir if isinstance(srpm_dir, Path) else Path(srpm_dir)
 
         for file in srpm_dir.glob(f"*.{SRPM_EXTENSION}"):
-            logger.info(f"SRPM: Mapping component for '{file.name}' file")
-
-            with open(str(file.resolve()), "rb") as f:
-                # (s)RPM is 4 bytes aligned (at least) so we start reading here..
-                # We gonna keep reading until we find magic 'number' for SRPM Header
-                while (byte := f.read(4)):
-                    if byte == b"\x8e\xad\xe8\x01":
-                        break
-                # EOF, we found nothing. It's not critical so let's skip this file.
-                else:
-                    logger.warning(f"SRPM: Mapping name for: '{file.name}' failed because of unknown format?")
-                    continue
+            name = self._read_srpm_name(file)
 
-                # Now let's read package name from RPMTAG_NAME.
-                # We cannot go by offset because size is not static..
-                # but the name tag is always first so it makes things easier.
-                # There is additional counter of 2500 bytes because some major
-                # changes might accour in scheme..(unrealistically) so to avoid
-                # reading incorrect bytes we add boundary.
-                byte_c = 0
-                # We cannot combine multiple conditions with Walrus Operator
-                while (byte := f.read(4)):
-                    if byte_c == 625:
-                        byte_c = -1
-                        continue
+            if name:
+                self.mock_info.add_srpm(name, srpm_dir / file.name)
+                logger.info(f"SRPM: Found SRPM: '{file.name}' for component: '{name}'")
 
-                    byte_c += 1
-                    # This is special sequence that should be unique before first tag
-                    if byte[:2] == b"\x43\x00":
-                        break
-                else:
-                    logger.warning(f"SRPM: Mapping name for: '{file.name}' failed during searching for name, EOF.")
-                    continue
+    def _read_srpm_name(self, file):
+        """Reads the package name from the header of a SRPM file.
 
-                if byte_c == -1:
-                    logger.warning(f"SRPM: Mapping name for: '{file.name}' failed during searching for name.")
-                    continue
+        Args:
+            file (Path): Path to the SRPM file
 
-                # We found the name, let's extract it. Last 2 bytes read
-                # previously contain beginning of our name.
-                # There are no packages with len() < than 2.
-                name = bytearray(byte[-2:])
-
-                # We don't know length of the name so we read it byte by byte.
-                while (byte := f.read(1)):
-                    # That's end of the name.
-                    if byte == b"\x00":
-                        break
-                    name += bytearray(byte)
-                else:
-                    logger.warning(f"SRPM: Mapping name for: '{file.name}' failed during name reading.")
+        Returns:
+            str: Name of the package. None if the name can't be read.
+        """
+        logger.info(f"SRPM: Mapping component for '{file.name}' file")
+
+        with open(str(file.resolve()), "rb") as f:
+            # (s)RPM is 4 bytes aligned (at least) so we start reading here..
+            # We gonna keep reading until we find magic 'number' for SRPM Header
+            while (byte := f.read(4)):
+                if byte == b"\x8e\xad\xe8\x01":
+                    break
+            # EOF, we found nothing. It's not critical so let's skip this file.
+            else:
+                logger.warning(f"SRPM: Mapping name for: '{file.name}' failed because of unknown format?")
+                return None
+
+            # Now let's read package name from RPMTAG_NAME.
+            # We cannot go by offset because size is not static..
+            # but the name tag is always first so it makes things easier.
+            # There is additional counter of 2500 bytes because some major
+            # changes might accour in scheme..(unrealistically) so to avoid
+            # reading incorrect bytes we add boundary.
+            byte_c = 0
+            # We cannot combine multiple conditions with Walrus Operator
+            while (byte := f.read(4)):
+                if byte_c == 625:
+                    byte_c = -1
                     continue
 
-                # Convert to string
-                name = name.decode()
-                self.mock_info.add_srpm(name, srpm_dir / file.name)
-                logger.info(f"SRPM: Found SRPM: '{file.name}' for component: '{name}'")
+                byte_c += 1
+                # This is special sequence that should be unique before first tag
+                if byte[:2] == b"\x43\x00":
+                    break
+            else:
+                logger.warning(f"SRPM: Mapping name for: '{file.name}' failed during searching for name, EOF.")
+                return None
+
+            if byte_c == -1:
+                logger.warning(f"SRPM: Mapping name for: '{file.name}' failed during searching for name.")
+                return None
+
+            # We found the name, let's extract it. Last 2 bytes read
+            # previously contain beginning of our name.
+            # There are no packages with len() < than 2.
+            name = bytearray(byte[-2:])
+
+            # We don't know length of the name so we read it byte by byte.
+            while (byte := f.read(1)):
+                # That's end of the name.
+                if byte == b"\x00":
+                    break
+                name += bytearray(byte)
+            else:
+                logger.warning(f"SRPM: Mapping name for: '{file.name}' failed during name reading.")
+                return None
+
+            # Convert to string
+            return name.decode()
+
+    def update_srpm_mapping(self, paths):
+        """Updates the SRPM mapping after SRPM files were added, changed or removed.
+
+        Args:
+            paths (list): Paths to the changed SRPM files
+
+        Returns:
+            set: Names of the components of the changed SRPMs
+        """
+        names = set()
+
+        for path in paths:
+            name = self.mock_info.remove_srpm(path)
+            if name:
+                names.add(name)
+
+            if os.path.isfile(path):
+                name = self._read_srpm_name(Path(path))
+
+                if name:
+                    self.mock_info.add_srpm(name, Path(path))
+                    logger.info(f"SRPM: Found SRPM: '{path}' for component: '{name}'")
+                    names.add(name)
+
+        return names
 
     def _precheck_rpm_mapping(self, context_to_build):
         """Checks if all components have a proper SRPM file.
@@ -304,11 +788,80 @@ class MockBuilder:
                     if not self.mock_info.get_srpm_path(component["name"], component["ref"]):
                         raise Exception(f"Missing SRPM for {component['name']} in batch {position}")
 
+    def _precheck_buildrequires(self, version, context_to_build):
+        """Checks that the BuildRequires of every component are provided by the external repos,
+        the repos of the mock config or by the components of the earlier batches. The metadata of
+        the repos of the mock config are downloaded before the check. What the components
+        provide is read from their RPMs built by previous builds and for the components which
+        were not built yet from their packages in the repos.
+
+        :param version: version of the module stream
+        :type version: int
+        :param context_to_build: name of the context
+        :type context_to_build: str
+        """
+        logger.info("Checking the BuildRequires of the components...")
+
+        try:
+            repos = self._get_repos(version)
+        except RuntimeError as e:
+            raise Exception("The BuildRequires can't be checked, the metadata of the repos can't be downloaded:\n{error}".format(error=e))
+
+        resolver = BuildRequiresResolver(self.arch)
+        for repo in repos:
+            if not resolver.add_repo(repo):
+                raise Exception("The BuildRequires can't be checked, the metadata of the repo '{repo}' can't be loaded.".format(repo=repo))
+
+        built_rpms = self._get_built_rpms()
+        requires = {}
+
+        for build_context in self.build_contexts.values():
+            for batch in build_context["build_batches"].values():
+                for component in batch["components"]:
+                    if component["name"] in requires:
+                        continue
+
+                    resolver.add_component(component["name"], built_rpms.get(component["name"], []))
+                    srpm_path = self.mock_info.get_srpm_path(component["name"], component["ref"])
+                    requires[component["name"]] = get_srpm_buildrequires_deps(srpm_path)
+
+                    if requires[component["name"]] is None:
+                        logger.warning("The BuildRequires of '{name}' can't be read.".format(name=component["name"]))
+                        requires[component["name"]] = []
+
+        # the provides of the components found in the repos are known even when they were not built yet
+        known = set(built_rpms) | set(resolver.get_source_provides(list(requires)))
+        # the contexts share most of the BuildRequires
+        get_providers = lru_cache(maxsize=None)(resolver.get_providers)
+        unsatisfiable = []
+
+        for context_name, build_context in self.build_contexts.items():
+            if context_to_build and context_to_build != context_name:
+                continue
+
+            build_batches = build_context["build_batches"]
+            batches = [[c["name"] for c in build_batches[p]["components"]] for p in sorted(build_batches)]
+            context_unsatisfiable, unresolved = check_batches(batches, requires, get_providers, known)
+            unsatisfiable += ["{context}: {msg}".format(context=context_name, msg=m) for m in context_unsatisfiable]
+
+            if unresolved:
+                msg = "The following BuildRequires of context '{context}' can't be checked:\n{msgs}".format(
+                    context=context_name, msgs="\n".join(unresolved)
+                )
+                logger.warning(msg)
+
+        if unsatisfiable:
+            raise Exception("The following BuildRequires can't be satisfied:\n" + "\n".join(unsatisfiable))
+
+        logger.info("All the BuildRequires of the components can be satisfied.")
+
     def final_report(self):
         pass
 
     def generate_build_batches(self, components):
-        """Method which organizes components of a module stream into build batches.
+        """Method which organizes components of a module stream into build batches. Components
+        which are not built for the architecture of the builder are left out. The other components
+        keep their buildorder, so a batch without any component for the architecture is skipped.
 
         :param components: list of components
         :type components: list
@@ -318,6 +871,14 @@ class MockBuilder:
         build_batches = {}
 
         for component in components:
+            # an empty list of arches means all architectures
+            if component["arches"] and self.arch not in component["arches"]:
+                msg = "The component '{name}' is built only for {arches}. Skipping it for '{arch}'...".format(
+                    name=component["name"], arches=component["arches"], arch=self.arch
+                )
+                logger.info(msg)
+                continue
+
             position = component["buildorder"]
 
             if position not in build_batches:
@@ -328,26 +889,22 @@ class MockBuilder:
                     "batch_state": self.states[0],
                     "finished_builds": [],
                     "modular_batch_deps": [],
+                    # finished components which are not built again by `--rebuild`
+                    "reused_components": [],
                 }
 
             build_batches[position]["components"].append(component)
 
         # after we have the build batches populated we need to generate list of module streams,
-        # which will be used in the batches as modular dependencies. Each batch will serve as a
-        # module stream dependency for the next batch.
+        # which will be used in the batches as modular dependencies. All the finished batches
+        # are provided as one cumulative module stream, which is updated after every batch. This
+        # way every buildroot enables only one batch module no matter how many batches there are.
         sorted_build_batches = sorted(build_batches)
 
-        for order in sorted_build_batches:
-            index = sorted_build_batches.index(order)
-            # every batch will have the previous batch as a modular stream dependency excluding the
-            # first batch. The first batch does not have any previous batch so there will be no
-            # no modular batch dependency.
-            if index != 0:
-                # we need to find out how many batches are there previously
-                prev_batches = [b for b in sorted_build_batches[:index]]
-                # for each previous batch we add a batch modular stream dependency
-                for b in prev_batches:
-                    build_batches[order]["modular_batch_deps"].append("batch{b}:{b}".format(b=b))
+        # the first batch does not have any previous batch so there will be no modular batch
+        # dependency.
+        for order in sorted_build_batches[1:]:
+            build_batches[order]["modular_batch_deps"].append("{n}:{s}".format(n=BATCH_MODULE_NAME, s=BATCH_MODULE_STREAM))
 
         msg = "The following build batches where identified according to the buildorder:"
         logger.info(msg)
@@ -376,21 +933,196 @@ class MockBuilder:
 
         return build_batches
 
-    def create_build_contexts(self, module_stream):
+    def _get_derived_buildorder_path(self, module_stream):
+        filename = DERIVED_BUILDORDER_FILENAME.format(
+            name=module_stream.name, stream=module_stream.stream, version=module_stream.version, arch=self.arch
+        )
+
+        return os.path.join(self.workdir, filename)
+
+    def _get_built_rpms(self):
+        """Finds the binary RPMs of the components built by the previous builds in the working
+        directory.
+
+        :return: lists of the paths to the RPMs by the names of the components
+        :rtype: dict
+        """
+        built_rpms = {}
+        pattern = os.path.join(glob.escape(self.workdir), "*", ROOT_BATCH_FOLDER, "batch_*", "*", "*.rpm")
+
+        for path in glob.glob(pattern):
+            if not path.endswith(SRPM_EXTENSION):
+                built_rpms.setdefault(os.path.basename(os.path.dirname(path)), []).append(path)
+
+        return built_rpms
+
+    def _get_built_provides(self):
+        """Reads what the components provide from their binary RPMs built by the previous builds
+        in the working directory.
+
+        :return: sets of the provides by the names of the components
+        :rtype: dict
+        """
+        provides = {}
+
+        for name, paths in self._get_built_rpms().items():
+            for path in paths:
+                rpm_provides = get_rpm_provides(path)
+                if rpm_provides is not None:
+                    provides.setdefault(name, set()).update(rpm_provides)
+
+        return provides
+
+    def _get_repos(self, version):
+        """Returns the repos which are available to the buildroots: the external repos and the
+        enabled repos of the mock config. The metadata of the repos of the mock config are
+        downloaded into the working directory.
+
+        :param version: version of the module stream
+        :type version: int
+        :return: paths to the repos which contain the `repodata` dir
+        :rtype: list
+        """
+        mock_cfg = self.get_mock_cfg(version)
+        repos = list(self.external_repos)
+
+        if not mock_cfg.get("dnf.conf"):
+            return repos
+
+        root = mock_cfg.get("root") or MockConfig(self.mock_cfg_path).get_root_name()
+        cache_dir = os.path.join(self.workdir, REPOS_METADATA_FOLDER, root)
+
+        logger.info("Downloading the metadata of the repos of the mock config...")
+        mock_cfg_repos = download_repos_metadata(mock_cfg["dnf.conf"], cache_dir, mock_cfg.get("releasever"), self.arch)
+
+        for repo_id, repo in mock_cfg_repos.items():
+            if repo:
+                repos.append(repo)
+            else:
+                logger.warning("The metadata of the repo '{repo}' of the mock config were not downloaded.".format(repo=repo_id))
+
+        return repos
+
+    def _get_repos_provides(self, version, names):
+        """Reads what the packages of the repos built from the source packages of components
+        provide.
+
+        :param version: version of the module stream
+        :type version: int
+        :param names: names of the components
+        :type names: list
+        :return: sets of the provides by the names of the components found in the repos
+        :rtype: dict
+        """
+        resolver = BuildRequiresResolver(self.arch)
+
+        for repo in self._get_repos(version):
+            if not resolver.add_repo(repo):
+                logger.warning("The repo '{repo}' has no metadata, it is not used.".format(repo=repo))
+
+        return resolver.get_source_provides(names)
+
+    def _derive_buildorder(self, module_stream, resume=False):
+        """Derives the buildorder of the components from the BuildRequires of their SRPMs and
+        what the components provide. The provides are read from the RPMs built by previous
+        builds and for the components which were not built yet from their packages in the
+        repos. The components which are not built for the architecture are left out. A resumed
+        build reuses the buildorder derived by the build it continues.
+
+        :param module_stream: a module stream object
+        :type module_stream: :class:`module_build.stream.ModuleBuild` object
+        :param resume: the build continues a previous build
+        :type resume: bool
+        :return: the components built for the architecture with the derived buildorder
+        :rtype: list
+        """
+        # an empty list of arches means all architectures
+        components = [c for c in module_stream.components if not c["arches"] or self.arch in c["arches"]]
+        names = {c["name"] for c in components}
+        buildorder_path = self._get_derived_buildorder_path(module_stream)
+
+        if resume and os.path.isfile(buildorder_path):
+            with open(buildorder_path, "r") as f:
+                derived = json.load(f)
+
+            if set(derived["buildorder"]) == names:
+                logger.info("Using the buildorder derived by a previous build: {path}".format(path=buildorder_path))
+                self.derived_buildorder = derived
+
+                return [dict(c, buildorder=derived["buildorder"][c["name"]]) for c in components]
+
+        logger.info("Deriving the buildorder from the BuildRequires of the SRPMs...")
+
+        requires = {}
+        for component in components:
+            srpm_path = self.mock_info.get_srpm_path(component["name"], component["ref"])
+            requires[component["name"]] = get_srpm_buildrequires(srpm_path) if srpm_path else None
+
+        provides = self._get_built_provides()
+        not_built = sorted(names - set(provides))
+
+        if not_built:
+            try:
+                repos_provides = self._get_repos_provides(module_stream.version, not_built)
+            except Exception as e:
+                logger.warning("The provides of the components can't be read from the repos: {error}".format(error=e))
+            else:
+                if repos_provides:
+                    msg = "The provides of {names}, which were not built yet, are taken from their packages in the repos.".format(
+                        names=sorted(repos_provides)
+                    )
+                    logger.info(msg)
+                provides.update(repos_provides)
+
+        buildorder, dependencies = derive_buildorder(components, requires, provides)
+        relaxed = find_relaxed_components(components, buildorder, dependencies)
+
+        unknown_requires = sorted(n for n in names if requires[n] is None)
+        if unknown_requires:
+            msg = "The BuildRequires of {names} can't be read, they wait for all the components declared before them.".format(
+                names=unknown_requires
+            )
+            logger.warning(msg)
+
+        unknown_provides = sorted(n for n in names if n not in provides)
+        if unknown_provides:
+            msg = ("No RPMs of {names} were built in the working directory yet and they are not in the repos, all the"
+                   " components declared after them wait for them.").format(names=unknown_provides)
+            logger.warning(msg)
+
+        for component in relaxed:
+            msg = ("The component '{name}' is declared in batch {declared} but it needs to wait only for {waits_for}."
+                   " It is built in batch {derived}.").format(
+                name=component["name"],
+                declared=component["declared_batch"],
+                waits_for=component["waits_for"],
+                derived=component["derived_batch"],
+            )
+            logger.info(msg)
+
+        msg = "The declared buildorder is stricter than needed for {num} of {total} components.".format(
+            num=len(relaxed), total=len(components)
+        )
+        logger.info(msg)
+
+        self.derived_buildorder = {"buildorder": buildorder, "relaxed": relaxed}
+
+        return [dict(c, buildorder=buildorder[c["name"]]) for c in components]
+
+    def _save_derived_buildorder(self, module_stream):
+        with open(self._get_derived_buildorder_path(module_stream), "w") as f:
+            json.dump(self.derived_buildorder, f, indent=4)
+
+    def create_build_contexts(self, module_stream, resume=False):
         """Method which creates metada which track the build process and state of a context of a
         module stream.
 
         :param module_stream: a module stream object
         :type module_stream: :class:`module_build.stream.ModuleBuild` object
+        :param resume: the build continues a previous build
+        :type resume: bool
         """
-        mock_path, mock_filename = self.mock_cfg_path.rsplit("/", 1)
-
-        # Support for mock2 and mock3
-        # mockbuild is missing __version__ attribute so we are handling Exception
-        try:
-            mock_cfg = mockbuild.config.load_config(mock_path, self.mock_cfg_path, None, module_stream.version, mock_path)
-        except TypeError:
-            mock_cfg = mockbuild.config.load_config(mock_path, self.mock_cfg_path, None)
+        mock_cfg = self.get_mock_cfg(module_stream.version)
 
         dist = None
         if "dist" in mock_cfg:
@@ -409,30 +1141,13 @@ class MockBuilder:
 
         buildroot_profiles = {}
         srpm_buildroot_profiles = {}
-        if self.external_repos:
-            for repo in self.external_repos:
-                mi = Modulemd.ModuleIndex.new()
-                repodata_path = repo + "/repodata"
-                yaml_file = [f for f in os.listdir(repodata_path) if f.endswith("modules.yaml.gz")]
-
-                if yaml_file:
-                    yaml_file_path = repodata_path + "/" + yaml_file[0]
-                    mi.update_from_file(yaml_file_path, True)
-                    streams = mi.search_streams()
+        for profiles in self._get_external_repos_profiles():
+            buildroot_profiles.update(profiles["buildroot"])
+            srpm_buildroot_profiles.update(profiles["srpm-buildroot"])
 
-                    for s in streams:
-                        profiles = s.get_profile_names()
-                        name = s.get_module_name()
-                        stream = s.get_stream_name()
-                        module_stream_str = "{name}:{stream}".format(name=name, stream=stream)
-
-                        if "buildroot" in profiles:
-                            stream_profile = "{stream}/buildroot".format(stream=module_stream_str)
-                            buildroot_profiles[module_stream_str] = stream_profile
-
-                        if "srpm-buildroot" in profiles:
-                            stream_profile = "{stream}/srpm-buildroot".format(stream=module_stream_str)
-                            srpm_buildroot_profiles[module_stream_str] = stream_profile
+        components = module_stream.components
+        if self.derive_buildorder:
+            components = self._derive_buildorder(module_stream, resume)
 
         build_contexts = OrderedDict()
 
@@ -451,10 +1166,14 @@ class MockBuilder:
                 "filtered_rpms": module_stream.filtered_rpms,
                 "buildroot_profiles": [],
                 "srpm_buildroot_profiles": [],
+                # NEVRAs of the built artifacts by their paths
+                "artifacts_nevra": {},
+                # artifacts which are already in the final repo and the modulemd of the context
+                "final_artifacts": set(),
                 "status": {
                     "state": self.states[0],
                     "current_build_batch": 0,
-                    "num_components": len(module_stream.components),
+                    "num_components": 0,
                     "num_finished_comps": 0,
                 },
             }
@@ -472,11 +1191,126 @@ class MockBuilder:
                         build_context["srpm_buildroot_profiles"].append(stream_profile)
 
             logger.info("Generating build batches from the components buildorder...")
-            build_context["build_batches"] = self.generate_build_batches(module_stream.components)
+            build_context["build_batches"] = self.generate_build_batches(components)
+            build_context["status"]["num_components"] = sum(len(b["components"]) for b in build_context["build_batches"].values())
             build_contexts[context.context_name] = build_context
 
         self.build_contexts = build_contexts
 
+    def get_mock_cfg(self, version):
+        """Returns the options of the mock config provided by the user which are needed for the
+        creation of the build contexts. The options are cached by the digest of the config and
+        of the names of the options.
+
+        :param version: version of the module stream
+        :type version: int
+        :return: the `MOCK_CONFIG_OPTIONS` options of the config which are set
+        :rtype: dict
+        """
+        key = get_file_digest(*get_config_files(self.mock_cfg_path))
+        # the options cached by another version of module-build can be different
+        if key:
+            key = hashlib.sha256("{key}:{options}".format(key=key, options=",".join(MOCK_CONFIG_OPTIONS)).encode()).hexdigest()
+
+        return self.cache.get(
+            "mock_configs",
+            key,
+            lambda: self._load_mock_cfg(version),
+            persistent=True,
+        )
+
+    def _load_mock_cfg(self, version):
+        """Loads the mock config provided by the user and returns the options needed for
+        the creation of the build contexts.
+
+        :param version: version of the module stream
+        :type version: int
+        :return: the `MOCK_CONFIG_OPTIONS` options of the config which are set
+        :rtype: dict
+        """
+        mock_path, mock_filename = self.mock_cfg_path.rsplit("/", 1)
+
+        # Support for mock2 and mock3
+        # mockbuild is missing __version__ attribute so we are handling Exception
+        try:
+            mock_cfg = mockbuild.config.load_config(mock_path, self.mock_cfg_path, None, version, mock_path)
+        except TypeError:
+            mock_cfg = mockbuild.config.load_config(mock_path, self.mock_cfg_path, None)
+
+        return {k: mock_cfg[k] for k in MOCK_CONFIG_OPTIONS if k in mock_cfg}
+
+    def _get_external_repos_profiles(self):
+        """Returns the `buildroot` and `srpm-buildroot` profiles of all external repos in the
+        order of the repos.
+
+        The profiles are cached on disk under the checksum of the `repomd.xml` file of the repo,
+        so an unchanged repo is parsed only once. The repos missing in the cache are parsed in
+        parallel.
+
+        :return: list of the maps returned by `_load_repo_profiles`
+        :rtype: list
+        """
+        yaml_files = []
+        for repo in self.external_repos:
+            repodata_path = repo + "/repodata"
+            yaml_file = [f for f in os.listdir(repodata_path) if f.endswith("modules.yaml.gz")]
+
+            if yaml_file:
+                yaml_file_path = repodata_path + "/" + yaml_file[0]
+                yaml_files.append((yaml_file_path, get_file_digest(repodata_path + "/repomd.xml")))
+
+        profiles = {}
+        missing = {}
+        for yaml_file_path, key in yaml_files:
+            repo_profiles = self.cache.lookup("repo_profiles", key, persistent=True)
+
+            if repo_profiles is None:
+                missing[yaml_file_path] = key
+            else:
+                profiles[yaml_file_path] = repo_profiles
+
+        if missing:
+            logger.info("Loading the module profiles of {num} external repos...".format(num=len(missing)))
+
+            with ThreadPoolExecutor(min(len(missing), os.cpu_count() or 1)) as executor:
+                loaded = executor.map(self._load_repo_profiles, missing)
+
+                for (yaml_file_path, key), repo_profiles in zip(missing.items(), loaded):
+                    profiles[yaml_file_path] = repo_profiles
+                    self.cache.store("repo_profiles", key, repo_profiles, persistent=True)
+
+        return [profiles[yaml_file_path] for yaml_file_path, _ in yaml_files]
+
+    def _load_repo_profiles(self, yaml_file_path):
+        """Finds all module streams with `buildroot` and `srpm-buildroot` profiles in the
+        modules.yaml file of an external repo.
+
+        :param yaml_file_path: path to the modules.yaml.gz file
+        :type yaml_file_path: str
+        :return: maps of module streams to their `buildroot` and `srpm-buildroot` profiles
+        :rtype: dict
+        """
+        profiles = {
+            "buildroot": {},
+            "srpm-buildroot": {},
+        }
+
+        mi = Modulemd.ModuleIndex.new()
+        mi.update_from_file(yaml_file_path, True)
+        streams = mi.search_streams()
+
+        for s in streams:
+            profile_names = s.get_profile_names()
+            name = s.get_module_name()
+            stream = s.get_stream_name()
+            module_stream_str = "{name}:{stream}".format(name=name, stream=stream)
+
+            for profile in profiles:
+                if profile in profile_names:
+                    profiles[profile][module_stream_str] = "{stream}/{profile}".format(stream=module_stream_str, profile=profile)
+
+        return profiles
+
     def create_build_context_dir(self, context_name):
         if not self.build_contexts:
             # TODO make this to a custom exception
@@ -513,6 +1347,33 @@ class MockBuilder:
 
         return batches_dir_path
 
+    def _get_tmpfs_size(self, component):
+        """Estimates the peak size of the buildroot of a component from the size of its SRPM.
+
+        :param component: component metadata
+        :type component: dict
+        :return: the expected size in MB or None when the buildroot should not be on tmpfs
+        :rtype: int or None
+        """
+        if not self.tmpfs_size or not self.mock_info.srpms_enabled():
+            return None
+
+        srpm_path = self.mock_info.get_srpm_path(component["name"], component["ref"])
+        if not srpm_path:
+            return None
+
+        srpm_size = os.path.getsize(srpm_path) // (1024 * 1024)
+        size = TMPFS_BASE_SIZE_MB + srpm_size * TMPFS_SRPM_SIZE_FACTOR
+
+        if size > self.tmpfs_size:
+            msg = "The buildroot of component '{name}' is expected to use {size}MB. It will be created on disk.".format(
+                name=component["name"], size=size
+            )
+            logger.info(msg)
+            return None
+
+        return size
+
     def generate_and_process_mock_cfg(self, component, context_name, batch_num):
         mock_config = MockConfig(self.mock_cfg_path)
 
@@ -520,6 +1381,14 @@ class MockBuilder:
         if not self.mock_info.srpms_enabled():
             mock_config.enable_mbs("distgit", component["name"], component["ref"])
 
+        # small buildroots are created on tmpfs. The estimate only selects them, the tmpfs can
+        # grow up to the `--tmpfs` size, which is reserved for it. If there will be not enough
+        # memory when the buildroot starts, it falls back to disk.
+        if self._get_tmpfs_size(component):
+            mock_config.enable_tmpfs(self.tmpfs_size)
+
+        mock_config.enable_package_cache()
+
         # we need to tell mock which modular build dependencies need to be enabled
         context = self.build_contexts[context_name]
         # modular_deps represent modular buildtime dependency provided by the definition in the
@@ -555,77 +1424,205 @@ class MockBuilder:
             msg += "- {file_path}\n".format(file_path=fb)
         logger.info(msg)
 
-        num_batches = len(self.build_contexts[context_name]["build_batches"])
-        last_batch = sorted(self.build_contexts[context_name]["build_batches"])[-1]
-        batch_dir = self.build_contexts[context_name]["build_batches"][position]["dir"]
-        # we need to create a module stream out of a build_batch. This will happen only when there
-        # is more batches then 1. If there is only 1 batch (no set buildorder) nothing needs to
-        # be done. If the batch is the last in the buildorder it will be not used as a modular
-        # dependency for any other batch so we also do nothing.
-        if num_batches > 1 and last_batch != position:
-            name = "batch{num}".format(num=position)
-            stream = "{num}".format(num=position)
+        self._record_durations(build_batch)
+
+        build_batches = self.build_contexts[context_name]["build_batches"]
+        sorted_batches = sorted(build_batches)
+        batch_dir = build_batch["dir"]
+        # we need to update the cumulative batch module stream with the batch. This will happen
+        # only when there is more batches then 1. If there is only 1 batch (no set buildorder)
+        # nothing needs to be done. If the batch is the last in the buildorder it will be not used
+        # as a modular dependency for any other batch so we also do nothing.
+        if len(sorted_batches) > 1 and sorted_batches[-1] != position:
+            finished_batches = sorted_batches[:sorted_batches.index(position) + 1]
+            next_batch = sorted_batches[len(finished_batches)]
+
             context = "b{num}".format(num=position)
             version = generate_module_stream_version()
-            if position + 1 == num_batches:
-                description = ("This module stream is a buildorder modular dependency for batch_{last_batch}.").format(last_batch=num_batches)
-            else:
-                description = ("This module stream is a buildorder modular dependency for batch_{num}-{last_batch}.").format(
-                    num=position + 1, last_batch=num_batches
-                )
+            description = ("This module stream contains batches {first}-{num}. It is a buildorder modular dependency for the batch {next}.").format(
+                first=sorted_batches[0], num=position, next=next_batch
+            )
             summary = description
             mod_license = "MIT"
-            # for each new batch mmd we want a copy of the modular dependencies which are
-            # provided from the initial mmd file
+            # the cumulative mmd has a copy of the modular dependencies which are provided from
+            # the initial mmd file
             modular_deps = copy.deepcopy(self.build_contexts[context_name]["modular_deps"])
-            modular_batch_deps = build_batch["modular_batch_deps"]
 
-            for d in modular_batch_deps:
-                modular_deps["buildtime"].append(d)
-                modular_deps["runtime"].append(d)
-
-            components = build_batch["components"]
-
-            artifacts = self.get_artifacts_nevra(build_batch["finished_builds"])
+            components = []
+            artifacts = []
+            for b in finished_batches:
+                components += build_batches[b]["components"]
+                artifacts += self._get_artifacts_nevra(context_name, build_batches[b]["finished_builds"])
 
             mmd = generate_and_populate_output_mmd(
-                name, stream, context, version, description, summary, mod_license, components, artifacts, modular_deps
-            )
-
-            mmd_str = mmd_to_str(mmd)
-
-            mmd_file_name = "/{n}:{s}:{v}:{c}:{a}.modulemd.yaml".format(
-                n=name,
-                s=stream,
-                v=version,
-                c=context,
-                a=self.build_contexts[context_name]["metadata"].arch,
+                BATCH_MODULE_NAME, BATCH_MODULE_STREAM, context, version, description, summary, mod_license, components, artifacts, modular_deps
             )
-            file_path = batch_dir + mmd_file_name
 
-            with open(file_path, "w") as f:
-                f.write(mmd_str)
+            build_batches_dir = self.build_contexts[context_name]["dir"] + "/build_batches"
 
-            msg = ("Batch number {position} is defined as modular batch dependency for batches {num}-{last_batch}").format(
-                position=position, num=position + 1, last_batch=last_batch
+            msg = ("Batches {first}-{position} are defined as modular batch dependency for batch {num}").format(
+                first=sorted_batches[0], position=position, num=next_batch
             )
             logger.info(msg)
-            msg = "Modular metadata written to: {path}".format(path=file_path)
 
             # create/update the repository in `build_batches` dir so we can use it as
             # modular batch dependency repository for buildtime dependencies. Each finished
-            # batch will be used for the next one as modular dependency.
+            # batch will be used for the next one as modular dependency. The previous version of
+            # the batch module is replaced, so the batch repo always contains only one version
+            # of it.
             msg = "Updating build batch modular repository..."
             logger.info(msg)
-            build_batches_dir = self.build_contexts[context_name]["dir"] + "/build_batches"
-            self.call_createrepo_c_on_dir(build_batches_dir)
+            self.call_createrepo_c_on_dir(build_batches_dir, intermediate=True, module_index=create_module_index([mmd]))
         # we create a dummy file which marks the whole batch as finished. This serves as a marker
         # for the --resume feature to mark the whole build as finished
         finished_file_path = batch_dir + "/finished"
         with open(finished_file_path, "w") as f:
             f.write("finished")
 
-    def call_createrepo_c_on_dir(self, dir):
+    def _record_durations(self, build_batch):
+        """Stores the build durations of the components of a finished batch in the persistent
+        cache, so they can be used by `create_build_plan`.
+
+        :param build_batch: metadata of a finished batch
+        :type build_batch: dict
+        """
+        for component in build_batch["components"]:
+            duration_file_path = os.path.join(build_batch["dir"], component["name"], DURATION_FILENAME)
+
+            try:
+                with open(duration_file_path) as f:
+                    duration = float(f.read())
+            except (OSError, ValueError):
+                continue
+
+            self.cache.store("durations", self._get_duration_key(component), {"ref": component["ref"], "seconds": duration}, persistent=True)
+
+    def _get_duration_key(self, component):
+        """Returns the key of the recorded duration of a component. Builds of other refs and
+        architectures of the component take a different time, so they are recorded separately.
+
+        :param component: component metadata
+        :type component: dict
+        :return: the key in the `durations` cache
+        :rtype: str
+        """
+        return "{name}:{ref}:{arch}".format(name=component["name"], ref=component["ref"], arch=self.arch).replace("/", "_")
+
+    def _get_artifacts_nevra(self, context_name, artifacts):
+        """Returns the NEVRAs of artifacts of a context. Every artifact is queried only once, even
+        when it is part of the final repo and many cumulative batch modules.
+
+        :param context_name: name of the context
+        :type context_name: str
+        :param artifacts: paths of the artifacts
+        :type artifacts: list
+        :return: list of NEVRAs
+        :rtype: list
+        """
+        artifacts_nevra = self.build_contexts[context_name]["artifacts_nevra"]
+        missing = [a for a in artifacts if a not in artifacts_nevra]
+
+        # `get_artifacts_nevra` returns the NEVRAs grouped by the directory of the artifacts
+        for result_dir in dict.fromkeys(os.path.dirname(a) for a in missing):
+            dir_artifacts = [a for a in missing if os.path.dirname(a) == result_dir]
+            artifacts_nevra.update(zip(dir_artifacts, self.get_artifacts_nevra(dir_artifacts)))
+
+        return [artifacts_nevra[a] for a in artifacts]
+
+    def _add_artifacts_to_final_repo(self, context_name, artifacts):
+        """Links the artifacts of a finished component into the final repo of the context and
+        adds their NEVRAs to the modulemd of the context. The RPMs filtered by the module stream
+        are not linked, but they stay in the artifacts of the modulemd.
+
+        :param context_name: name of the context
+        :type context_name: str
+        :param artifacts: paths of the artifacts
+        :type artifacts: list
+        """
+        with self.final_repo_lock:
+            build_context = self.build_contexts[context_name]
+            final_repo_dir = build_context["dir"] + "/final_repo"
+            os.makedirs(final_repo_dir, exist_ok=True)
+
+            mmd = build_context["metadata"].mmd
+            artifacts = [a for a in artifacts if a not in build_context["final_artifacts"]]
+
+            for artifact, nevra in zip(artifacts, self._get_artifacts_nevra(context_name, artifacts)):
+                mmd.add_rpm_artifact(nevra)
+                build_context["final_artifacts"].add(artifact)
+
+                filename = os.path.basename(artifact)
+                if filename.rsplit("-", 2)[0] in build_context["filtered_rpms"]:
+                    msg = "Filtering out '{rpm}' from the final repo...".format(rpm=filename)
+                    logger.info(msg)
+                    continue
+
+                self._link_to_dir(artifact, final_repo_dir)
+
+    def _link_to_dir(self, file_path, dir_path):
+        """Hardlinks a file into a directory. The repos of the build are in the working directory,
+        so the file is copied only when the working directory spans multiple filesystems.
+
+        :param file_path: path of the file
+        :type file_path: str
+        :param dir_path: path of the directory
+        :type dir_path: str
+        """
+        try:
+            os.link(file_path, os.path.join(dir_path, os.path.basename(file_path)))
+        except OSError:
+            shutil.copy(file_path, dir_path)
+
+    def create_combined_repo(self, build_contexts=None):
+        """Creates one repo with the final repos of all finalized contexts. The RPMs and modulemd
+        files are hardlinked and the metadata of the final repos are reused, so the repo is
+        created by a single `createrepo_c` run which does not read the RPMs again.
+
+        :param build_contexts: contexts to combine, all contexts of the builder by default
+        :type build_contexts: list
+        :return: path to the combined repo
+        :rtype: str
+        """
+        if build_contexts is None:
+            build_contexts = list(self.build_contexts.values())
+
+        combined_repo_dir = os.path.join(self.workdir, COMBINED_REPO_FOLDER)
+        # the combined repo is created again by every build, so it has only the current contexts
+        if os.path.isdir(combined_repo_dir):
+            shutil.rmtree(combined_repo_dir)
+        os.makedirs(combined_repo_dir)
+
+        final_repo_dirs = []
+        module_index = create_module_index([])
+        for build_context in build_contexts:
+            if "dir" not in build_context or not os.path.isfile(build_context["dir"] + "/finished"):
+                continue
+
+            final_repo_dir = build_context["dir"] + "/final_repo"
+            final_repo_dirs.append(final_repo_dir)
+
+            msg = "Adding the final repo of context '{name}' to the combined repo...".format(name=build_context["name"])
+            logger.info(msg)
+
+            for f in os.listdir(final_repo_dir):
+                # noarch RPMs have the same filename in the final repos of all architectures
+                if f.endswith("rpm") and not os.path.exists(os.path.join(combined_repo_dir, f)):
+                    self._link_to_dir(os.path.join(final_repo_dir, f), combined_repo_dir)
+
+            # the contexts finalized by a previous build are not in the memory with their artifacts
+            if "final_yaml_path" in build_context:
+                module_index.add_module_stream(build_context["metadata"].mmd)
+            else:
+                module_index.update_from_file(self._get_final_yaml_path(build_context), True)
+
+        self.call_createrepo_c_on_dir(combined_repo_dir, update_md_paths=final_repo_dirs, module_index=module_index)
+
+        msg = "The combined repo of all contexts has been written to: {path}".format(path=combined_repo_dir)
+        logger.info(msg)
+
+        return combined_repo_dir
+
+    def call_createrepo_c_on_dir(self, dir, intermediate=False, update_md_paths=None, module_index=None):
         # TODO move out as a standalone function
         msg = "createrepo_c called on dir: {path}".format(
             path=dir,
@@ -633,6 +1630,15 @@ class MockBuilder:
         logger.info(msg)
 
         mock_cmd = ["createrepo_c", dir]
+        # the batch repo is read only by our buildroots. The metadata of the already indexed RPMs
+        # are reused and dnf does not need the sqlite databases.
+        if intermediate:
+            mock_cmd += CREATEREPO_INTERMEDIATE_OPTIONS + ["--workers={num}".format(num=os.cpu_count() or 1)]
+        # the RPMs with the same filename, size and mtime as in the metadata of the other repos
+        # are not read again, their metadata are copied
+        if update_md_paths:
+            mock_cmd.append("--update")
+            mock_cmd += ["--update-md-path={path}".format(path=p) for p in update_md_paths]
         proc = subprocess.Popen(mock_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         out, err = proc.communicate()
 
@@ -640,14 +1646,62 @@ class MockBuilder:
             err_msg = "Command '%s' returned non-zero value %d%s" % (mock_cmd, proc.returncode, out)
             raise RuntimeError(err_msg)
 
+        if module_index is not None:
+            self.call_modifyrepo_c_on_dir(dir, module_index)
+
         return out, err
 
+    def call_modifyrepo_c_on_dir(self, dir, module_index):
+        """Adds the modules.yaml file to the metadata of a repo. The module streams are not
+        written into the repo dir, so `createrepo_c` does not need to find and parse them.
+
+        :param dir: path to the repo
+        :type dir: str
+        :param module_index: module streams of the repo
+        :type module_index: :class:`Modulemd.ModuleIndex` instance
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            modules_yaml_path = os.path.join(tmp_dir, "modules.yaml")
+
+            with open(modules_yaml_path, "w") as f:
+                f.write(module_index.dump_to_string())
+
+            # the external repos are expected to have a gzip compressed modules.yaml
+            cmd = ["modifyrepo_c", "--mdtype=modules", "--compress-type=gz", modules_yaml_path, dir + "/repodata"]
+            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+            out, err = proc.communicate()
+
+        if proc.returncode != 0:
+            err_msg = "Command '{cmd}' returned non-zero value {code}\n{err}".format(cmd=cmd, code=proc.returncode, err=err)
+            raise RuntimeError(err_msg)
+
+    def _get_final_yaml_path(self, build_context):
+        """Returns the path of the modulemd yaml file of a finalized context. The file is in the
+        context dir, the final repo has the module stream in its metadata.
+
+        :param build_context: the build context
+        :type build_context: dict
+        :return: path to the modulemd yaml file
+        :rtype: str
+        """
+        mmd = build_context["metadata"].mmd
+
+        mmd_file_name = "{n}:{s}:{v}:{c}:{a}.modulemd.yaml".format(
+            n=mmd.get_module_name(),
+            s=mmd.get_stream_name(),
+            v=mmd.get_version(),
+            c=build_context["name"],
+            a=build_context["metadata"].arch,
+        )
+
+        return os.path.join(build_context["dir"], mmd_file_name)
+
     def finalize_build_context(self, context_name):
         msg = "Context '{name}' finished building all its batches...".format(name=context_name)
         logger.info(msg)
         context_dir = self.build_contexts[context_name]["dir"]
         final_repo_dir = context_dir + "/final_repo"
-        os.makedirs(final_repo_dir)
+        os.makedirs(final_repo_dir, exist_ok=True)
 
         mmd = self.build_contexts[context_name]["metadata"].mmd
 
@@ -655,30 +1709,15 @@ class MockBuilder:
         stream = mmd.get_stream_name()
         version = mmd.get_version()
         context = mmd.get_context()
-        arch = self.build_contexts[context_name]["metadata"].arch
-
-        msg = ("Copying build artifacts from batches directories to the final repo dir: {path}").format(path=final_repo_dir)
-        logger.info(msg)
 
+        # the artifacts are added to the final repo when their component finishes. Here we add
+        # only the components which were built before the build was resumed.
         for bb in self.build_contexts[context_name]["build_batches"].values():
-            for file_path in bb["finished_builds"]:
-                shutil.copy(file_path, final_repo_dir)
-            artifacts = self.get_artifacts_nevra(bb["finished_builds"])
-
-            for a in artifacts:
-                mmd.add_rpm_artifact(a)
+            self._add_artifacts_to_final_repo(context_name, bb["finished_builds"])
 
         mmd_str = mmd_to_str(mmd)
 
-        mmd_file_name = "/{n}:{s}:{v}:{c}:{a}.modulemd.yaml".format(
-            n=name,
-            s=stream,
-            v=version,
-            c=context_name,
-            a=arch,
-        )
-
-        mmd_yaml_file_path = final_repo_dir + "/" + mmd_file_name
+        mmd_yaml_file_path = self._get_final_yaml_path(self.build_contexts[context_name])
         with open(mmd_yaml_file_path, "w") as f:
             f.write(mmd_str)
 
@@ -689,21 +1728,11 @@ class MockBuilder:
         self.build_contexts[context_name]["final_repo_path"] = final_repo_dir
         self.build_contexts[context_name]["final_yaml_path"] = mmd_yaml_file_path
 
-        # if the module steam has configured rpm filters we filter out the rpms which should not
-        # be present in the final repo
-        filtered_rpms = self.build_contexts[context]["filtered_rpms"]
-
-        if filtered_rpms:
-            rpm_filenames = [f for f in os.listdir(final_repo_dir) if f.endswith("rpm")]
-            for f in rpm_filenames:
-                rpm_name = f.rsplit("-", 2)[0]
-                if rpm_name in filtered_rpms:
-                    file_path = final_repo_dir + "/" + f
-                    msg = "Filtering out '{rpm}' from the final repo...".format(rpm=f)
-                    logger.info(msg)
-                    os.remove(file_path)
-
-        self.call_createrepo_c_on_dir(final_repo_dir)
+        # the RPMs in the final repo are hardlinks of the RPMs which are already indexed in the
+        # batch repo, except the RPMs of the last batch
+        self.call_createrepo_c_on_dir(
+            final_repo_dir, update_md_paths=[context_dir + "/build_batches"], module_index=create_module_index([mmd])
+        )
 
         # we create a dummy file which marks the whole repo as finished. This serves as a marker
         # for the --resume feature to mark the whole build as finished
@@ -742,6 +1771,152 @@ class MockBuilder:
 
         return artifacts_nevra
 
+    def prepare_rebuild(self, module_stream, components, context_to_build=None):
+        """Prepares the working directory for a rebuild of components. The components are
+        rebuilt together with all the components of the later batches, as those can depend on
+        them. The artifacts of the earlier batches and of the other components of the same batch
+        are reused. The batch repo is regenerated without the old artifacts and the final repo is
+        removed. Unfinished batches of a previous build are built as well and contexts without a
+        context dir are built from the start. The result dirs of the components which were removed
+        from a batch are deleted and the batch is rebuilt.
+
+        :param module_stream: module stream to rebuild
+        :type module_stream: ModuleStream
+        :param components: names of the components to rebuild
+        :type components: list
+        :param context_to_build: the only context which is rebuilt, all contexts when None
+        :type context_to_build: str
+        """
+        # the component doesn't have to be built for the architecture of the builder
+        known_components = {c["name"] for c in module_stream.components}
+        unknown_components = [c for c in components if c not in known_components]
+
+        if unknown_components:
+            raise Exception("The components {names} to rebuild do not exist in the module stream!".format(names=unknown_components))
+
+        for context_name, build_context in self.build_contexts.items():
+            if context_to_build and context_to_build != context_name:
+                continue
+
+            context_dir = os.path.join(self.workdir, build_context["nsvca"])
+
+            if not os.path.isdir(context_dir):
+                msg = "The context '{context}' was not built yet. It will be built from the start.".format(context=context_name)
+                logger.info(msg)
+                continue
+
+            build_batches = build_context["build_batches"]
+            sorted_batches = sorted(build_batches)
+            build_context["dir"] = context_dir
+            # the rebuild starts with the first batch which has a component to rebuild, which was
+            # not finished by the previous build or which has a component without finished build,
+            # e.g. a component which was added to the module stream after the previous build
+            positions = [
+                p
+                for p in sorted_batches
+                if any(c["name"] in components for c in build_batches[p]["components"])
+                or not os.path.isfile(context_dir + "/build_batches/batch_{num}/finished".format(num=p))
+                or any(
+                    not os.path.isfile(context_dir + "/build_batches/batch_{num}/{name}/finished".format(num=p, name=c["name"]))
+                    for c in build_batches[p]["components"]
+                )
+                or self._get_removed_component_dirs(context_dir + "/build_batches/batch_{num}".format(num=p), build_batches[p])
+            ]
+
+            if not positions:
+                msg = "There is nothing to rebuild in context '{context}'. Skipping...".format(context=context_name)
+                logger.info(msg)
+                build_context["status"]["state"] = self.states[3]
+                continue
+
+            first_position = positions[0]
+
+            msg = "Rebuilding context '{context}' from batch number '{num}'...".format(context=context_name, num=first_position)
+            logger.info(msg)
+
+            build_context["status"]["state"] = self.states[1]
+            build_context["status"]["current_build_batch"] = first_position
+
+            for position in sorted_batches:
+                batch = build_batches[position]
+                batch_dir = context_dir + "/build_batches/batch_{num}".format(num=position)
+
+                # the later batches are built again from the start
+                if position > first_position:
+                    shutil.rmtree(batch_dir, ignore_errors=True)
+                    continue
+
+                # the failed build could have not started the batch yet
+                if os.path.isdir(batch_dir):
+                    batch["dir"] = batch_dir
+
+                # the artifacts of the components removed from the module stream must not stay in the batch repo
+                for comp_dir in self._get_removed_component_dirs(batch_dir, batch):
+                    msg = "Removing the artifacts of the removed component '{name}' of batch number '{num}' of context '{context}'...".format(
+                        name=os.path.basename(comp_dir), num=position, context=context_name
+                    )
+                    logger.info(msg)
+                    shutil.rmtree(comp_dir)
+
+                for component in batch["components"]:
+                    comp_dir = batch_dir + "/" + component["name"]
+
+                    if position == first_position and (component["name"] in components or not os.path.isfile(comp_dir + "/finished")):
+                        msg = "Component '{name}' of batch number '{num}' of context '{context}' will be rebuilt.".format(
+                            name=component["name"], num=position, context=context_name
+                        )
+                        logger.info(msg)
+                        shutil.rmtree(comp_dir, ignore_errors=True)
+                        continue
+
+                    # all the components of the earlier batches are finished, so their dirs exist
+                    batch["finished_builds"] += [comp_dir + "/" + f for f in os.listdir(comp_dir) if f.endswith("rpm")]
+
+                    if position == first_position:
+                        batch["reused_components"].append(component["name"])
+
+                if position < first_position:
+                    batch["batch_state"] = self.states[3]
+                    batch["curr_comp_state"] = self.states[3]
+                    batch["curr_comp"] = len(batch["components"]) - 1
+                else:
+                    batch["batch_state"] = self.states[1]
+
+                    if os.path.isfile(batch_dir + "/finished"):
+                        os.remove(batch_dir + "/finished")
+
+            # the buildroots must not get the old artifacts of the rebuilt batches from the batch repo
+            earlier_batches = [p for p in sorted_batches if p < first_position]
+            if earlier_batches:
+                self.finalize_batch(earlier_batches[-1], context_name)
+            else:
+                self.call_createrepo_c_on_dir(context_dir + "/build_batches", intermediate=True)
+
+            if os.path.isdir(context_dir + "/final_repo"):
+                logger.info("Removing old final repo...")
+                shutil.rmtree(context_dir + "/final_repo")
+
+            if os.path.isfile(context_dir + "/finished"):
+                os.remove(context_dir + "/finished")
+
+    def _get_removed_component_dirs(self, batch_dir, batch):
+        """Returns the result dirs of a batch dir which do not belong to any component of the
+        batch, because the component was removed from the module stream or moved to another batch.
+
+        :param batch_dir: path to the batch dir
+        :type batch_dir: str
+        :param batch: the build batch
+        :type batch: dict
+        :return: paths to the result dirs of the removed components
+        :rtype: list
+        """
+        if not os.path.isdir(batch_dir):
+            return []
+
+        names = {c["name"] for c in batch["components"]}
+
+        return [os.path.join(batch_dir, d) for d in sorted(os.listdir(batch_dir)) if os.path.isdir(os.path.join(batch_dir, d)) and d not in names]
+
     def find_and_set_resume_point(self):
         # TODO this is too big i need to rewrite it and put it into smaller chunks, rewrite this
         # using os.walk()
@@ -1055,6 +2230,7 @@ class MockBuildroot:
         srpm_path,
         components_callback=None,
         artifacts_callback=None,
+        resources=None,
     ):
 
         self.finished = False
@@ -1064,6 +2240,7 @@ class MockBuildroot:
         self.modularity_label = modularity_label
         self.rpm_suffix = rpm_suffix
         self.result_dir_path = self._create_buildroot_result_dir()
+        self.mock_cfg = mock_cfg
         self.mock_cfg_path = mock_cfg.write_config(self.result_dir_path, self.component["name"])
         self.batch_repo = batch_repo
         self.external_repos = external_repos
@@ -1073,6 +2250,7 @@ class MockBuildroot:
         self.pool_mode = True if components_callback is not None else None
         self.artifacts_callback = artifacts_callback
         self.components_callback = components_callback
+        self.resources = resources
 
     def run(self):
         # To have at least some kind of knowlage of what is currently going in queue
@@ -1080,6 +2258,31 @@ class MockBuildroot:
         if self.components_callback is not None:
             self.components_callback.append(self.component["name"])
 
+        # The parallelism of the build is decided when the buildroot starts, so buildroots
+        # started later in the batch get the CPUs of the buildroots which already finished.
+        tmpfs_size = None
+        rootdir = None
+        if self.rootdir:
+            rootdir = self.resources.acquire_rootdir(self.rootdir) if self.resources else self.rootdir[0]
+
+        if self.resources:
+            self.mock_cfg.add_macros(self.resources.get_smp_macros())
+
+            # the memory used by tmpfs is counted against the memory budget of the batch
+            if self.mock_cfg.tmpfs_size:
+                if self.resources.reserve_tmpfs(self.mock_cfg.tmpfs_size):
+                    tmpfs_size = self.mock_cfg.tmpfs_size
+                    logger.info(f"Buildroot for component '{self.component['name']}' will be created on tmpfs ({tmpfs_size}MB).")
+                else:
+                    logger.info(f"Not enough memory for a tmpfs buildroot for component '{self.component['name']}'. Using disk.")
+                    self.mock_cfg.disable_tmpfs()
+
+            self.mock_cfg_path = self.mock_cfg.write_config(self.result_dir_path, self.component["name"])
+
+        # every buildroot which runs at the same time needs its own chroot. The same component
+        # can be built by other contexts, versions or architectures in the same pool.
+        unique_ext = "-".join([self.component["name"]] + self.modularity_label.split(":")[2:])
+
         mock_cmd = [
             "mock",
             "-v",
@@ -1089,15 +2292,20 @@ class MockBuildroot:
             "--define=modularitylabel {label}".format(label=self.modularity_label),
             "--define=dist {rpm_suffix}".format(rpm_suffix=self.rpm_suffix),
             "--addrepo={repo}".format(repo=self.batch_repo),
-            f"--uniqueext={self.component['name']}",
+            f"--uniqueext={unique_ext}",
         ]
 
         if self.external_repos:
             for repo in self.external_repos:
-                mock_cmd.append("--addrepo=file://{repo}".format(repo=repo))
+                # remote build agents get the external repos as URLs
+                if "://" not in repo:
+                    repo = "file://{repo}".format(repo=repo)
+                mock_cmd.append("--addrepo={repo}".format(repo=repo))
 
-        if self.rootdir:
-            mock_cmd.append("--rootdir={rootdir}".format(rootdir=self.rootdir))
+        if rootdir:
+            # `--rootdir` is the path of the chroot itself, it is named like the default chroots of mock
+            chroot = "{root}-{unique_ext}".format(root=self.mock_cfg.get_root_name(), unique_ext=unique_ext)
+            mock_cmd.append("--rootdir={rootdir}".format(rootdir=os.path.join(rootdir, chroot)))
 
         if self.srpm_path:
             mock_cmd.append(self.srpm_path)
@@ -1112,9 +2320,18 @@ class MockBuildroot:
         msg = "The 'stdout' of the mock buildroot process is written to: {path}".format(path=stdout_log_file_path)
         logger.info(msg)
 
-        with open(stdout_log_file_path, "w") as f:
-            proc = subprocess.Popen(mock_cmd, stdout=f, stderr=f, universal_newlines=True)
-        out, err = proc.communicate()
+        start = monotonic()
+        try:
+            with open(stdout_log_file_path, "w") as f:
+                proc = subprocess.Popen(mock_cmd, stdout=f, stderr=f, universal_newlines=True)
+            out, err = proc.communicate()
+        finally:
+            if self.resources:
+                self.resources.release(tmpfs_size, rootdir)
+
+        # the duration is used by `--plan` to estimate future builds of the component
+        with open(os.path.join(self.result_dir_path, DURATION_FILENAME), "w") as f:
+            f.write(str(monotonic() - start))
 
         # We don't won't any exceptions in Multithread mode
         if proc.returncode != 0 and not self.pool_mode:
@@ -1176,13 +2393,24 @@ class MockBuildroot:
 
 
 class MockBuildPool:
-    def __init__(self, workers):
-        self.manager = Manager()
-        self.pool = Pool(workers)
+    def __init__(self, workers, jobs, pool=None, manager=None, resources=None, on_finished=None, name=None):
+        # when a pool is provided it is shared with other builds and it is not closed by `wait`
+        self.shared = pool is not None
+        # the resources of a shared pool are shared as well, they get the jobs one by one
+        self.shared_resources = resources is not None
+        # called with the artifacts of every successfully built component
+        self.on_finished = on_finished
+        # the progress of a shared pool is logged under this name instead of being printed
+        self.name = name
+        self.result_dirs = {}
+        self.manager = manager or Manager()
+        self.pool = pool or Pool(workers)
+        self.results = []
         self.currently_running = self.manager.list()  # currently running tasks in pool
         self.all_tasks = 0  # number of submitted taks to pool
         self.finished_tasks = 0  # number of finished tasks
         self.artifacts = self.manager.list()
+        self.resources = resources or MockBuildResources(workers, jobs, manager=self.manager)  # CPU budget of the buildroots
         self._failed = 0
 
     # We need it to be as attr to be able to override in test
@@ -1198,12 +2426,17 @@ class MockBuildPool:
     def add_job(self, *args):
         """Adds job to the queue."""
         self.all_tasks += 1
-        self.pool.apply_async(
-            MockBuildroot(*(*args, self.currently_running, self.artifacts)).run,
+        if self.shared_resources:
+            self.resources.add_job()
+        buildroot = MockBuildroot(*args, self.currently_running, self.artifacts, resources=self.resources)
+        self.result_dirs[buildroot.component["name"]] = buildroot.result_dir_path
+        result = self.pool.apply_async(
+            buildroot.run,
             (),
-            callback=self.callback,
-            error_callback=self.callback_error,
+            callback=bind_build_context(self.callback),
+            error_callback=bind_build_context(self.callback_error),
         )
+        self.results.append(result)
         self.update_progress()
 
     def callback(self, result):
@@ -1216,12 +2449,24 @@ class MockBuildPool:
         compoment, result = result
         self.currently_running.remove(compoment)
         if result:
-            self.finished_tasks += 1
+            try:
+                self._finish_component(compoment)
+            except Exception as e:
+                # an exception in the callback would never let the pool finish
+                logger.error(f"Processing the artifacts of component '{compoment}' failed: {e}")
+                self._failed += 1
+            else:
+                self.finished_tasks += 1
         else:
             self._failed += 1
         self.update_progress()
 
-    def callback_error(self):
+    def _finish_component(self, component):
+        if self.on_finished:
+            result_dir_path = self.result_dirs[component]
+            self.on_finished([os.path.join(result_dir_path, f) for f in os.listdir(result_dir_path) if f.endswith("rpm")])
+
+    def callback_error(self, error=None):
         """
         Handle exception from different process. This should never happend
         but it might if exception is thrown in Buildroot. We add failure to avoid
@@ -1231,9 +2476,15 @@ class MockBuildPool:
         self.update_progress()
 
     def update_progress(self):
-        """It updates stdout with current pool information"""
+        """It updates stdout with current pool information. The builds sharing a pool would
+        overwrite the lines of each other, so a shared pool logs it instead."""
         sleep(0.2)  # This is here because Manager() is slow
         status_numbers = f"{self.finished_tasks}/{self.failed}/{self.all_tasks-self.failed-self.finished_tasks}"
+
+        if self.shared:
+            logger.info(f"Finished/Failed/Queue of {self.name or 'the pool'} ({status_numbers}): {list(self.currently_running)}")
+            return
+
         stdout.write("\033[K")
         print(
             f"Finished/Failed/Queue ({status_numbers}): {self.currently_running}",
@@ -1243,5 +2494,9 @@ class MockBuildPool:
 
     def wait(self):
         """Waits for all tasks in pool to finish"""
-        self.pool.close()
-        self.pool.join()
+        if self.shared:
+            for result in self.results:
+                result.wait()
+        else:
+            self.pool.close()
+            self.pool.join()
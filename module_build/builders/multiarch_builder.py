@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Manager, Pool
+
+from module_build.builders.mock_builder import MockBuilder
+from module_build.cache import BuildCache
+from module_build.constants import WORKERS_AUTO
+from module_build.log import bind_build_context, logger
+from module_build.mock.resources import MockBuildResources, get_auto_workers
+from module_build.stream import ModuleStream
+
+
+class MultiArchBuilder:
+    """
+    Builds a module stream for several architectures at the same time. Every architecture is
+    built by its own `MockBuilder` from its own mock config, so every architecture has its own
+    context dirs, batch repos and final repos. All the builders share one worker pool with one
+    budget of the host resources, one cache and the SRPM mapping, so the SRPMs built from SCM are
+    built only once for all of them.
+    """
+
+    def __init__(self, mock_cfg_paths, workdir, external_repos, rootdir, srpm_dir, workers, cache=None, process_pool=None,
+                 combined_repo=False, **kwargs):
+        self.workers = workers
+        # the combined repo has the final repos of all architectures, so it is not created by
+        # the builders of the architectures
+        self.combined_repo = combined_repo
+        self.cache = cache or BuildCache()
+        # a long living `multiprocessing.Pool`, `Manager` and `MockBuildResources` shared with other builds
+        self.process_pool = process_pool
+        self.builders = []
+
+        for mock_cfg_path in mock_cfg_paths:
+            builder = MockBuilder(
+                mock_cfg_path,
+                workdir,
+                external_repos,
+                rootdir,
+                # the SRPMs are mapped only once
+                None if self.builders else srpm_dir,
+                workers,
+                cache=self.cache,
+                **kwargs,
+            )
+
+            if self.builders:
+                builder.srpm_dir = srpm_dir
+                builder.mock_info = self.builders[0].mock_info
+                builder.scm_srpms = self.builders[0].scm_srpms
+                builder.scm_srpms_lock = self.builders[0].scm_srpms_lock
+
+            # the SRPMs built from SCM are built once for all the architectures
+            builder.share_scm_srpms = True
+
+            self.builders.append(builder)
+
+    def build(self, module_stream, resume, context_to_build=None, rebuild=None):
+        arches = {}
+        for builder in self.builders:
+            arch = builder.get_mock_cfg(module_stream.version).get("target_arch")
+
+            if arch in arches:
+                raise Exception(
+                    "The mock configs '{first}' and '{second}' build the same architecture '{arch}'!".format(
+                        first=arches[arch], second=builder.mock_cfg_path, arch=arch
+                    )
+                )
+            arches[arch] = builder.mock_cfg_path
+
+        msg = "Building the module stream for architectures: {arches}".format(arches=", ".join(str(a) for a in arches))
+        logger.info(msg)
+
+        # the SRPMs built from SCM are discarded once, before any architecture reuses them
+        if rebuild and self.builders[0].shared_srpms:
+            self.builders[0].discard_scm_srpms(module_stream, rebuild)
+
+        # the remote workers build on their own hosts, so no local pool is needed
+        own_pool = not self.process_pool and not self.builders[0].remote_workers
+        process_pool = self.process_pool
+
+        if own_pool:
+            workers = self.workers
+            if workers == WORKERS_AUTO:
+                workers = get_auto_workers(len(module_stream.components) * len(self.builders), self.builders[0].rootdirs)
+
+            logger.info(f"Creating pool with {workers} mock workers shared by all architectures...")
+            manager = Manager()
+            # the buildroots of all architectures split the CPUs, memory and rootdirs of the host
+            process_pool = (Pool(workers), manager, MockBuildResources(workers, 0, manager=manager))
+
+        try:
+            with ThreadPoolExecutor(len(self.builders)) as executor:
+                futures = []
+
+                for index, builder in enumerate(self.builders):
+                    builder.process_pool = process_pool
+                    # every architecture sets its arch to the contexts of the module stream, so
+                    # each of them needs its own copy
+                    stream = ModuleStream(module_stream.mmd, module_stream.version) if index else module_stream
+                    futures.append(executor.submit(bind_build_context(builder.build), stream, resume, context_to_build, rebuild))
+
+                errors = [f.exception() for f in futures if f.exception()]
+        finally:
+            if own_pool:
+                pool, manager, _ = process_pool
+                pool.close()
+                pool.join()
+                manager.shutdown()
+
+        if errors:
+            raise errors[0]
+
+        if self.combined_repo:
+            build_contexts = [c for builder in self.builders for c in builder.build_contexts.values()]
+            self.builders[0].create_combined_repo(build_contexts)
+
+    def create_build_plan(self, module_stream, context_to_build=None):
+        """Creates the build plans of all the architectures.
+
+        :param module_stream: a module stream object
+        :type module_stream: :class:`module_build.stream.ModuleBuild` object
+        :param context_to_build: name of the only context which should be planned
+        :type context_to_build: str
+        :return: JSON serializable build plans of the architectures
+        :rtype: dict
+        """
+        plans = {}
+        for index, builder in enumerate(self.builders):
+            stream = ModuleStream(module_stream.mmd, module_stream.version) if index else module_stream
+            plan = builder.create_build_plan(stream, context_to_build)
+            plans[builder.arch] = plan
+
+        return {"arches": plans}
+
+    def update_srpm_mapping(self, paths):
+        """Updates the SRPM mapping shared by all the architectures.
+
+        :param paths: paths to the changed SRPM files
+        :type paths: list
+        :return: names of the components of the changed SRPMs
+        :rtype: set
+        """
+        return self.builders[0].update_srpm_mapping(paths)
+
+    def final_report(self):
+        for builder in self.builders:
+            builder.final_report()
@@ -0,0 +1,181 @@
+import struct
+
+RPM_LEAD_SIZE = 96
+RPM_LEAD_MAGIC = b"\xed\xab\xee\xdb"
+RPM_HEADER_MAGIC = b"\x8e\xad\xe8"
+
+RPMTAG_PROVIDENAME = 1047
+RPMTAG_REQUIREFLAGS = 1048
+RPMTAG_REQUIRENAME = 1049
+RPMTAG_REQUIREVERSION = 1050
+RPMTAG_DIRINDEXES = 1116
+RPMTAG_BASENAMES = 1117
+RPMTAG_DIRNAMES = 1118
+
+RPM_INT32_TYPE = 4
+RPM_STRING_TYPES = (6, 8, 9)
+
+
+def _read_header_section(f):
+    intro = f.read(16)
+    if len(intro) != 16 or intro[:3] != RPM_HEADER_MAGIC:
+        raise ValueError("Not a RPM header")
+
+    nindex, hsize = struct.unpack(">II", intro[8:])
+    index = f.read(nindex * 16)
+    store = f.read(hsize)
+
+    if len(index) != nindex * 16 or len(store) != hsize:
+        raise ValueError("Truncated RPM header")
+
+    return nindex, index, store
+
+
+def read_rpm_header(path, tags):
+    """Reads the values of tags from the main header of a RPM or SRPM file. Only the integer
+    and string tags are supported.
+
+    Args:
+        path (str): Path to the RPM file.
+        tags (list): Numbers of the tags to read.
+
+    Returns:
+        dict: Lists of the values of the found tags by the tag numbers. None if the file is not a
+            readable RPM file.
+    """
+    values = {}
+
+    try:
+        with open(path, "rb") as f:
+            if f.read(RPM_LEAD_SIZE)[:4] != RPM_LEAD_MAGIC:
+                return None
+
+            # the signature header is aligned to 8 bytes
+            _, _, store = _read_header_section(f)
+            f.read((8 - len(store) % 8) % 8)
+
+            nindex, index, store = _read_header_section(f)
+    except (OSError, ValueError):
+        return None
+
+    for i in range(nindex):
+        tag, tag_type, offset, count = struct.unpack_from(">IIII", index, i * 16)
+
+        if tag not in tags:
+            continue
+
+        if tag_type == RPM_INT32_TYPE:
+            values[tag] = list(struct.unpack_from(">{count}I".format(count=count), store, offset))
+        elif tag_type in RPM_STRING_TYPES:
+            strings = store[offset:].split(b"\x00", count)[:count]
+            values[tag] = [s.decode(errors="replace") for s in strings]
+
+    return values
+
+
+def get_srpm_buildrequires(path):
+    """Returns the BuildRequires of a SRPM.
+
+    Args:
+        path (str): Path to the SRPM file.
+
+    Returns:
+        set: Names of the required capabilities. None if the SRPM can't be read.
+    """
+    header = read_rpm_header(path, [RPMTAG_REQUIRENAME])
+    if header is None:
+        return None
+
+    return {r for r in header.get(RPMTAG_REQUIRENAME, []) if not r.startswith("rpmlib(")}
+
+
+def get_rpm_provides(path):
+    """Returns everything a binary RPM provides: its capabilities and its files.
+
+    Args:
+        path (str): Path to the RPM file.
+
+    Returns:
+        set: Provided capabilities and file paths. None if the RPM can't be read.
+    """
+    header = read_rpm_header(path, [RPMTAG_PROVIDENAME, RPMTAG_DIRINDEXES, RPMTAG_BASENAMES, RPMTAG_DIRNAMES])
+    if header is None:
+        return None
+
+    provides = set(header.get(RPMTAG_PROVIDENAME, []))
+    dirnames = header.get(RPMTAG_DIRNAMES, [])
+    for dirindex, basename in zip(header.get(RPMTAG_DIRINDEXES, []), header.get(RPMTAG_BASENAMES, [])):
+        provides.add(dirnames[dirindex] + basename)
+
+    return provides
+
+
+def derive_buildorder(components, requires, provides):
+    """Computes the buildorder of components from their BuildRequires and what the other
+    components provide. A component is built after a component which is declared in an earlier
+    batch and provides something it requires. All other components are built as early as
+    possible. Components which are declared in later or the same batch are never waited for, so
+    the declared buildorder of bootstrapping components is kept.
+
+    A component with unknown requires waits for all the components declared earlier and all
+    components declared later wait for a component with unknown provides.
+
+    Args:
+        components (list): Components of the module stream with their declared `buildorder`.
+        requires (dict): Sets of the BuildRequires of the components by their names. None when
+            the requires of a component are unknown.
+        provides (dict): Sets of the provides of the components by their names. None or
+            missing when the provides of a component are unknown.
+
+    Returns:
+        tuple: The derived buildorder of the components starting from 1 and the names of the
+            components every component waits for, both by the names of the components.
+    """
+    buildorder = {}
+    dependencies = {}
+
+    for component in sorted(components, key=lambda c: c["buildorder"]):
+        name = component["name"]
+        component_requires = requires.get(name)
+        dependencies[name] = []
+
+        for other in components:
+            if other["buildorder"] >= component["buildorder"]:
+                continue
+
+            other_provides = provides.get(other["name"])
+            if component_requires is None or other_provides is None or component_requires & other_provides:
+                dependencies[name].append(other["name"])
+
+        buildorder[name] = 1 + max((buildorder[d] for d in dependencies[name]), default=0)
+
+    return buildorder, dependencies
+
+
+def find_relaxed_components(components, buildorder, dependencies):
+    """Finds the components which are declared in a later batch than they need to be.
+
+    Args:
+        components (list): Components of the module stream with their declared `buildorder`.
+        buildorder (dict): Derived buildorder of the components by their names.
+        dependencies (dict): Names of the components every component waits for.
+
+    Returns:
+        list: `name`, `declared_batch`, `derived_batch` and `waits_for` of every such
+            component. The batches are numbered from 1.
+    """
+    declared_batches = {order: num for num, order in enumerate(sorted({c["buildorder"] for c in components}), 1)}
+    relaxed = []
+
+    for component in components:
+        declared_batch = declared_batches[component["buildorder"]]
+
+        if buildorder[component["name"]] < declared_batch:
+            relaxed.append({
+                "name": component["name"],
+                "declared_batch": declared_batch,
+                "derived_batch": buildorder[component["name"]],
+                "waits_for": dependencies[component["name"]],
+            })
+
+    return relaxed
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+
+
+def get_cache_dir():
+    """Returns the directory where the persistent cache of module-build is stored.
+
+    Returns:
+        str: Path to the cache directory.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+
+    return os.path.join(cache_home, "module-build")
+
+
+def get_file_digest(*paths):
+    """Computes a digest of the content of files.
+
+    Args:
+        paths (str): Paths to the files.
+
+    Returns:
+        str: SHA256 hex digest of the files. None if any of the files does not exist.
+    """
+    digest = hashlib.sha256()
+
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        except OSError:
+            return None
+
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    Cache of data which are expensive to load and are the same for many module builds. Every
+    `MockBuilder` has its own in-memory cache by default. The daemon mode shares one cache
+    between all build requests. Persistent values are also stored as JSON files in the cache
+    directory, so they are shared between all runs of module-build.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.memory = {}
+
+    def lookup(self, name, key, persistent=False):
+        """Returns a cached value.
+
+        Args:
+            name (str): Name of the cache, i. e. `repo_profiles`.
+            key (str, tuple): Key of the value. Persistent keys need to be strings.
+            persistent (bool, optional): Look also into the cache directory.
+
+        Returns:
+            The cached value or None if there is no such value.
+        """
+        if key is None:
+            return None
+
+        value = self.memory.get((name, key))
+
+        if value is None and persistent:
+            value = self._read(name, key)
+
+            if value is not None:
+                self.memory[(name, key)] = value
+
+        return value
+
+    def store(self, name, key, value, persistent=False):
+        """Stores a value in the cache.
+
+        Args:
+            name (str): Name of the cache, i. e. `repo_profiles`.
+            key (str, tuple): Key of the value. When None the value is not cached.
+            value: JSON serializable value.
+            persistent (bool, optional): Write the value also into the cache directory.
+        """
+        if key is None:
+            return
+
+        self.memory[(name, key)] = value
+
+        if persistent:
+            self._write(name, key, value)
+
+    def get(self, name, key, loader, persistent=False):
+        """Returns a cached value or loads and stores it.
+
+        Args:
+            name (str): Name of the cache, i. e. `repo_profiles`.
+            key (str, tuple): Key of the value. When None the value is not cached.
+            loader (callable): Function which loads the value.
+            persistent (bool, optional): Use also the cache directory.
+
+        Returns:
+            The cached or loaded value.
+        """
+        value = self.lookup(name, key, persistent)
+
+        if value is None:
+            value = loader()
+            self.store(name, key, value, persistent)
+
+        return value
+
+    def _get_path(self, name, key):
+        return os.path.join(self.cache_dir, name, f"{key}.json")
+
+    def _read(self, name, key):
+        try:
+            with open(self._get_path(name, key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name, key, value):
+        path = self._get_path(name, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        # the cache is shared by all module-build processes, so we never write a file in place
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(tmp_path, "w") as f:
+                json.dump(value, f)
+
+            os.replace(tmp_path, path)
+        except OSError:
+            # the cache is only an optimization, the build can continue without it
+            pass
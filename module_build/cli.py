@@ -1,14 +1,16 @@
 import argparse
+import json
 import os
 import pdb
 import sys
 import traceback
 
-from module_build.builders.mock_builder import MockBuilder
+from module_build.constants import WORKERS_AUTO
 from module_build.log import init_logging, logger
-from module_build.metadata import (generate_module_stream_version,
-                                   load_modulemd_file_from_path)
-from module_build.stream import ModuleStream
+
+# The builder, metadata and stream modules load libmodulemd and mock, which takes a noticeable
+# time. They are imported only when they are needed, so `--help` and the argument validation
+# stay fast.
 
 
 class FullPathAction(argparse.Action):
@@ -16,11 +18,11 @@ class FullPathAction(argparse.Action):
 
     def __call__(self, parser, args, values, option_string=None):
         full_path = self._get_full_path(values)
-        # `add_repo` should be an `append` action
-        if self.dest == "add_repo":
-            add_repo = getattr(args, "add_repo")
-            add_repo.append(full_path)
-            setattr(args, self.dest, add_repo)
+        # `add_repo`, `rootdir` and `mock_cfg` should be an `append` action
+        if self.dest in ("add_repo", "rootdir", "mock_cfg"):
+            # the default list is shared by all parsed arguments, so we never modify it
+            paths = getattr(args, self.dest) + [full_path]
+            setattr(args, self.dest, paths)
         else:
             setattr(args, self.dest, full_path)
 
@@ -34,6 +36,28 @@ class FullPathAction(argparse.Action):
         return full_path
 
 
+def parse_workers(value):
+    """Converts the value of `--workers` to the number of workers. `auto` is converted to
+    `WORKERS_AUTO`."""
+    if value == "auto":
+        return WORKERS_AUTO
+
+    workers = int(value)
+    if workers < 1:
+        raise argparse.ArgumentTypeError("the number of workers must be at least 1 or `auto`")
+
+    return workers
+
+
+def parse_components(value):
+    """Converts the comma separated value of `--rebuild` to a list of component names."""
+    components = [c.strip() for c in value.split(",") if c.strip()]
+    if not components:
+        raise argparse.ArgumentTypeError("at least one component name is required")
+
+    return components
+
+
 def get_arg_parser():
     description = """
         module-build is a command line utility which enables you to build modules locally.
@@ -48,10 +72,39 @@ def get_arg_parser():
     # group.add_argument("-g", "--git-branch", type=str,
     #                   help=("URL to the git branch where the modulemd yaml file resides."))
 
-    parser.add_argument("-c", "--mock-cfg", help="Path to the mock config.", default=".", type=str, required=True, action=FullPathAction)
+    parser.set_defaults(mock_cfg=[])
+    parser.add_argument(
+        "-c",
+        "--mock-cfg",
+        help=(
+            "Path to the mock config. Can be used multiple times, one mock config for every architecture. All the"
+            " architectures are built at the same time and share the workers."
+        ),
+        type=str,
+        required=True,
+        action=FullPathAction,
+    )
     parser.add_argument("-o", "--no-stdout", action="store_true", help="If set logger output in stdout will not be displayed.")
-    parser.add_argument("-w", "--workers", type=int, default=1, help="When set to value higher than 1, will use multiprocess mode.")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=parse_workers,
+        default=1,
+        help=(
+            "When set to value higher than 1, will use multiprocess mode. When set to `auto`, the number of workers is"
+            " selected for every batch from the CPUs, memory and free disk space of the host and the size of the batch."
+        ),
+    )
     parser.add_argument("-r", "--resume", action="store_true", help="If set it will try to continue the build where it failed last time.")
+    parser.add_argument(
+        "--rebuild",
+        type=parse_components,
+        metavar="COMPONENT[,COMPONENT...]",
+        help=(
+            "Rebuilds only the given components of an already built module stream version and all the components of"
+            " the later batches. The artifacts of the other components are reused. Requires -l/--module-version."
+        ),
+    )
 
     parser.add_argument(
         "-n",
@@ -102,24 +155,135 @@ def get_arg_parser():
         help=("With this option you can provide external RPM repositories to the buildroots of the module build. Can be used multiple times."),
     )
 
-    parser.add_argument("-t", "--rootdir", type=str, help=("Provides a new location for you buildroots."))
+    parser.set_defaults(rootdir=[])
+    parser.add_argument(
+        "-t",
+        "--rootdir",
+        type=str,
+        action=FullPathAction,
+        help=(
+            "Provides a new location for you buildroots. Can be used multiple times. When set multiple times, each"
+            " buildroot is placed in the location with the most free space per running buildroot."
+        ),
+    )
 
-    return parser
+    parser.set_defaults(remote_worker=[])
+    parser.add_argument(
+        "--remote-worker",
+        type=str,
+        action="append",
+        metavar="URL",
+        help=(
+            "URL of a `module-build-agent` running on another host, i. e. http://host:8710. Can be used multiple times."
+            " When set, all buildroots are run on the remote agents instead of the local host. The token of the agents"
+            " must be set in the MODULE_BUILD_REMOTE_TOKEN environment variable."
+        ),
+    )
 
+    parser.add_argument(
+        "--serve-address",
+        type=str,
+        metavar="HOST[:PORT]",
+        help=(
+            "Address under which the remote agents can download the build repositories and SRPMs from this host."
+            " The repositories are served only on this address. Defaults to the loopback interface and a random port,"
+            " so the agents on other hosts require it."
+        ),
+    )
 
-def main():
-    parser = get_arg_parser()
-    args = parser.parse_args()
+    parser.add_argument(
+        "--daemon-socket",
+        type=str,
+        action=FullPathAction,
+        metavar="PATH",
+        help=(
+            "Path to the Unix socket of a running `module-build-daemon`. When set, the build is done by the daemon,"
+            " which keeps the loaded libraries, mock configs and repo metadata between builds."
+        ),
+    )
 
-    if args.resume and args.module_version is None:
-        parser.error("when using -r/--resume you need also set -l/--module-version so we can can identify which contexts build need to be resumed.")
+    parser.add_argument(
+        "--tmpfs",
+        type=int,
+        metavar="MB",
+        help=(
+            "When set, buildroots of components which are expected to be smaller than the given size in MB will be"
+            " created on tmpfs. The expected size is estimated from the SRPM size, so it works only with -m/--srpm-dir."
+            " If there is not enough free memory when the buildroot starts, it will be created on disk."
+        ),
+    )
 
-    if args.workers > 1 and not args.no_stdout:
-        parser.error("Multiprocess mode requires disabling stdout output -o/--no-stdout.")
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help=(
+            "When set, nothing is built. The build plan of the module stream is printed to the stdout as JSON, with the"
+            " critical path and the makespan estimated for -w/--workers from the durations of previous builds."
+        ),
+    )
 
-    # TODO this needs to be updated when scm checkout will be added
-    yaml_filename = args.modulemd.split("/")[-1].rsplit(".", 1)[0]
-    init_logging(args.workdir, yaml_filename, logger, args.no_stdout)
+    parser.add_argument(
+        "--combined-repo",
+        action="store_true",
+        help=(
+            "When set, the final repos of all built contexts and architectures are combined into one repo in the"
+            " `combined_repo` dir of the working directory."
+        ),
+    )
+
+    parser.add_argument(
+        "--derive-buildorder",
+        action="store_true",
+        help=(
+            "When set, the buildorder is derived from the BuildRequires of the SRPMs in -m/--srpm-dir and from the"
+            " provides of the RPMs of previous builds in the working directory. Components are built as early as their"
+            " dependencies allow, but never before the components declared earlier which they depend on."
+        ),
+    )
+
+    parser.add_argument(
+        "--check-buildrequires",
+        action="store_true",
+        help=(
+            "When set, the BuildRequires of the SRPMs in -m/--srpm-dir are checked with libsolv before the build starts."
+            " They must be provided by the -p/--add-repo repos, the repos of the mock config or by the components of"
+            " the earlier batches. Requires the `python3-solv` package."
+        ),
+    )
+
+    parser.add_argument(
+        "--shared-srpms",
+        action="store_true",
+        help=(
+            "When set, the SRPM of every component is built from SCM only once before the build starts, in parallel."
+            " All the contexts and architectures build their RPMs from it instead of checking out and building the"
+            " SRPM in every buildroot."
+        ),
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "When set, module-build keeps running after the build and watches the modulemd file and the -m/--srpm-dir"
+            " for changes. The changed components and the components of their later batches are rebuilt."
+        ),
+    )
+
+    return parser
+
+
+def load_module_stream(args):
+    """Loads the module stream metadata provided by the user.
+
+    :param args: parsed command line arguments
+    :type args: :class:`argparse.Namespace`
+    :return: the module stream to build
+    :rtype: :class:`module_build.stream.ModuleStream`
+    """
+    from module_build.metadata import (generate_module_stream_version,
+                                       load_modulemd_file_from_path)
+    from module_build.stream import ModuleStream
 
     # PHASE1: Load metadata and configuration provided by the user
     logger.info("Processing provided module stream metadata...")
@@ -161,12 +325,91 @@ def main():
 
     logger.info(log_msg)
 
+    return module_stream
+
+
+def create_mock_builder(args, **kwargs):
+    """Creates the builder configured by the command line arguments.
+
+    :param args: parsed command line arguments
+    :type args: :class:`argparse.Namespace`
+    :param kwargs: additional keyword arguments for the builder
+    :return: the builder
+    :rtype: :class:`module_build.builders.mock_builder.MockBuilder` or
+        :class:`module_build.builders.multiarch_builder.MultiArchBuilder` for multiple mock configs
+    """
+    builder_args = (args.workdir, args.add_repo, args.rootdir, args.srpm_dir, args.workers)
+    kwargs.update(
+        tmpfs_size=args.tmpfs,
+        remote_workers=args.remote_worker,
+        serve_address=args.serve_address,
+        combined_repo=args.combined_repo,
+        derive_buildorder=args.derive_buildorder,
+        check_buildrequires=args.check_buildrequires,
+        shared_srpms=args.shared_srpms,
+    )
+
+    if len(args.mock_cfg) > 1:
+        from module_build.builders.multiarch_builder import MultiArchBuilder
+
+        return MultiArchBuilder(args.mock_cfg, *builder_args, **kwargs)
+
+    from module_build.builders.mock_builder import MockBuilder
+
+    return MockBuilder(args.mock_cfg[0], *builder_args, **kwargs)
+
+
+def main():
+    parser = get_arg_parser()
+    args = parser.parse_args()
+
+    if args.resume and args.module_version is None:
+        parser.error("when using -r/--resume you need also set -l/--module-version so we can can identify which contexts build need to be resumed.")
+
+    if args.rebuild and args.module_version is None:
+        parser.error("when using --rebuild you need also set -l/--module-version so we can identify which contexts need to be rebuilt.")
+
+    if args.rebuild and args.resume:
+        parser.error("-r/--resume and --rebuild can't be used together.")
+
+    if args.derive_buildorder and not args.srpm_dir:
+        parser.error("--derive-buildorder requires the SRPMs of the components in -m/--srpm-dir.")
+
+    if args.check_buildrequires and not args.srpm_dir:
+        parser.error("--check-buildrequires requires the SRPMs of the components in -m/--srpm-dir.")
+
+    if args.shared_srpms and (args.srpm_dir or args.remote_worker):
+        parser.error("--shared-srpms can't be used together with -m/--srpm-dir or --remote-worker.")
+
+    if args.watch and (args.daemon_socket or args.plan):
+        parser.error("--watch can't be used together with --daemon-socket or --plan.")
+
+    if args.workers != 1 and not args.no_stdout and not args.plan:
+        parser.error("Multiprocess mode requires disabling stdout output -o/--no-stdout.")
+
+    if args.daemon_socket and not args.plan:
+        from module_build.daemon import submit_build
+
+        sys.exit(submit_build(args.daemon_socket, args))
+
+    # TODO this needs to be updated when scm checkout will be added
+    yaml_filename = args.modulemd.split("/")[-1].rsplit(".", 1)[0]
+    # the stdout of `--plan` is only the JSON plan
+    init_logging(args.workdir, yaml_filename, logger, args.no_stdout or args.plan)
+
+    module_stream = load_module_stream(args)
+
     # TODO add exceptions
-    mock_builder = MockBuilder(args.mock_cfg, args.workdir, args.add_repo, args.rootdir, args.srpm_dir, args.workers)
+    mock_builder = create_mock_builder(args)
+
+    if args.plan:
+        plan = mock_builder.create_build_plan(module_stream, context_to_build=args.module_context)
+        print(json.dumps(plan, indent=4))
+        return
 
     # PHASE3: try to build the module stream
     try:
-        mock_builder.build(module_stream, args.resume, context_to_build=args.module_context)
+        mock_builder.build(module_stream, args.resume, context_to_build=args.module_context, rebuild=args.rebuild)
     except Exception:
         formated_tb = traceback.format_exc()
         exc_info = sys.exc_info()
@@ -186,6 +429,9 @@ def main():
             logger.info(msg)
 
             pdb.set_trace()
+        elif args.watch:
+            # the failed components are rebuilt when they are changed
+            logger.error(formated_tb)
         else:
             print(formated_tb)
             raise exc_info[1]
@@ -194,6 +440,11 @@ def main():
     # TODO implement final_report
     mock_builder.final_report()
 
+    if args.watch:
+        from module_build.watch import watch
+
+        watch(args, mock_builder, module_stream)
+
 
 if __name__ == "__main__":
     main()
@@ -7,10 +7,71 @@ KEY_SCM_BRANCH = "config_opts['scm_opts']['branch']"
 KEY_MODULE_INSTALL = "config_opts['module_install']"
 KEY_MODULE_ENABLE = "config_opts['module_enable']"
 KEY_MACROS_PREFIX = "config_opts['macros']"
+KEY_TMPFS_PREFIX_ALL = "config_opts['plugin_conf']['tmpfs"
+KEY_TMPFS_ENABLE = "config_opts['plugin_conf']['tmpfs_enable']"
+KEY_TMPFS_REQUIRED_RAM = "config_opts['plugin_conf']['tmpfs_opts']['required_ram_mb']"
+KEY_TMPFS_MAX_SIZE = "config_opts['plugin_conf']['tmpfs_opts']['max_fs_size']"
+KEY_TMPFS_MODE = "config_opts['plugin_conf']['tmpfs_opts']['mode']"
+KEY_TMPFS_KEEP_MOUNTED = "config_opts['plugin_conf']['tmpfs_opts']['keep_mounted']"
+KEY_YUM_CACHE_ENABLE = "config_opts['plugin_conf']['yum_cache_enable']"
+KEY_DNF_COMMON_OPTS = "config_opts['dnf_common_opts']"
 
 # Mock
 SRPM_EXTENSION = "src.rpm"
 SPEC_EXTENSION = ".spec"
 
+# Resources
+# size of a buildroot without the sources and build artifacts of the component
+TMPFS_BASE_SIZE_MB = 2048
+# how many times bigger the build tree of a component is compared to its SRPM
+TMPFS_SRPM_SIZE_FACTOR = 8
+# which part of the available memory can be used by tmpfs buildroots
+TMPFS_MEMORY_RATIO = 0.75
+# `--workers auto` starts a buildroot for every this many CPUs, MB of memory and MB of free disk
+AUTO_WORKER_CPUS = 2
+AUTO_WORKER_MEMORY_MB = 3072
+AUTO_WORKER_DISK_MB = 8192
+# the value of `workers` which selects the number of workers automatically for every batch
+WORKERS_AUTO = 0
+# where mock creates the buildroots when no rootdir is set
+MOCK_DEFAULT_ROOTDIR = "/var/lib/mock"
+# options of the mock config provided by the user which are read by the builder
+MOCK_CONFIG_OPTIONS = ("dist", "target_arch", "root", "releasever", "dnf.conf")
+
+# Remote
+REMOTE_AGENT_PORT = 8710
+# seconds between two checks of the state of a remote job
+REMOTE_POLL_INTERVAL = 5
+# environment variable with the token shared by the remote agents and the builds which use them
+REMOTE_TOKEN_ENV = "MODULE_BUILD_REMOTE_TOKEN"
+# the only directory from which the remote agents load the mock configs included by the jobs
+MOCK_CONFIG_DIR = "/etc/mock"
+
+# Plan
+# seconds which a component is expected to build when there is no recorded build of it
+PLAN_DEFAULT_DURATION = 600
+# file in the result dir of a component with the duration of its mock build in seconds
+DURATION_FILENAME = "duration"
+
+# Buildorder
+# the buildorder derived by `--derive-buildorder`, placed in the working directory. It is reused
+# when the build is resumed, so the batches of the resumed build stay the same.
+DERIVED_BUILDORDER_FILENAME = "{name}:{stream}:{version}:{arch}.buildorder.json"
+
+# Watch
+# seconds between two checks of the watched files by `--watch`
+WATCH_INTERVAL = 2
+
 SRPM_MAPPING_FILENAME = "srpm_mapping"
 ROOT_BATCH_FOLDER = "build_batches"
+# SRPMs built from SCM once for all contexts and architectures, placed in the working directory
+SCM_SRPM_FOLDER = "srpms"
+# metadata of the repos of the mock configs downloaded by dnf, placed in the working directory
+REPOS_METADATA_FOLDER = "repos"
+# repo with the final repos of all contexts and architectures, placed in the working directory
+COMBINED_REPO_FOLDER = "combined_repo"
+# createrepo_c options of the repos which are used only by the buildroots of the build
+CREATEREPO_INTERMEDIATE_OPTIONS = ["--update", "--no-database"]
+# all finished batches of a context are provided to the next batch as one module stream
+BATCH_MODULE_NAME = "batches"
+BATCH_MODULE_STREAM = "cumulative"
@@ -0,0 +1,205 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import traceback
+import uuid
+from multiprocessing import Manager, Pool
+
+from module_build import cli
+from module_build.cache import BuildCache
+from module_build.log import current_build, init_logging, logger
+from module_build.mock.resources import MockBuildResources
+
+
+def _send(wfile, data):
+    wfile.write((json.dumps(data) + "\n").encode())
+    wfile.flush()
+
+
+class BuildFilter(logging.Filter):
+    """Lets through only log records of one build request. The records emitted by the threads
+    of the build belong to it when their callables are bound by `bind_build_context`."""
+
+    def __init__(self, build_id):
+        super().__init__()
+        self.build_id = build_id
+
+    def filter(self, record):
+        return current_build.get() == self.build_id
+
+
+class ClientLogHandler(logging.Handler):
+    """Sends the log records of a build request back to the client."""
+
+    def __init__(self, wfile):
+        super().__init__()
+        self.wfile = wfile
+
+    def emit(self, record):
+        try:
+            _send(self.wfile, {"log": self.format(record)})
+        except OSError:
+            # the client disconnected, the build continues anyway
+            pass
+
+
+class BuildRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        args = argparse.Namespace(**request["args"])
+
+        self.server.build_daemon.run_build(args, self.wfile)
+
+
+class BuildDaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class BuildDaemon:
+    """
+    Long running process which builds module streams requested over a Unix socket. All the
+    requests share one worker pool with one budget of the host resources and one cache of the
+    mock configs and repo metadata.
+    """
+
+    def __init__(self, socket_path, workers):
+        self.socket_path = socket_path
+        self.workers = workers
+        self.cache = BuildCache()
+        self.manager = Manager()
+        self.pool = Pool(workers)
+        # the buildroots of all requests split the CPUs, memory and rootdirs of the host
+        self.resources = MockBuildResources(workers, 0, manager=self.manager)
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        # only the user who runs the daemon can submit builds
+        umask = os.umask(0o177)
+        try:
+            self.server = BuildDaemonServer(socket_path, BuildRequestHandler)
+        finally:
+            os.umask(umask)
+        self.server.build_daemon = self
+
+    def serve_forever(self):
+        logger.info(f"Build daemon with {self.workers} workers listening on: {self.socket_path}")
+
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self.pool.close()
+            self.pool.join()
+            self.manager.shutdown()
+            os.remove(self.socket_path)
+
+    def run_build(self, args, wfile):
+        """Builds a module stream and reports the progress to the client.
+
+        Args:
+            args (argparse.Namespace): Parsed command line arguments of the client.
+            wfile (file): Stream to the client.
+        """
+        yaml_filename = args.modulemd.split("/")[-1].rsplit(".", 1)[0]
+        # the logs of other requests running in parallel must not get into the log of this one
+        handlers = init_logging(args.workdir, yaml_filename, logger, True)
+        client_handler = ClientLogHandler(wfile)
+        client_handler.setFormatter(handlers[0].formatter)
+        handlers.append(client_handler)
+        logger.addHandler(client_handler)
+
+        build_id = uuid.uuid4().hex
+        build_token = current_build.set(build_id)
+        request_filter = BuildFilter(build_id)
+        for handler in handlers:
+            handler.addFilter(request_filter)
+
+        # the buildroots of all requests run in the pool of the daemon
+        args.workers = self.workers
+
+        try:
+            module_stream = cli.load_module_stream(args)
+            mock_builder = cli.create_mock_builder(args, cache=self.cache, process_pool=(self.pool, self.manager, self.resources))
+            mock_builder.build(module_stream, args.resume, context_to_build=args.module_context, rebuild=args.rebuild)
+            mock_builder.final_report()
+        except Exception as e:
+            logger.error(traceback.format_exc())
+            _send(wfile, {"state": "failed", "error": str(e)})
+        else:
+            _send(wfile, {"state": "finished"})
+        finally:
+            for handler in handlers:
+                logger.removeHandler(handler)
+                handler.close()
+
+            current_build.reset(build_token)
+
+
+def submit_build(socket_path, args):
+    """Submits a build to the daemon and waits until it finishes.
+
+    Args:
+        socket_path (str): Path to the Unix socket of the daemon.
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        int: Exit code of the build.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        stream = sock.makefile("rwb")
+        _send(stream, {"args": vars(args)})
+
+        for line in stream:
+            msg = json.loads(line)
+
+            if "log" in msg:
+                if not args.no_stdout:
+                    print(msg["log"])
+            elif msg["state"] == "failed":
+                print(f"The build failed: {msg['error']}")
+                return 1
+            else:
+                return 0
+
+    print("The connection to the build daemon was closed unexpectedly.")
+    return 1
+
+
+def get_arg_parser():
+    description = """
+        module-build-daemon builds module streams requested by `module-build --daemon-socket`.
+        It keeps the loaded libraries, mock configs and repo metadata between the builds.
+        """
+    parser = argparse.ArgumentParser("module-build-daemon", description=description, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("socket", type=str, help="Path to the Unix socket the daemon listens on.")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of buildroots running at the same time for all builds.")
+
+    return parser
+
+
+def main():
+    parser = get_arg_parser()
+    args = parser.parse_args()
+
+    # the daemon output contains the logs of all build requests
+    logger.setLevel("INFO")
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
+    logger.addHandler(handler)
+
+    daemon = BuildDaemon(os.path.abspath(args.socket), args.workers)
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import os
+import xml.etree.ElementTree as ElementTree
+
+from module_build.buildorder import (RPMTAG_REQUIREFLAGS, RPMTAG_REQUIRENAME,
+                                     RPMTAG_REQUIREVERSION, read_rpm_header)
+
+# libsolv is an optional dependency, it is needed only by `--check-buildrequires`
+try:
+    import solv
+except ImportError:
+    solv = None
+
+RPMSENSE_LESS = 0x02
+RPMSENSE_GREATER = 0x04
+RPMSENSE_EQUAL = 0x08
+
+REPOMD_NAMESPACE = "{http://linux.duke.edu/metadata/repo}"
+# dnf often downloads only the zchunk variant of the primary metadata, libsolv reads both
+REPOMD_PRIMARY_TYPES = ("primary", "primary_zck")
+
+
+def get_srpm_buildrequires_deps(path):
+    """Returns the BuildRequires of a SRPM with their versions.
+
+    Args:
+        path (str): Path to the SRPM file.
+
+    Returns:
+        list: `(name, flags, version)` tuples of the BuildRequires. None if the SRPM can't be
+            read.
+    """
+    header = read_rpm_header(path, [RPMTAG_REQUIRENAME, RPMTAG_REQUIREFLAGS, RPMTAG_REQUIREVERSION])
+    if header is None:
+        return None
+
+    names = header.get(RPMTAG_REQUIRENAME, [])
+    flags = header.get(RPMTAG_REQUIREFLAGS, [0] * len(names))
+    versions = header.get(RPMTAG_REQUIREVERSION, [""] * len(names))
+
+    return [d for d in zip(names, flags, versions) if not d[0].startswith("rpmlib(")]
+
+
+def format_dep(dep):
+    """Formats a dependency the way it is written in a spec file.
+
+    Args:
+        dep (tuple): `(name, flags, version)` of the dependency.
+
+    Returns:
+        str: The dependency, i. e. `perl-devel >= 4:5.34`.
+    """
+    name, flags, version = dep
+    if not version:
+        return name
+
+    operator = ""
+    if flags & RPMSENSE_LESS:
+        operator += "<"
+    if flags & RPMSENSE_GREATER:
+        operator += ">"
+    if flags & RPMSENSE_EQUAL:
+        operator += "="
+
+    return "{name} {operator} {version}".format(name=name, operator=operator, version=version)
+
+
+def check_batches(batches, requires, get_providers, known):
+    """Checks that the BuildRequires of every component are provided by the repos or by the
+    components of the earlier batches.
+
+    Args:
+        batches (list): Lists of the names of the components of the batches in the buildorder.
+        requires (dict): Lists of the BuildRequires of the components by their names.
+        get_providers (callable): Returns for a BuildRequire a tuple: whether a repo provides it
+            and a set of the names of the components which provide it.
+        known (set): Names of the components whose provides are known, from a previous build
+            or from their packages in the repos.
+
+    Returns:
+        tuple: Strings describing the unsatisfiable BuildRequires and strings describing the
+            BuildRequires which may be provided only by earlier components with unknown provides.
+    """
+    unsatisfiable = []
+    unresolved = []
+    earlier = set()
+
+    for position, components in enumerate(batches, 1):
+        for name in components:
+            for dep in requires[name]:
+                in_repos, providers = get_providers(dep)
+
+                if in_repos or providers & earlier:
+                    continue
+
+                msg = "batch {num}: {name} requires '{dep}'".format(num=position, name=name, dep=format_dep(dep))
+
+                unknown = sorted(earlier - known)
+                if unknown:
+                    msg += ", which may be provided only by the earlier components {names} which were not built yet".format(names=unknown)
+                    unresolved.append(msg)
+                    continue
+
+                # a component of the module provides it, but too late
+                later_providers = sorted(providers - {name})
+                if later_providers:
+                    msg += ", which is provided only by the later or the same batch components {names}".format(names=later_providers)
+
+                unsatisfiable.append(msg)
+
+        earlier.update(components)
+
+    return unsatisfiable, unresolved
+
+
+def get_repomd_primary_path(repo_path):
+    """Finds the primary metadata of a repo. The zchunk variant is used when the plain primary
+    metadata file is not present.
+
+    Args:
+        repo_path (str): Path to the repo which contains the `repodata` dir.
+
+    Returns:
+        str: Path to the primary metadata file. None if the repo has no metadata.
+    """
+    try:
+        root = ElementTree.parse(os.path.join(repo_path, "repodata", "repomd.xml")).getroot()
+    except (OSError, ElementTree.ParseError):
+        return None
+
+    locations = {}
+    for data in root.iter(REPOMD_NAMESPACE + "data"):
+        location = data.find(REPOMD_NAMESPACE + "location")
+        if location is not None:
+            locations[data.get("type")] = os.path.join(repo_path, location.get("href"))
+
+    for data_type in REPOMD_PRIMARY_TYPES:
+        if data_type in locations and os.path.isfile(locations[data_type]):
+            return locations[data_type]
+
+    return None
+
+
+class BuildRequiresResolver:
+    """
+    Finds the providers of BuildRequires in RPM repos and in the RPMs of the components of a
+    module stream with libsolv. Only the packages which provide a BuildRequire directly are
+    looked up, the dependencies of the found packages are not resolved.
+    """
+
+    def __init__(self, arch):
+        if solv is None:
+            raise Exception("Checking of the BuildRequires requires libsolv. Please install the `python3-solv` package.")
+
+        self.pool = solv.Pool()
+        self.pool.setarch(arch)
+        self.components = {}
+        self.prepared = False
+
+    def add_repo(self, repo_path):
+        """Adds the packages of a repo created by `createrepo_c`.
+
+        Args:
+            repo_path (str): Path to the repo which contains the `repodata` dir.
+
+        Returns:
+            bool: True if the repo was added.
+        """
+        primary_path = get_repomd_primary_path(repo_path)
+        if not primary_path:
+            return False
+
+        f = solv.xfopen(primary_path)
+        if not f:
+            return False
+
+        repo = self.pool.add_repo(repo_path)
+        repo.add_rpmmd(f, None)
+        f.close()
+
+        return True
+
+    def get_source_provides(self, names):
+        """Finds what the packages in the repos built from the source packages of components
+        provide. It is the best guess of the provides of components which were not built yet.
+
+        Args:
+            names (list): Names of the components.
+
+        Returns:
+            dict: Sets of the provided capabilities and files by the names of the components
+                whose packages are in the repos.
+        """
+        names = set(names)
+        provides = {}
+
+        for solvable in self.pool.solvables:
+            if solvable.repo.name in self.components:
+                continue
+
+            sourcepkg = solvable.lookup_sourcepkg()
+            name = sourcepkg.rsplit("-", 2)[0] if sourcepkg else None
+            if name not in names:
+                continue
+
+            component_provides = provides.setdefault(name, set())
+            component_provides.update(d.str().split(" ")[0] for d in solvable.lookup_deparray(solv.SOLVABLE_PROVIDES))
+            component_provides.update(d.str for d in solvable.Dataiterator(solv.SOLVABLE_FILELIST, None, solv.Dataiterator.SEARCH_FILES))
+
+        return provides
+
+    def add_component(self, name, rpm_paths):
+        """Adds the built RPMs of a component. A component which was not built yet provides
+        only its name.
+
+        Args:
+            name (str): Name of the component.
+            rpm_paths (list): Paths to the binary RPMs of the component.
+        """
+        repo = self.pool.add_repo("component:" + name)
+        self.components[repo.name] = name
+
+        for rpm_path in rpm_paths:
+            repo.add_rpm(rpm_path)
+
+        if not rpm_paths:
+            solvable = repo.add_solvable()
+            solvable.name = name
+            solvable.evr = ""
+            solvable.arch = "noarch"
+            solvable.add_deparray(solv.SOLVABLE_PROVIDES, self.pool.Dep(name))
+
+    def get_providers(self, dep):
+        """Finds the providers of a BuildRequire.
+
+        Args:
+            dep (tuple): `(name, flags, version)` of the BuildRequire.
+
+        Returns:
+            tuple: Whether a repo provides it and a set of the names of the components which
+                provide it.
+        """
+        if not self.prepared:
+            self.pool.addfileprovides()
+            self.pool.createwhatprovides()
+            self.prepared = True
+
+        name, flags, version = dep
+
+        if name.startswith("("):
+            solv_dep = self.pool.parserpmrichdep(name)
+        else:
+            solv_dep = self.pool.Dep(name)
+
+            if version:
+                rel = 0
+                if flags & RPMSENSE_LESS:
+                    rel |= solv.REL_LT
+                if flags & RPMSENSE_GREATER:
+                    rel |= solv.REL_GT
+                if flags & RPMSENSE_EQUAL:
+                    rel |= solv.REL_EQ
+                solv_dep = solv_dep.Rel(rel, self.pool.Dep(version))
+
+        if not solv_dep:
+            return False, set()
+
+        in_repos = False
+        components = set()
+        for solvable in self.pool.whatprovides(solv_dep):
+            if solvable.repo.name in self.components:
+                components.add(self.components[solvable.repo.name])
+            else:
+                in_repos = True
+
+        return in_repos, components
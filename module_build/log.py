@@ -1,8 +1,30 @@
+import contextvars
 import logging
 import sys
 import time
 
 logger = logging.getLogger("module-build")
+# ID of the build which runs the current code. The daemon uses it to separate the logs of the
+# builds which run at the same time.
+current_build = contextvars.ContextVar("current_build", default=None)
+
+
+def bind_build_context(func):
+    """Binds a callable which will be called from another thread to the current build, so the
+    log records it emits belong to the build.
+
+    Args:
+        func (callable): The callable.
+
+    Returns:
+        callable: The callable which runs in a copy of the current context.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
 
 
 def init_logging(cwd, yaml_filename, logger, no_stdout):
@@ -17,6 +39,7 @@ def init_logging(cwd, yaml_filename, logger, no_stdout):
     main_log_handle.setFormatter(log_formatter)
 
     logger.addHandler(main_log_handle)
+    handlers = [main_log_handle]
 
     if not no_stdout:
         # at the same time we want to write to stdout
@@ -24,3 +47,6 @@ def init_logging(cwd, yaml_filename, logger, no_stdout):
         cli_handler.setFormatter(log_formatter)
 
         logger.addHandler(cli_handler)
+        handlers.append(cli_handler)
+
+    return handlers
@@ -92,7 +92,20 @@ def generate_and_populate_output_mmd(name, stream, context, version, description
 
 def mmd_to_str(mmd):
 
+    return create_module_index([mmd]).dump_to_string()
+
+
+def create_module_index(mmds):
+    """Creates a module index, the content of the modules.yaml file of a repo.
+
+    :param mmds: module streams of the repo
+    :type mmds: list
+    :return: module index with the module streams
+    :rtype: :class:`Modulemd.ModuleIndex` instance
+    """
     index = Modulemd.ModuleIndex()
-    index.add_module_stream(mmd)
 
-    return index.dump_to_string()
+    for mmd in mmds:
+        index.add_module_stream(mmd)
+
+    return index
@@ -1,4 +1,10 @@
+import ast
+import hashlib
+import os
+import re
+
 from module_build.constants import (
+    KEY_DNF_COMMON_OPTS,
     KEY_MACROS_PREFIX,
     KEY_MODULE_ENABLE,
     KEY_MODULE_INSTALL,
@@ -7,14 +13,114 @@ from module_build.constants import (
     KEY_SCM_METHOD,
     KEY_SCM_PACKAGE,
     KEY_SCM_PREFIX_ALL,
+    KEY_TMPFS_ENABLE,
+    KEY_TMPFS_KEEP_MOUNTED,
+    KEY_TMPFS_MAX_SIZE,
+    KEY_TMPFS_MODE,
+    KEY_TMPFS_PREFIX_ALL,
+    KEY_TMPFS_REQUIRED_RAM,
+    KEY_YUM_CACHE_ENABLE,
 )
 from module_build.log import logger
 
+INCLUDE_RE = re.compile(r"""^\s*include\(\s*['"]([^'"]+)['"]\s*\)""", re.MULTILINE)
+MACRO_KEY_RE = re.compile(r"^" + re.escape(KEY_MACROS_PREFIX) + r"\['[^'\\\s]+'\]$")
+# keeps the downloaded packages in the dnf cache shared by the buildroots
+KEEPCACHE_OPTS = f"{KEY_DNF_COMMON_OPTS} + ['--setopt=keepcache=True']"
+# keys which extend the options of the base config, so they are written after its include
+POST_INCLUDE_KEYS = {KEY_DNF_COMMON_OPTS}
+# all keys which `MockConfig` writes into the mock config
+MOCK_CONFIG_KEYS = {
+    KEY_DNF_COMMON_OPTS,
+    KEY_MODULE_ENABLE,
+    KEY_MODULE_INSTALL,
+    KEY_SCM_BRANCH,
+    KEY_SCM_ENABLE,
+    KEY_SCM_METHOD,
+    KEY_SCM_PACKAGE,
+    KEY_TMPFS_ENABLE,
+    KEY_TMPFS_KEEP_MOUNTED,
+    KEY_TMPFS_MAX_SIZE,
+    KEY_TMPFS_MODE,
+    KEY_TMPFS_REQUIRED_RAM,
+    KEY_YUM_CACHE_ENABLE,
+}
+
+
+def check_content(content):
+    """Checks that the content of a mock config received from another host has only the keys
+    written by `MockConfig` and that their values are plain literals. Mock configs are executed
+    as Python code, so anything else could run arbitrary code.
+
+    Args:
+        content (dict): The `content` of a serialized mock config.
+
+    Raises:
+        ValueError: If a key or a value is not allowed.
+    """
+    for key, value in content.items():
+        if key not in MOCK_CONFIG_KEYS and not MACRO_KEY_RE.match(key):
+            raise ValueError(f"The mock config key '{key}' is not allowed.")
+
+        if key == KEY_DNF_COMMON_OPTS:
+            if value != KEEPCACHE_OPTS:
+                raise ValueError(f"The value of the mock config key '{key}' is not allowed.")
+            continue
+
+        # the modules are stored as lists which are rendered with `repr`
+        if isinstance(value, list) and all(isinstance(v, str) for v in value):
+            continue
+
+        try:
+            ast.literal_eval(value)
+        except (ValueError, SyntaxError, TypeError):
+            raise ValueError(f"The value of the mock config key '{key}' is not a literal.")
+
+
+def get_config_files(mock_cfg_path):
+    """
+        Finds the mock config file and all the files it includes, recursively. Included paths
+        which are not absolute are relative to the directory of the mock config, the same way
+        as they are resolved by mock. The `site-defaults.cfg` file of that directory and the
+        config of the user are part of the result when they exist, as mock loads them too.
+
+    Args:
+        mock_cfg_path (str): Path to the mock config file.
+
+    Returns:
+        list: Paths of all files which make up the mock config.
+    """
+    config_dir = os.path.dirname(mock_cfg_path)
+    optional = [os.path.join(config_dir, "site-defaults.cfg"), os.path.expanduser("~/.config/mock.cfg")]
+    files = [f for f in optional if os.path.isfile(f)]
+    to_read = [mock_cfg_path]
+
+    while to_read:
+        path = to_read.pop(0)
+
+        if path in files:
+            continue
+
+        files.append(path)
+
+        try:
+            with open(path) as f:
+                content = f.read()
+        except OSError:
+            # the digest of a missing file is None, so the config will not be cached
+            continue
+
+        for include in INCLUDE_RE.findall(content):
+            to_read.append(os.path.join(config_dir, include))
+
+    return files
+
 
 class MockConfig:
     def __init__(self, mock_cfg_path):
         self.content = {}
         self.base_mock_cfg_path = mock_cfg_path
+        self.tmpfs_size = None
 
     def enable_modules(self, modules, to_install=False):
         """
@@ -58,6 +164,50 @@ class MockConfig:
             if k.startswith(KEY_SCM_PREFIX_ALL):
                 del self.content[k]
 
+    def enable_tmpfs(self, size):
+        """
+            Adds all neccessary options to mock config to create the buildroot on tmpfs. The
+            tmpfs can't grow over the size, which is reserved from the memory of the host.
+
+        Args:
+            size (int): Maximal size of the tmpfs in MB
+        """
+        self.content.update(
+            {
+                KEY_TMPFS_ENABLE: "True",
+                KEY_TMPFS_REQUIRED_RAM: f"{size}",
+                KEY_TMPFS_MAX_SIZE: f"'{size}m'",
+                KEY_TMPFS_MODE: "'0755'",
+                KEY_TMPFS_KEEP_MOUNTED: "False",
+            }
+        )
+        self.tmpfs_size = size
+
+    def disable_tmpfs(self):
+        """
+        Removes all tmpfs keys from mock config.
+        """
+        for k in list(self.content.keys()):
+            if k.startswith(KEY_TMPFS_PREFIX_ALL):
+                del self.content[k]
+
+        self.tmpfs_size = None
+
+    def enable_package_cache(self):
+        """
+            Keeps the downloaded packages in the dnf cache of mock. The mock `yum_cache` plugin
+            bind mounts `<cache_topdir>/<root>/dnf_cache` into every buildroot and holds a lock
+            on it while dnf runs, so concurrent buildroots can not corrupt it. The `--uniqueext`
+            of a buildroot does not change the cache path, so all buildroots of the root on the
+            host share the cache and a package is downloaded only once.
+        """
+        self.content.update(
+            {
+                KEY_YUM_CACHE_ENABLE: "True",
+                KEY_DNF_COMMON_OPTS: KEEPCACHE_OPTS,
+            }
+        )
+
     def add_macros(self, macros):
         """
             Add specified macros to mock config.
@@ -70,6 +220,71 @@ class MockConfig:
                 macro, value = m.split(" ")
                 self.content[f"{KEY_MACROS_PREFIX}['{macro}']"] = value
 
+    def get_root_name(self):
+        """
+            Returns the name of the mock root, which mock derives from the name of the base
+            mock config file.
+
+        Returns:
+            str: Name of the root, i. e. `fedora-35-x86_64`.
+        """
+        name = os.path.basename(self.base_mock_cfg_path)
+
+        return name[:-len(".cfg")] if name.endswith(".cfg") else name
+
+    def to_dict(self):
+        """
+            Serializes the mock config so it can be sent to a remote build agent.
+
+        Returns:
+            dict: JSON serializable representation of the mock config.
+        """
+        return {
+            "content": dict(self.content),
+            "base_mock_cfg_path": self.base_mock_cfg_path,
+            "tmpfs_size": self.tmpfs_size,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+            Creates a mock config from its serialized representation.
+
+        Args:
+            data (dict): Output of the `to_dict` method.
+
+        Returns:
+            MockConfig: New mock config object.
+        """
+        mock_config = cls(data["base_mock_cfg_path"])
+        mock_config.content = dict(data["content"])
+        mock_config.tmpfs_size = data["tmpfs_size"]
+
+        return mock_config
+
+    def to_string(self):
+        """
+            Renders the mock config file.
+
+        Returns:
+            str: Content of the mock config file.
+        """
+        lines = [f"{key} = {value}\n" for key, value in self.content.items() if key not in POST_INCLUDE_KEYS]
+        lines.append(f"include('{self.base_mock_cfg_path}')\n")
+        lines += [f"{key} = {value}\n" for key, value in self.content.items() if key in POST_INCLUDE_KEYS]
+
+        return "".join(lines)
+
+    def get_digest(self):
+        """
+            Computes a digest of the rendered mock config. The content of the included base
+            config is not part of the digest.
+
+        Returns:
+            str: SHA256 hex digest of the mock config.
+        """
+        return hashlib.sha256(self.to_string().encode()).hexdigest()
+
     def write_config(self, result_dir, component_name):
         """
             Writes mock config to provided directory.
@@ -84,10 +299,7 @@ class MockConfig:
         path = f"{result_dir}/{component_name}_mock.cfg"
 
         with open(path, "w") as f:
-            for key, value in self.content.items():
-                f.write(f"{key} = {value}\n")
-
-            f.write(f"include('{self.base_mock_cfg_path}')")
+            f.write(self.to_string())
 
         logger.info(f"Mock config for '{component_name}' component written to: {path}")
 
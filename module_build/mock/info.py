@@ -20,6 +20,27 @@ class MockBuildInfo():
         else:
             self.srpms.append(MockBuildInfoSRPM(name, path))
 
+    def remove_srpm(self, path):
+        """Removes the SRPM path from the module which uses it.
+
+        Args:
+            path (str, Path): Path to the srpm.
+
+        Returns:
+            str: Name of the module of the srpm. None if the path is not mapped.
+        """
+        path = Path(path)
+
+        for srpm in self.srpms:
+            if path in srpm.paths:
+                srpm.paths.remove(path)
+                if not srpm.paths:
+                    self.srpms.remove(srpm)
+
+                return srpm.name
+
+        return None
+
     def get_srpm_path(self, name, match=""):
         """Wrapped for getting path from MockBuildInfoSRPM based on module name.
 
@@ -0,0 +1,85 @@
+import configparser
+import glob
+import os
+import re
+import subprocess
+
+
+def get_enabled_repos(dnf_conf):
+    """Returns the ids of the enabled repos of a dnf config.
+
+    Args:
+        dnf_conf (str): Content of the dnf config, i. e. the `dnf.conf` option of a mock config.
+
+    Returns:
+        list: Ids of the enabled repos in the order of the config.
+    """
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    parser.read_string(dnf_conf)
+
+    return [r for r in parser.sections() if r != "main" and parser[r].get("enabled", "1").strip() not in ("0", "False", "false")]
+
+
+def download_repos_metadata(dnf_conf, cache_dir, releasever=None, arch=None):
+    """Downloads the metadata of the enabled repos of a dnf config with `dnf makecache`. The
+    metadata are kept in the cache dir, so they are downloaded again only when they expire.
+
+    Args:
+        dnf_conf (str): Content of the dnf config, i. e. the `dnf.conf` option of a mock config.
+        cache_dir (str): Dir where the metadata are stored.
+        releasever (str, optional): Value of the `$releasever` variable of the repos.
+        arch (str, optional): Architecture of the repos.
+
+    Returns:
+        dict: Paths to the repos which contain the `repodata` dir by the ids of the repos.
+            None for the repos whose metadata were not downloaded.
+
+    Raises:
+        RuntimeError: When `dnf makecache` fails.
+    """
+    repos_dir = os.path.join(cache_dir, "repos.d")
+    os.makedirs(repos_dir, exist_ok=True)
+    conf_path = os.path.join(cache_dir, "dnf.conf")
+
+    with open(conf_path, "w") as f:
+        f.write(dnf_conf)
+
+    # only the repos of the config are used, never the repos of the host
+    cmd = [
+        "dnf",
+        "makecache",
+        "-c",
+        conf_path,
+        "--setopt=cachedir={path}".format(path=cache_dir),
+        "--setopt=reposdir={path}".format(path=repos_dir),
+    ]
+
+    if releasever:
+        cmd.append("--releasever={releasever}".format(releasever=releasever))
+
+    if arch:
+        cmd.append("--forcearch={arch}".format(arch=arch))
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    out, _ = proc.communicate()
+
+    if proc.returncode != 0:
+        raise RuntimeError("Command '{cmd}' returned non-zero value {code}\n{out}".format(
+            cmd=cmd, code=proc.returncode, out=out.decode(errors="replace")
+        ))
+
+    repos = {}
+    for repo_id in get_enabled_repos(dnf_conf):
+        # dnf names the dir of a repo by its id and a hash of its url, the newest dir is the
+        # current one when the url of the repo changed
+        repo_dir_re = re.compile(re.escape(repo_id) + r"-[0-9a-f]{16}")
+        repomd_paths = [
+            p
+            for p in glob.glob(os.path.join(glob.escape(cache_dir), "*", "repodata", "repomd.xml"))
+            if repo_dir_re.fullmatch(os.path.basename(os.path.dirname(os.path.dirname(p))))
+        ]
+        repomd_paths.sort(key=os.path.getmtime)
+
+        repos[repo_id] = os.path.dirname(os.path.dirname(repomd_paths[-1])) if repomd_paths else None
+
+    return repos
@@ -0,0 +1,204 @@
+import os
+import shutil
+import threading
+
+from module_build.constants import (AUTO_WORKER_CPUS, AUTO_WORKER_DISK_MB,
+                                    AUTO_WORKER_MEMORY_MB, MOCK_DEFAULT_ROOTDIR,
+                                    TMPFS_MEMORY_RATIO)
+
+
+def get_cpu_count():
+    """Returns the number of CPUs which are usable by the current process.
+
+    Returns:
+        int: Number of usable CPUs.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_available_memory():
+    """Returns the memory which is available for starting new processes.
+
+    Returns:
+        int: Available memory in MB. 0 if it can't be found out.
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+
+    return 0
+
+
+def get_free_space(path):
+    """Returns the free space of the filesystem where the path is or would be created.
+
+    Args:
+        path (str): Path to a directory. The directory does not need to exist.
+
+    Returns:
+        int: Free space in bytes.
+    """
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+
+    return shutil.disk_usage(path).free
+
+
+def get_auto_workers(jobs, rootdirs=None, cpus=None, memory=None):
+    """Selects how many buildroots of a batch should run at the same time.
+
+    Every buildroot needs a share of the CPUs, memory and free disk space of the host. There is
+    never more buildroots than jobs in the batch.
+
+    Args:
+        jobs (int): Number of jobs in the batch.
+        rootdirs (list, optional): Rootdirs where the buildroots are created. Defaults to the
+            default rootdir of mock.
+        cpus (int, optional): Number of usable CPUs. Detected when not set.
+        memory (int, optional): Available memory in MB. Detected when not set.
+
+    Returns:
+        int: Number of workers, at least 1.
+    """
+    cpus = cpus or get_cpu_count()
+    memory = get_available_memory() if memory is None else memory
+    free_space = sum(get_free_space(r) for r in rootdirs or [MOCK_DEFAULT_ROOTDIR]) // (1024 * 1024)
+
+    limits = [jobs, cpus // AUTO_WORKER_CPUS, free_space // AUTO_WORKER_DISK_MB]
+    # the available memory is unknown on hosts without /proc/meminfo
+    if memory:
+        limits.append(memory // AUTO_WORKER_MEMORY_MB)
+
+    return max(1, min(limits))
+
+
+class MockBuildResources:
+    """
+    Object which hands out host resources to the mock buildroots of a build batch.
+
+    The state is shared between the builder and the buildroots. In multiprocess mode the
+    state is stored in `multiprocessing.Manager` proxies so it can be passed to the pool
+    workers.
+    """
+
+    def __init__(self, workers, jobs, cpus=None, memory=None, manager=None):
+        self.workers = workers
+        self.cpus = cpus or get_cpu_count()
+        if memory is None:
+            memory = int(get_available_memory() * TMPFS_MEMORY_RATIO)
+
+        if manager:
+            self._lock = manager.Lock()
+            self._state = manager.dict()
+        else:
+            self._lock = threading.Lock()
+            self._state = {}
+
+        # number of jobs of the batch which did not finish yet (queued and running)
+        self._state["remaining"] = jobs
+        # memory in MB which can be still used by tmpfs buildroots
+        self._state["tmpfs_memory"] = memory
+        # number of running buildroots in each rootdir
+        self._state["rootdirs"] = {}
+
+    def add_job(self):
+        """Adds a job to the jobs which did not finish yet."""
+        with self._lock:
+            self._state["remaining"] += 1
+
+    def get_smp_budget(self):
+        """Computes how many CPUs a buildroot starting right now should use.
+
+        The CPUs are split between the jobs which will run at the same time. As the batch
+        drains the number of concurrent jobs drops and buildroots started later get more
+        CPUs. The last buildroot of a batch gets all of them.
+
+        Returns:
+            int: Number of CPUs for the buildroot.
+        """
+        with self._lock:
+            remaining = self._state["remaining"]
+
+        concurrent = max(1, min(self.workers, remaining))
+
+        return max(1, self.cpus // concurrent)
+
+    def get_smp_macros(self):
+        """Returns the rpm macros which limit the parallelism of a build to its CPU budget.
+
+        Returns:
+            list: Macros in format: MACRO<space>VALUE
+        """
+        ncpus = self.get_smp_budget()
+
+        return [f"%_smp_build_ncpus {ncpus}", f"%_smp_mflags '-j{ncpus}'"]
+
+    def reserve_tmpfs(self, size):
+        """Tries to reserve memory for a tmpfs buildroot.
+
+        Args:
+            size (int): Size of the tmpfs in MB.
+
+        Returns:
+            bool: True if the memory was reserved, False if the buildroot needs to be created
+                on disk.
+        """
+        with self._lock:
+            if self._state["tmpfs_memory"] < size:
+                return False
+
+            self._state["tmpfs_memory"] -= size
+
+        return True
+
+    def acquire_rootdir(self, rootdirs):
+        """Selects the least loaded rootdir for a buildroot starting right now.
+
+        The rootdir with the most free space per running buildroot is selected, so the chroots
+        are spread over all the provided disks.
+
+        Args:
+            rootdirs (list): Paths to the possible rootdirs.
+
+        Returns:
+            str: The selected rootdir. None if no rootdirs were provided.
+        """
+        if not rootdirs:
+            return None
+
+        with self._lock:
+            # manager proxies return a copy of nested containers, so we need to write it back
+            active = self._state["rootdirs"]
+            rootdir = max(rootdirs, key=lambda r: get_free_space(r) / (active.get(r, 0) + 1))
+            active[rootdir] = active.get(rootdir, 0) + 1
+            self._state["rootdirs"] = active
+
+        return rootdir
+
+    def release(self, tmpfs_size=None, rootdir=None):
+        """Marks one job of the batch as finished.
+
+        Args:
+            tmpfs_size (int, optional): Size of the tmpfs in MB reserved by the job.
+            rootdir (str, optional): Rootdir used by the job.
+        """
+        with self._lock:
+            self._state["remaining"] = max(0, self._state["remaining"] - 1)
+
+            if tmpfs_size:
+                self._state["tmpfs_memory"] += tmpfs_size
+
+            if rootdir:
+                active = self._state["rootdirs"]
+                active[rootdir] = max(0, active.get(rootdir, 0) - 1)
+                self._state["rootdirs"] = active
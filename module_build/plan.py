@@ -0,0 +1,60 @@
+import heapq
+
+
+def estimate_batch_makespan(durations, workers):
+    """Estimates how long a batch takes when its components are built by a number of workers.
+
+    The components are scheduled longest first, every component on the worker which is free
+    first. The result is never worse than 4/3 of the optimal schedule of the batch.
+
+    Args:
+        durations (list): Expected build durations of the components in seconds.
+        workers (int): Number of buildroots running at the same time.
+
+    Returns:
+        float: Expected duration of the batch in seconds.
+    """
+    if not durations:
+        return 0.0
+
+    loads = [0.0] * max(1, min(workers, len(durations)))
+
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration)
+
+    return max(loads)
+
+
+def estimate_context(batches, workers):
+    """Finds the critical path and the expected makespan of a build context.
+
+    The batches are built one after another, so the critical path goes through the longest
+    component of every batch. It is the makespan with an unlimited number of workers.
+
+    Args:
+        batches (list): Batches in the buildorder. Every batch is a list of `(name, duration)`
+            tuples of its components.
+        workers (int): Number of buildroots running at the same time.
+
+    Returns:
+        dict: `critical_path` with the names of the components on it, `critical_path_duration`
+            and `makespan` in seconds.
+    """
+    critical_path = []
+    critical_path_duration = 0.0
+    makespan = 0.0
+
+    for components in batches:
+        if not components:
+            continue
+
+        name, duration = max(components, key=lambda c: c[1])
+        critical_path.append(name)
+        critical_path_duration += duration
+        makespan += estimate_batch_makespan([d for _, d in components], workers)
+
+    return {
+        "critical_path": critical_path,
+        "critical_path_duration": critical_path_duration,
+        "makespan": makespan,
+    }
@@ -0,0 +1,358 @@
+import argparse
+import hmac
+import json
+import os
+import shutil
+import threading
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from module_build.builders.mock_builder import MockBuildroot
+from module_build.constants import (MOCK_CONFIG_DIR, REMOTE_AGENT_PORT,
+                                    REMOTE_TOKEN_ENV)
+from module_build.log import init_logging, logger
+from module_build.mock.config import MockConfig, check_content
+from module_build.mock.resources import MockBuildResources
+
+
+class BuildAgent:
+    """
+    Runs `MockBuildroot` jobs submitted by a remote module build and keeps their results until
+    they are downloaded.
+    """
+
+    def __init__(self, workdir, workers, rootdirs=None, mock_cfg_dir=MOCK_CONFIG_DIR):
+        self.states = ["init", "building", "failed", "finished"]
+        self.workdir = workdir
+        self.workers = workers
+        self.rootdirs = rootdirs or []
+        # the jobs can include only the mock configs from this dir
+        self.mock_cfg_dir = mock_cfg_dir
+        self.executor = ThreadPoolExecutor(workers)
+        self.resources = MockBuildResources(workers, 0)
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+    def submit(self, job):
+        """Queues a job for building.
+
+        Args:
+            job (dict): Job description sent by `RemoteBuildPool`.
+
+        Returns:
+            str: ID of the job.
+
+        Raises:
+            ValueError: If the job is not valid.
+        """
+        mock_config = self._load_mock_config(job)
+
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.workdir, job_id)
+        os.makedirs(job_dir)
+
+        with self.lock:
+            self.jobs[job_id] = {
+                "state": self.states[0],
+                "component": job["component"]["name"],
+                "dir": job_dir,
+                "result_dir": None,
+                "files": [],
+                "error": "",
+            }
+
+        self.resources.add_job()
+        self.executor.submit(self._run, job_id, job, mock_config)
+        logger.info(f"Accepted job '{job_id}' for component '{job['component']['name']}'.")
+
+        return job_id
+
+    def get_status(self, job_id):
+        """Returns the state of a job and the list of files in its result dir.
+
+        Args:
+            job_id (str): ID of the job.
+
+        Returns:
+            dict: Job status or None if the job does not exist.
+        """
+        with self.lock:
+            status = self.jobs.get(job_id)
+
+            if not status:
+                return None
+
+            return {k: status[k] for k in ("state", "component", "files", "error")}
+
+    def get_file_path(self, job_id, filename):
+        """Returns the local path of a file from the result dir of a finished job.
+
+        Args:
+            job_id (str): ID of the job.
+            filename (str): Name of the file.
+
+        Returns:
+            str: Path to the file or None if there is no such file.
+        """
+        with self.lock:
+            status = self.jobs.get(job_id)
+
+            if not status or filename not in status["files"]:
+                return None
+
+            return os.path.join(status["result_dir"], filename)
+
+    def remove(self, job_id):
+        """Removes a job and all its files from the agent.
+
+        Args:
+            job_id (str): ID of the job.
+        """
+        with self.lock:
+            status = self.jobs.pop(job_id, None)
+
+        if status:
+            shutil.rmtree(status["dir"], ignore_errors=True)
+
+    def _load_mock_config(self, job):
+        """Creates the mock config of a job. The config may only set the keys which the module
+        build sets and it is based on a mock config of the agent with the same file name.
+
+        Args:
+            job (dict): Job description sent by `RemoteBuildPool`.
+
+        Returns:
+            MockConfig: The mock config of the job.
+
+        Raises:
+            ValueError: If the job or its mock config is not valid.
+        """
+        name = job["component"]["name"]
+        if not name or name in (".", "..") or "/" in name:
+            raise ValueError(f"Invalid component name '{name}'.")
+
+        data = dict(job["mock_cfg"])
+        check_content(data["content"])
+
+        base_name = os.path.basename(data["base_mock_cfg_path"])
+        data["base_mock_cfg_path"] = os.path.join(self.mock_cfg_dir, base_name)
+        if not base_name.endswith(".cfg") or not os.path.isfile(data["base_mock_cfg_path"]):
+            raise ValueError(f"The mock config '{base_name}' does not exist in '{self.mock_cfg_dir}'.")
+
+        return MockConfig.from_dict(data)
+
+    def _run(self, job_id, job, mock_config):
+        status = self.jobs[job_id]
+        status["state"] = self.states[1]
+
+        try:
+            srpm_path = ""
+            if job["srpm"]:
+                srpm_path = os.path.join(status["dir"], job["srpm"].rsplit("/", 1)[-1])
+                with urllib.request.urlopen(job["srpm"]) as response, open(srpm_path, "wb") as f:
+                    shutil.copyfileobj(response, f)
+
+            buildroot = MockBuildroot(
+                job["component"],
+                mock_config,
+                status["dir"],
+                job["batch_num"],
+                job["modularity_label"],
+                job["rpm_suffix"],
+                job["batch_repo"],
+                job["external_repos"],
+                self.rootdirs,
+                srpm_path,
+                resources=self.resources,
+            )
+            status["result_dir"] = buildroot.result_dir_path
+
+            buildroot.run()
+            state = self.states[3]
+        except Exception as e:
+            logger.error(f"Job '{job_id}' for component '{status['component']}' failed: {e}")
+            status["error"] = str(e)
+            state = self.states[2]
+
+        with self.lock:
+            if status["result_dir"]:
+                status["files"] = sorted(os.listdir(status["result_dir"]))
+            status["state"] = state
+
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP interface of the build agent. Every request must have the token of the agent in the
+    `Authorization: Bearer <token>` header.
+
+    - `GET /info` - information about the agent
+    - `POST /jobs` - submits a job, returns its ID
+    - `GET /jobs/<id>` - state of a job and list of its result files
+    - `GET /jobs/<id>/<filename>` - downloads a result file of a job
+    - `DELETE /jobs/<id>` - removes a job and its files from the agent
+    """
+
+    def __init__(self, *args, agent=None, token=None, **kwargs):
+        self.agent = agent
+        self.token = token
+        super().__init__(*args, **kwargs)
+
+    def _authorize(self):
+        """Sends `401 Unauthorized` when the request does not have the token of the agent.
+
+        Returns:
+            bool: True if the request can be handled.
+        """
+        header = self.headers.get("Authorization", "")
+        if self.token and hmac.compare_digest(header.encode(), f"Bearer {self.token}".encode()):
+            return True
+
+        self.send_error(401)
+        return False
+
+    def do_GET(self):
+        if not self._authorize():
+            return
+
+        parts = [p for p in self.path.split("/") if p]
+
+        if parts == ["info"]:
+            self._send_json({"workers": self.agent.workers})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            status = self.agent.get_status(parts[1])
+            if status:
+                self._send_json(status)
+            else:
+                self.send_error(404)
+        elif len(parts) == 3 and parts[0] == "jobs":
+            file_path = self.agent.get_file_path(parts[1], parts[2])
+            if file_path:
+                self._send_file(file_path)
+            else:
+                self.send_error(404)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if not self._authorize():
+            return
+
+        if self.path.rstrip("/") != "/jobs":
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            job_id = self.agent.submit(json.loads(self.rfile.read(length)))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Rejected job: {e}")
+            self.send_error(400, str(e))
+            return
+
+        self._send_json({"id": job_id})
+
+    def do_DELETE(self):
+        if not self._authorize():
+            return
+
+        parts = [p for p in self.path.split("/") if p]
+
+        if len(parts) == 2 and parts[0] == "jobs":
+            self.agent.remove(parts[1])
+            self._send_json({})
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        logger.debug("Agent: " + format % args)
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, file_path):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(file_path)))
+        self.end_headers()
+
+        with open(file_path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+
+def create_agent_server(agent, token, bind="127.0.0.1", port=REMOTE_AGENT_PORT):
+    """Creates the HTTP server of a build agent.
+
+    Args:
+        agent (BuildAgent): The agent which will run the submitted jobs.
+        token (str): Token which the clients must send with every request.
+        bind (str, optional): Address to bind to. Defaults to the loopback interface.
+        port (int, optional): Port to listen on.
+
+    Returns:
+        ThreadingHTTPServer: Server which is ready to `serve_forever`.
+    """
+    if not token:
+        raise ValueError("The build agent requires a token.")
+
+    return ThreadingHTTPServer((bind, port), partial(AgentRequestHandler, agent=agent, token=token))
+
+
+def get_arg_parser():
+    description = """
+        module-build-agent runs mock buildroots for module builds started on other hosts.
+        """
+    parser = argparse.ArgumentParser("module-build-agent", description=description, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("workdir", type=str, help="The working directory where the buildroot results will be stored.")
+    parser.add_argument("-b", "--bind", type=str, default="127.0.0.1", help="Address the agent listens on.")
+    parser.add_argument("-P", "--port", type=int, default=REMOTE_AGENT_PORT, help="Port the agent listens on.")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of buildroots running at the same time.")
+    parser.add_argument(
+        "-c",
+        "--mock-cfg-dir",
+        type=str,
+        default=MOCK_CONFIG_DIR,
+        help="The only directory from which the jobs can include mock configs.",
+    )
+    parser.add_argument("-o", "--no-stdout", action="store_true", help="If set logger output in stdout will not be displayed.")
+    parser.set_defaults(rootdir=[])
+    parser.add_argument("-t", "--rootdir", type=str, action="append", help="Provides a new location for you buildroots. Can be used multiple times.")
+
+    return parser
+
+
+def main():
+    parser = get_arg_parser()
+    args = parser.parse_args()
+
+    token = os.environ.get(REMOTE_TOKEN_ENV)
+    if not token:
+        parser.error(f"The token shared with the module builds must be set in the {REMOTE_TOKEN_ENV} environment variable.")
+
+    workdir = os.path.abspath(args.workdir)
+    os.makedirs(workdir, exist_ok=True)
+    init_logging(workdir, "agent", logger, args.no_stdout)
+
+    agent = BuildAgent(workdir, args.workers, [os.path.abspath(r) for r in args.rootdir], os.path.abspath(args.mock_cfg_dir))
+    server = create_agent_server(agent, token, args.bind, args.port)
+
+    logger.info(f"Build agent with {args.workers} workers listening on {args.bind}:{server.server_address[1]}...")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import urllib.request
+from time import sleep
+
+from module_build.constants import REMOTE_POLL_INTERVAL, REMOTE_TOKEN_ENV
+from module_build.log import bind_build_context, logger
+
+
+class RemoteBuildPool:
+    """
+    Pool which runs the buildroots of a batch on remote build agents. It has the same interface
+    as `MockBuildPool`. The results of each buildroot are downloaded to the local result dir of
+    the component, so the working directory looks the same as after a local build.
+    """
+
+    # seconds between two checks of the state of a remote job
+    poll_interval = REMOTE_POLL_INTERVAL
+
+    def __init__(self, agents, repo_server, on_finished=None, token=None):
+        """
+        Args:
+            agents (list): URLs of the build agents.
+            repo_server (RepoServer): Server which provides the repositories to the agents.
+            on_finished (callable, optional): Called with the artifacts of every successfully
+                built component.
+            token (str, optional): Token of the agents. Defaults to the value of the
+                `MODULE_BUILD_REMOTE_TOKEN` environment variable.
+        """
+        self.token = token or os.environ.get(REMOTE_TOKEN_ENV)
+        if not self.token:
+            raise Exception(f"The token of the remote agents must be set in the {REMOTE_TOKEN_ENV} environment variable.")
+
+        self.repo_server = repo_server
+        self.on_finished = on_finished
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.all_tasks = 0  # number of submitted taks to pool
+        self.finished_tasks = 0  # number of finished tasks
+        self.failed = 0
+        self.artifacts = []
+        self.threads = []
+
+        # every agent gets as many threads as it has workers. Each thread runs one remote job at
+        # a time.
+        for url in agents:
+            url = url.rstrip("/")
+            info = self._request(url + "/info")
+
+            for _ in range(info["workers"]):
+                thread = threading.Thread(target=bind_build_context(self._worker), args=(url,), daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+        logger.info(f"Created remote pool with {len(self.threads)} workers on {len(agents)} agents...")
+
+    def add_job(self, component, mock_cfg, batch_dir_path, batch_num, modularity_label, rpm_suffix, batch_repo, external_repos, rootdir, srpm_path):
+        """Adds job to the queue. The arguments are the same as the ones of `MockBuildroot`."""
+        result_dir_path = os.path.join(batch_dir_path, component["name"])
+        os.makedirs(result_dir_path)
+        mock_cfg.write_config(result_dir_path, component["name"])
+
+        # the rootdirs are decided by the agent
+        job = {
+            "component": component,
+            "mock_cfg": mock_cfg.to_dict(),
+            "batch_num": batch_num,
+            "modularity_label": modularity_label,
+            "rpm_suffix": rpm_suffix,
+            "batch_repo": self.repo_server.url_for(batch_repo),
+            "external_repos": [self.repo_server.url_for(r) for r in external_repos],
+            "srpm": self.repo_server.url_for(srpm_path) if srpm_path else "",
+        }
+
+        with self.lock:
+            self.all_tasks += 1
+
+        self.queue.put((job, result_dir_path))
+
+    def wait(self):
+        """Waits for all tasks in pool to finish"""
+        for _ in self.threads:
+            self.queue.put(None)
+
+        for thread in self.threads:
+            thread.join()
+
+    def _worker(self, url):
+        while True:
+            item = self.queue.get()
+
+            if item is None:
+                break
+
+            job, result_dir_path = item
+            name = job["component"]["name"]
+
+            try:
+                artifacts = self._run_job(url, job, result_dir_path)
+
+                if self.on_finished:
+                    self.on_finished(artifacts)
+            except Exception as e:
+                logger.error(f"Remote build of component '{name}' on agent '{url}' failed: {e}")
+
+                with self.lock:
+                    self.failed += 1
+            else:
+                logger.info(f"Remote build of component '{name}' on agent '{url}' finished successfully!")
+
+                with self.lock:
+                    self.finished_tasks += 1
+                    self.artifacts.extend(artifacts)
+
+            self.update_progress()
+
+    def _run_job(self, url, job, result_dir_path):
+        job_id = self._request(url + "/jobs", job)["id"]
+        job_url = f"{url}/jobs/{job_id}"
+
+        logger.info(f"Component '{job['component']['name']}' is building on agent '{url}' as job '{job_id}'.")
+
+        while True:
+            status = self._request(job_url)
+
+            if status["state"] in ("finished", "failed"):
+                break
+
+            sleep(self.poll_interval)
+
+        # we download the logs of failed jobs as well, so the failure can be investigated locally
+        for filename in status["files"]:
+            request = urllib.request.Request(f"{job_url}/{filename}", headers=self._get_headers())
+            with urllib.request.urlopen(request) as response, open(os.path.join(result_dir_path, filename), "wb") as f:
+                shutil.copyfileobj(response, f)
+
+        self._request(job_url, method="DELETE")
+
+        if status["state"] == "failed":
+            raise RuntimeError(status["error"])
+
+        return [os.path.join(result_dir_path, f) for f in status["files"] if f.endswith("rpm")]
+
+    def _request(self, url, data=None, method=None):
+        body = json.dumps(data).encode() if data is not None else None
+        headers = self._get_headers()
+        headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(url, data=body, method=method, headers=headers)
+
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def _get_headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def update_progress(self):
+        """Logs the current pool information"""
+        with self.lock:
+            queued = self.all_tasks - self.failed - self.finished_tasks
+
+            logger.info(f"Finished/Failed/Queue ({self.finished_tasks}/{self.failed}/{queued})")
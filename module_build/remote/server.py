@@ -0,0 +1,77 @@
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+from module_build.log import logger
+
+
+class RepoRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Request handler which serves files from the exported directories. The path of the URL is the
+    absolute path of the file on the local host.
+    """
+
+    def __init__(self, *args, exported_dirs=(), **kwargs):
+        self.exported_dirs = exported_dirs
+        super().__init__(*args, **kwargs)
+
+    def translate_path(self, path):
+        path = os.path.realpath(unquote(urlsplit(path).path))
+
+        for exported_dir in self.exported_dirs:
+            if path == exported_dir or path.startswith(exported_dir + os.sep):
+                return path
+
+        # an empty path results in `404 Not Found`
+        return ""
+
+    def log_message(self, format, *args):
+        logger.debug("Repo server: " + format % args)
+
+
+class RepoServer:
+    """
+    HTTP server which provides the batch repos, external repos and SRPMs of a module build to
+    the remote build agents.
+    """
+
+    def __init__(self, exported_dirs, address=None):
+        """
+        Args:
+            exported_dirs (list): Directories which can be downloaded from the server.
+            address (str, optional): Address in format HOST[:PORT] under which the agents can
+                reach this host. The server listens only on this address. Defaults to the
+                loopback interface and a random port.
+        """
+        host, _, port = (address or "").partition(":")
+        exported_dirs = [os.path.realpath(d) for d in exported_dirs if d]
+        handler = partial(RepoRequestHandler, exported_dirs=exported_dirs)
+
+        self.host = host or "127.0.0.1"
+        self.httpd = ThreadingHTTPServer((self.host, int(port or 0)), handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        logger.info(f"Serving build repositories for remote agents on: http://{self.host}:{self.port}")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url_for(self, path):
+        """Returns the URL under which a local file or directory is served.
+
+        Args:
+            path (str): Local path. `file://` URLs are accepted as well.
+
+        Returns:
+            str: HTTP URL of the path.
+        """
+        if path.startswith("file://"):
+            path = path[len("file://"):]
+
+        return f"http://{self.host}:{self.port}{quote(os.path.realpath(path))}"
@@ -0,0 +1,157 @@
+import os
+import time
+import traceback
+
+from module_build import cli
+from module_build.cache import get_file_digest
+from module_build.constants import SRPM_EXTENSION, WATCH_INTERVAL
+from module_build.log import logger
+from module_build.stream import ModuleStream
+
+
+class SourceWatcher:
+    """
+    Watches the modulemd file and the SRPMs of a module build for changes. The files are polled
+    for their modification time and size, which works on every filesystem, including network
+    filesystems where inotify does not report changes made by other hosts.
+    """
+
+    def __init__(self, modulemd_path, srpm_dir=None, interval=WATCH_INTERVAL):
+        self.modulemd_path = modulemd_path
+        self.srpm_dir = srpm_dir
+        self.interval = interval
+        self.snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        paths = [self.modulemd_path]
+
+        if self.srpm_dir:
+            paths += [os.path.join(self.srpm_dir, f) for f in os.listdir(self.srpm_dir) if f.endswith(SRPM_EXTENSION)]
+
+        snapshot = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+        return snapshot
+
+    def wait_for_changes(self):
+        """Blocks until some of the watched files are added, changed or removed. The files are
+        reported only after they stopped changing, so a SRPM which is still being copied is not
+        built.
+
+        :return: paths of the added, changed and removed files
+        :rtype: list
+        """
+        while True:
+            time.sleep(self.interval)
+            snapshot = self._take_snapshot()
+
+            if snapshot == self.snapshot:
+                continue
+
+            while True:
+                time.sleep(self.interval)
+                new_snapshot = self._take_snapshot()
+
+                if new_snapshot == snapshot:
+                    break
+                snapshot = new_snapshot
+
+            changed_paths = sorted(p for p in set(snapshot) | set(self.snapshot) if snapshot.get(p) != self.snapshot.get(p))
+            self.snapshot = snapshot
+
+            return changed_paths
+
+
+def get_changed_components(old_stream, new_stream):
+    """Compares the components of two versions of the metadata of a module stream.
+
+    :param old_stream: the module stream before the change
+    :type old_stream: :class:`module_build.stream.ModuleStream`
+    :param new_stream: the module stream after the change
+    :type new_stream: :class:`module_build.stream.ModuleStream`
+    :return: names of the added and changed components. All the components when a component was
+        removed or when only the metadata of the module stream changed.
+    :rtype: list
+    """
+    old_components = {c["name"]: c for c in old_stream.components}
+    new_components = {c["name"]: c for c in new_stream.components}
+
+    changed = [name for name, c in new_components.items() if old_components.get(name) != c]
+
+    if not changed or set(old_components) - set(new_components):
+        return list(new_components)
+
+    return changed
+
+
+def watch(args, mock_builder, module_stream):
+    """Watches the modulemd file and the SRPM dir of a finished build. When they change, the
+    changed components and the components of their later batches are rebuilt by the same builder,
+    so the SRPM mapping, the mock configs and the batch repos of the previous builds are reused.
+    Runs until it is interrupted.
+
+    :param args: parsed command line arguments
+    :type args: :class:`argparse.Namespace`
+    :param mock_builder: the builder of the module stream
+    :type mock_builder: :class:`module_build.builders.mock_builder.MockBuilder` or
+        :class:`module_build.builders.multiarch_builder.MultiArchBuilder`
+    :param module_stream: the built module stream
+    :type module_stream: :class:`module_build.stream.ModuleStream`
+    """
+    watcher = SourceWatcher(args.modulemd, args.srpm_dir)
+    modulemd_digest = get_file_digest(args.modulemd)
+    # the rebuilds update the build of the module stream version
+    args.module_version = module_stream.version
+
+    msg = "Watching '{modulemd}' and the SRPM dir for changes. Press Ctrl+C to stop.".format(modulemd=args.modulemd)
+    logger.info(msg)
+
+    try:
+        while True:
+            changed_paths = watcher.wait_for_changes()
+            components = set()
+
+            if args.modulemd in changed_paths and get_file_digest(args.modulemd) != modulemd_digest:
+                modulemd_digest = get_file_digest(args.modulemd)
+
+                try:
+                    new_stream = cli.load_module_stream(args)
+                except Exception:
+                    logger.error("Loading the changed modulemd file failed:\n" + traceback.format_exc())
+                    continue
+
+                components.update(get_changed_components(module_stream, new_stream))
+                module_stream = new_stream
+
+            srpm_paths = [p for p in changed_paths if p != args.modulemd]
+            if srpm_paths:
+                components.update(mock_builder.update_srpm_mapping(srpm_paths))
+
+            # the SRPMs of other packages can be in the SRPM dir too
+            components = [c["name"] for c in module_stream.components if c["name"] in components]
+
+            if not components:
+                logger.info("No component of the module stream was changed.")
+                continue
+
+            msg = "Rebuilding the changed components: {names}".format(names=", ".join(components))
+            logger.info(msg)
+
+            try:
+                stream = ModuleStream(module_stream.mmd, module_stream.version)
+                mock_builder.build(stream, False, context_to_build=args.module_context, rebuild=components)
+            except Exception:
+                # the build is fixed by the next change
+                logger.error(traceback.format_exc())
+                continue
+
+            mock_builder.final_report()
+            logger.info("The rebuild finished. Watching for changes...")
+    except KeyboardInterrupt:
+        logger.info("Stopped watching for changes.")
@@ -43,6 +43,8 @@ setup(
     entry_points={
         "console_scripts": [
             "module-build = module_build.cli:main",
+            "module-build-agent = module_build.remote.agent:main",
+            "module-build-daemon = module_build.daemon:main",
         ],
     },
 )
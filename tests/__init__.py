@@ -1,4 +1,5 @@
 import os
+import struct
 from unittest.mock import patch
 
 from module_build.metadata import load_modulemd_file_from_path, generate_module_stream_version
@@ -60,6 +61,22 @@ def fake_buildroot_run(self, component_to_fail=None, context=None):
     return "", 0
 
 
+def fake_pool_buildroot_run(self):
+    """ Fake function which represents a succesfull build in the mock buildroot of a pool. It
+    reports the component and its artifacts the same way as `MockBuildroot.run` in pool mode """
+    self.components_callback.append(self.component["name"])
+    fake_buildroot_run(self)
+
+    artifacts = [os.path.join(self.result_dir_path, f) for f in os.listdir(self.result_dir_path) if f.endswith("rpm")]
+    self.artifacts_callback.extend(artifacts)
+
+    return self.component["name"], True
+
+
+# the buildroot is sent to the pool workers as the bound method `run`, which is pickled by name
+fake_pool_buildroot_run.__name__ = "run"
+
+
 def fake_get_artifacts(self, artifacts):
     """ A helper function to create valid NEVRA filenames for inserting in the artifacts section of
     a modulemd file """
@@ -73,14 +90,19 @@ def fake_get_artifacts(self, artifacts):
     return artifacts_nevra
 
 
-def fake_call_createrepo_c_on_dir(self, dir):
-    """Helper function to simulate createrepo_c command execution
+def fake_call_createrepo_c_on_dir(self, dir, intermediate=False, update_md_paths=None, module_index=None):
+    """Helper function to simulate createrepo_c command execution. The modules.yaml file is
+    written to the repodata dir uncompressed.
     """
     if os.path.isdir(dir):
         repo_dir = dir + "/repodata"
         if not os.path.exists(repo_dir):
             os.mkdir(repo_dir)
 
+        if module_index is not None:
+            with open(repo_dir + "/modules.yaml", "w") as f:
+                f.write(module_index.dump_to_string())
+
 
 def assert_modular_dependencies(modular_deps, expected_modular_deps):
     """ A helper method for comparing result and expected modular dependecies of a module stream """
@@ -102,3 +124,24 @@ def assert_modular_dependencies(modular_deps, expected_modular_deps):
         for stream in streams:
             module_stream = "{module}:{stream}".format(module=module, stream=stream)
             assert module_stream in expected_modular_deps
+
+
+def write_rpm(path, string_arrays=None, int_arrays=None):
+    """ Writes a minimal RPM file with an empty signature and the given tags in the main header """
+    index = b""
+    store = b""
+
+    for tag, values in (int_arrays or {}).items():
+        index += struct.pack(">IIII", tag, 4, len(store), len(values))
+        store += struct.pack(">{count}I".format(count=len(values)), *values)
+
+    for tag, values in (string_arrays or {}).items():
+        index += struct.pack(">IIII", tag, 8, len(store), len(values))
+        store += b"".join(v.encode() + b"\x00" for v in values)
+
+    lead = b"\xed\xab\xee\xdb" + b"\x00" * 92
+    signature = b"\x8e\xad\xe8\x01" + b"\x00" * 4 + struct.pack(">II", 0, 0)
+    header = b"\x8e\xad\xe8\x01" + b"\x00" * 4 + struct.pack(">II", len(index) // 16, len(store))
+
+    with open(path, "wb") as f:
+        f.write(lead + signature + header + index + store)
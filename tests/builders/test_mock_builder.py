@@ -1,10 +1,15 @@
 import os
+import threading
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
-from module_build.builders.mock_builder import MockBuilder, MockBuildPool
+from module_build.builders.mock_builder import (MockBuilder, MockBuildPool,
+                                                MockBuildroot)
+from module_build.cache import BuildCache
+from module_build.constants import WORKERS_AUTO
 from module_build.metadata import load_modulemd_file_from_path
+from module_build.mock.config import MockConfig
 from module_build.mock.info import MockBuildInfoSRPM
 from module_build.stream import ModuleStream
 from tests import (assert_modular_dependencies, fake_buildroot_run,
@@ -120,6 +125,43 @@ class TestMockBuilder:
 
         assert expected_num_comps == len(build_batches[0]["components"])
 
+    def test_generate_buildbatches_skip_excluded_arches(self, tmpdir, workers):
+        """ Test that components which are not built for the architecture are left out of the
+        build batches and a batch without any component is skipped """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+        builder = MockBuilder(mock_cfg_path, cwd, [], None, None, workers)
+        builder.arch = "s390x"
+
+        mmd, version = mock_mmdv3_and_version()
+
+        module_stream = ModuleStream(mmd, version)
+
+        orig_batches = builder.generate_build_batches(module_stream.components)
+        first_batch = sorted(orig_batches)[0]
+        second_batch = sorted(orig_batches)[1]
+
+        for component in module_stream.components:
+            # the whole first batch is built only on x86_64
+            if component["buildorder"] == first_batch:
+                component["arches"] = ["x86_64"]
+
+        excluded = orig_batches[second_batch]["components"][0]
+        excluded["arches"] = ["x86_64", "aarch64"]
+        orig_batches[second_batch]["components"][1]["arches"] = ["s390x"]
+
+        build_batches = builder.generate_build_batches(module_stream.components)
+
+        assert first_batch not in build_batches
+        assert len(build_batches) == len(orig_batches) - 1
+        assert sorted(build_batches)[0] == second_batch
+        assert build_batches[second_batch]["modular_batch_deps"] == []
+
+        names = [c["name"] for b in build_batches.values() for c in b["components"]]
+        assert excluded["name"] not in names
+        assert len(names) == len(module_stream.components) - len(orig_batches[first_batch]["components"]) - 1
+
     @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
            return_value={"target_arch": "x86_64", "dist": "fc26"})
     def test_create_build_contexts(self, mock_config, tmpdir, workers):
@@ -317,38 +359,39 @@ class TestMockBuilder:
                     # if the mock.cfg has been created for the current component
                     mock_file_path = comp_dir + "/{name}_mock.cfg".format(name=comp["name"])
                     assert os.path.isfile(mock_file_path)
-                # the last batch does not have a yaml file as there is no other batch that it could
-                # be a modular dependency for
-                if i != 12:
-                    # if the batch yaml file has been correctly created for the current batch
-                    batch_yaml_name_stream = "batch{num}:{num}".format(num=i)
-                    batch_yaml_context = "b{num}".format(num=i)
-                    batch_yaml_file = [f for f in os.listdir(b["dir"]) if f.endswith("yaml")][0]
-                    assert batch_yaml_name_stream in batch_yaml_file
-                    assert batch_yaml_context in batch_yaml_file
-
-                    mmd = load_modulemd_file_from_path(b["dir"] + "/" + batch_yaml_file)
-                    artifacts = mmd.get_rpm_artifacts()
-                    assert len(artifacts) == len(b["finished_builds"])
-
-                    # we check dependencies if they are correct
-                    context_deps = c["modular_deps"]["buildtime"]
-                    batch_deps = b["modular_batch_deps"]
-                    expected_modular_deps = context_deps + batch_deps
-                    modular_deps = mmd.get_dependencies()[0]
-
-                    assert_modular_dependencies(modular_deps, expected_modular_deps)
+                # every batch except the first one depends only on the cumulative batch module
+                if i == min(c["build_batches"]):
+                    assert b["modular_batch_deps"] == []
+                else:
+                    assert b["modular_batch_deps"] == ["batches:cumulative"]
 
                 # count the finished builds for each batch
                 for f in b["finished_builds"]:
                     assert os.path.isfile(f)
 
                 finished_builds_count += len(b["finished_builds"])
+
+            # the cumulative batch module contains all the batches except the last one, as there is
+            # no other batch that it could be a modular dependency for
+            batches_dir = c["dir"] + "/build_batches"
+            assert not [f for f in os.listdir(batches_dir) if f.endswith("yaml")]
+            for b in c["build_batches"].values():
+                assert not [f for f in os.listdir(b["dir"]) if f.endswith("yaml")]
+
+            mmd = load_modulemd_file_from_path(batches_dir + "/repodata/modules.yaml")
+            assert mmd.get_module_name() == "batches"
+            assert mmd.get_stream_name() == "cumulative"
+            assert mmd.get_context() == "b{num}".format(num=max(c["build_batches"]) - 1)
+            last_batch_builds = c["build_batches"][max(c["build_batches"])]["finished_builds"]
+            assert len(mmd.get_rpm_artifacts()) == finished_builds_count - len(last_batch_builds)
+            assert_modular_dependencies(mmd.get_dependencies()[0], c["modular_deps"]["buildtime"])
             # compare if we have the same number of RPMs in the final repo as we have in their
             # respective buid batches. This is only a sanity test. Right now 1 component produces 1
             # RPM file for the sake of the test, in reality one component can produce multiple RPMs.
             final_rpm_count = len([f for f in os.listdir(c["final_repo_path"]) if f.endswith("rpm")])
             assert finished_builds_count == final_rpm_count
+            assert not [f for f in os.listdir(c["final_repo_path"]) if f.endswith("yaml")]
+            assert os.path.isfile(c["final_repo_path"] + "/repodata/modules.yaml")
 
             # we check the final_repo
 
@@ -558,3 +601,451 @@ class TestMockBuilderAsync:
 
                 err_msg = e.value.args[0]
                 assert "Some components failed" in err_msg
+
+
+class TestMockBuilderCache:
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35"})
+    def test_external_repo_profiles_cache(self, mock_config, tmpdir, cache_dir):
+        """ The profiles of an external repo are parsed only once until its repodata change. """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+        repodata = tmpdir.mkdir("repo").mkdir("repodata")
+        repodata.join("repomd.xml").write("<repomd>1</repomd>")
+        repodata.join("1234-modules.yaml.gz").write("")
+        external_repos = [str(tmpdir.join("repo"))]
+        profiles = {
+            "buildroot": {"platform:f26": "platform:f26/buildroot"},
+            "srpm-buildroot": {},
+        }
+
+        mmd, version = mock_mmdv3_and_version()
+        module_stream = ModuleStream(mmd, version)
+
+        with patch.object(MockBuilder, "_load_repo_profiles", return_value=profiles) as load:
+            for _ in range(2):
+                builder = MockBuilder(mock_cfg_path, cwd, external_repos, None, None, 1)
+                builder.create_build_contexts(module_stream)
+
+            assert load.call_count == 1
+            assert builder.build_contexts["f26devel"]["buildroot_profiles"] == ["platform:f26/buildroot"]
+            assert os.listdir(os.path.join(cache_dir, "repo_profiles"))
+
+            repodata.join("repomd.xml").write("<repomd>2</repomd>")
+            builder = MockBuilder(mock_cfg_path, cwd, external_repos, None, None, 1)
+            builder.create_build_contexts(module_stream)
+
+            assert load.call_count == 2
+
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35", "root": "fedora-35-x86_64"})
+    def test_mock_cfg_cache(self, mock_config, tmpdir):
+        """ The mock config is loaded only once until the config or any of its includes change. """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_dir = tmpdir.mkdir("mock")
+        mock_cfg_dir.join("fedora.tpl").write("config_opts['dist'] = 'fc35'\n")
+        mock_cfg_dir.join("fedora-35-x86_64.cfg").write("include('fedora.tpl')\n")
+        mock_cfg_path = str(mock_cfg_dir.join("fedora-35-x86_64.cfg"))
+
+        mmd, version = mock_mmdv3_and_version()
+        module_stream = ModuleStream(mmd, version)
+
+        for _ in range(2):
+            builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 1)
+            builder.create_build_contexts(module_stream)
+
+        assert mock_config.call_count == 1
+        assert builder.arch == "x86_64"
+        assert builder.build_contexts["f26devel"]["rpm_suffix"] == ".module_fc35+f26devel"
+
+        mock_cfg_dir.join("fedora.tpl").write("config_opts['dist'] = 'fc36'\n")
+        builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 1)
+        builder.create_build_contexts(module_stream)
+
+        assert mock_config.call_count == 2
+
+
+class TestMockBuilderPlan:
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35"})
+    def test_create_build_plan(self, mock_config, tmpdir):
+        """ The build plan contains all the batches and is estimated from the recorded durations. """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+        cache = BuildCache()
+        cache.store("durations", "perl:f26:x86_64", {"ref": "f26", "seconds": 3600.0}, persistent=True)
+        cache.store("durations", "perl-Carp:f26:x86_64", {"ref": "f26", "seconds": 60.0}, persistent=True)
+        # the builds of other refs and architectures are not used
+        cache.store("durations", "perl-Carp:master:x86_64", {"ref": "master", "seconds": 10.0}, persistent=True)
+        cache.store("durations", "perl-Test:f26:aarch64", {"ref": "f26", "seconds": 10.0}, persistent=True)
+
+        mmd, version = mock_mmdv3_and_version()
+        module_stream = ModuleStream(mmd, version)
+
+        builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 4)
+        plan = builder.create_build_plan(module_stream, context_to_build="f26devel")
+
+        # nothing is built
+        assert os.listdir(cwd) == []
+
+        assert plan["workers"] == 4
+        assert plan["mock_cfg"]["digest"]
+        assert list(plan["contexts"]) == ["f26devel"]
+
+        context = plan["contexts"]["f26devel"]
+        assert len(context["batches"]) == 12
+        components = [c for b in context["batches"] for c in b["components"]]
+        assert len(components) == 178
+        assert all(c["mock_cfg_digest"] for c in components)
+
+        recorded = {c["name"]: c["duration"] for c in components if c["recorded_duration"]}
+        assert recorded == {"perl": 3600.0, "perl-Carp": 60.0}
+        # the other components are expected to take as long as the average recorded component
+        assert all(c["duration"] == 1830.0 for c in components if not c["recorded_duration"])
+
+        assert "perl" in context["critical_path"]
+        assert context["critical_path_duration"] <= context["makespan"] <= sum(c["duration"] for c in components)
+        assert plan["makespan"] == context["makespan"]
+
+
+class TestMockBuilderDeriveBuildorder:
+    @patch("module_build.builders.mock_builder.get_srpm_buildrequires", return_value={"perl-devel"})
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35"})
+    def test_derive_buildorder_from_repos(self, mock_config, buildrequires, tmpdir):
+        """ On a fresh working directory the provides of the components are taken from their
+        packages in the repos and the components excluded by arch are left out. """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+        mmd, version = mock_mmdv3_and_version()
+        module_stream = ModuleStream(mmd, version)
+        excluded = next(c for c in module_stream.components if c["name"] == "perl-Digest")
+        excluded["arches"] = ["s390x"]
+        names = [c["name"] for c in module_stream.components if c is not excluded]
+
+        builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 1, derive_buildorder=True)
+        builder.mock_info.get_srpm_path = MagicMock(return_value="/srpms/component.src.rpm")
+        # only perl provides what the components require
+        repos_provides = {n: {n} for n in names}
+        repos_provides["perl"].add("perl-devel")
+
+        with patch.object(MockBuilder, "_get_repos_provides", return_value=repos_provides) as get_repos_provides:
+            builder.create_build_contexts(module_stream)
+
+        assert sorted(get_repos_provides.call_args[0][1]) == sorted(names)
+        assert builder.derived_buildorder["buildorder"]["perl"] == 1
+        assert excluded["name"] not in builder.derived_buildorder["buildorder"]
+
+        for name, position in builder.derived_buildorder["buildorder"].items():
+            # the components declared before perl wait for nothing, the others wait only for perl
+            declared = next(c["buildorder"] for c in module_stream.components if c["name"] == name)
+            perl_declared = next(c["buildorder"] for c in module_stream.components if c["name"] == "perl")
+            assert position == (2 if declared > perl_declared else 1)
+
+
+class TestMockBuilderCheckBuildrequires:
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35"})
+    def test_check_fails_without_repos_metadata(self, mock_config, tmpdir):
+        """ The build stops when the metadata of the repos of the mock config can't be downloaded. """
+        pytest.importorskip("solv")
+
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+        mmd, version = mock_mmdv3_and_version()
+        module_stream = ModuleStream(mmd, version)
+
+        builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 1, check_buildrequires=True)
+        builder.create_build_contexts(module_stream)
+
+        with patch.object(MockBuilder, "_get_repos", side_effect=RuntimeError("Cannot download repomd.xml")):
+            with pytest.raises(Exception) as e:
+                builder._precheck_buildrequires(module_stream.version, None)
+
+        assert "can't be checked" in e.value.args[0]
+        assert "Cannot download repomd.xml" in e.value.args[0]
+
+
+class TestMockBuilderAutoWorkers:
+    @patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+    @patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+    @patch("module_build.builders.mock_builder.get_auto_workers", side_effect=lambda jobs, rootdirs: min(jobs, 4))
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35"})
+    def test_auto_workers(self, mock_config, auto_workers, tmpdir):
+        """
+            Tests that the pool is sized for every batch and single component batches are built
+            without a pool.
+        """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+        builder = MockBuilder(mock_cfg_path, cwd, [], None, None, WORKERS_AUTO)
+
+        mmd, version = mock_mmdv3_and_version()
+        module_stream = ModuleStream(mmd, version)
+
+        with patch("module_build.builders.mock_builder.MockBuildroot.run", new=fake_buildroot_run):
+            with patch.object(MockBuilder, "_create_workers_pool", wraps=builder._create_workers_pool) as create_pool:
+                builder.build(module_stream, resume=False, context_to_build="f26devel")
+
+        # 12 batches, 6 of them with more than one component
+        assert auto_workers.call_count == 12
+        assert [c[0][0] for c in create_pool.call_args_list] == [4, 4, 4, 4, 4, 2]
+        assert builder.build_contexts["f26devel"]["status"]["state"] == "finished"
+
+
+class TestMockBuilderFinalRepo:
+    @patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35"})
+    def test_final_repo_filled_by_finished_components(self, mock_config, tmpdir):
+        """
+            Tests that the artifacts are linked into the final repo and their NEVRAs are queried
+            only once, when their component finishes.
+        """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+        builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 1)
+
+        mmd, version = mock_mmdv3_and_version()
+        module_stream = ModuleStream(mmd, version)
+        module_stream.filtered_rpms = ["perl"]
+
+        with patch("module_build.builders.mock_builder.MockBuildroot.run", new=fake_buildroot_run):
+            with patch.object(MockBuilder, "get_artifacts_nevra", autospec=True, side_effect=fake_get_artifacts) as get_nevra:
+                builder.build(module_stream, resume=False, context_to_build="f26devel")
+
+        context = builder.build_contexts["f26devel"]
+        artifacts = [a for b in context["build_batches"].values() for a in b["finished_builds"]]
+
+        assert get_nevra.call_count == len(artifacts)
+
+        final_rpms = os.listdir(context["final_repo_path"])
+        for artifact in artifacts:
+            filename = os.path.basename(artifact)
+
+            if filename.startswith("perl-0:"):
+                assert filename not in final_rpms
+            else:
+                assert os.path.samefile(artifact, os.path.join(context["final_repo_path"], filename))
+
+        mmd = load_modulemd_file_from_path(context["final_yaml_path"])
+        assert len(mmd.get_rpm_artifacts()) == len(artifacts)
+
+
+class TestMockBuilderFinalize:
+    @patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+    @patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35"})
+    def test_finalize_in_background(self, mock_config, tmpdir):
+        """
+            Tests that the next context starts building while the previous one is finalized and
+            the build waits for all finalizations.
+        """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+        builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 1)
+
+        mmd, version = mock_mmdv3_and_version()
+        module_stream = ModuleStream(mmd, version)
+
+        next_context_started = threading.Event()
+        finalize_build_context = builder.finalize_build_context
+
+        def fake_buildroot_run_next_context(self):
+            if self.modularity_label.endswith("f27devel"):
+                next_context_started.set()
+
+            return fake_buildroot_run(self)
+
+        def slow_finalize_build_context(context_name):
+            if context_name == "f26devel":
+                assert next_context_started.wait(10)
+
+            finalize_build_context(context_name)
+
+        with patch("module_build.builders.mock_builder.MockBuildroot.run", new=fake_buildroot_run_next_context):
+            with patch.object(builder, "finalize_build_context", side_effect=slow_finalize_build_context):
+                builder.build(module_stream, resume=False)
+
+        for context in builder.build_contexts.values():
+            assert os.path.isfile(context["dir"] + "/finished")
+
+
+class TestMockBuilderSharedSrpms:
+    @patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+    @patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35"})
+    def test_srpms_built_once_for_all_contexts(self, mock_config, tmpdir):
+        """
+            Tests that the SRPM of every component is built from SCM only once and all the
+            contexts build from it.
+        """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+        builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 1, shared_srpms=True)
+
+        mmd, version = mock_mmdv3_and_version()
+        module_stream = ModuleStream(mmd, version)
+
+        def fake_mock_buildsrpm(cmd, stdout, stderr):
+            result_dir = [a for a in cmd if a.startswith("--resultdir=")][0].split("=", 1)[1]
+            with open(os.path.join(result_dir, "dummy-1.0-1.src.rpm"), "w") as f:
+                f.write("dummy")
+
+            return 0
+
+        srpm_paths = {}
+
+        def fake_buildroot_run_srpm(self):
+            srpm_paths.setdefault(self.component["name"], set()).add(self.srpm_path)
+
+            return fake_buildroot_run(self)
+
+        with patch("module_build.builders.mock_builder.MockBuildroot.run", new=fake_buildroot_run_srpm):
+            with patch("module_build.builders.mock_builder.subprocess.call", side_effect=fake_mock_buildsrpm) as call:
+                builder.build(module_stream, resume=False)
+
+        components = {c["name"] for c in module_stream.components}
+
+        assert call.call_count == len(components)
+        assert all("--buildsrpm" in c[0][0] for c in call.call_args_list)
+        assert set(srpm_paths) == components
+        assert all(len(paths) == 1 for paths in srpm_paths.values())
+
+        for context in builder.build_contexts.values():
+            assert context["status"]["state"] == "finished"
+
+    @patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+    @patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+    @patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+           return_value={"target_arch": "x86_64", "dist": "fc35"})
+    def test_srpms_rebuilt_on_rebuild(self, mock_config, tmpdir):
+        """
+            Tests that the SRPM of a rebuilt component is built again from SCM and the SRPMs
+            of the other components are reused.
+        """
+        cwd = tmpdir.mkdir("workdir").strpath
+        mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+        mmd, version = mock_mmdv3_and_version()
+
+        def fake_mock_buildsrpm(cmd, stdout, stderr):
+            result_dir = [a for a in cmd if a.startswith("--resultdir=")][0].split("=", 1)[1]
+            with open(os.path.join(result_dir, "dummy-1.0-1.src.rpm"), "w") as f:
+                f.write("dummy")
+
+            return 0
+
+        with patch("module_build.builders.mock_builder.MockBuildroot.run", new=fake_buildroot_run):
+            with patch("module_build.builders.mock_builder.subprocess.call", side_effect=fake_mock_buildsrpm):
+                builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 1, shared_srpms=True)
+                builder.build(ModuleStream(mmd, version), resume=False)
+
+            with patch("module_build.builders.mock_builder.subprocess.call", side_effect=fake_mock_buildsrpm) as call:
+                builder.build(ModuleStream(mmd, version), resume=False, rebuild=["perl-Digest"])
+
+        result_dirs = [a.split("=", 1)[1] for c in call.call_args_list for a in c[0][0] if a.startswith("--resultdir=")]
+
+        assert len(result_dirs) == 1
+        assert os.path.basename(result_dirs[0]).startswith("perl-Digest-")
+
+        for context in builder.build_contexts.values():
+            assert context["status"]["state"] == "finished"
+
+
+class TestMockBuildroot:
+    @patch("module_build.builders.mock_builder.subprocess.Popen")
+    def test_rootdir_unique_per_buildroot(self, popen, tmpdir):
+        """
+            Tests that the buildroots of a component built at the same time for other
+            architectures and contexts get their own chroots in the rootdir.
+        """
+        popen.return_value.communicate.return_value = (None, None)
+        popen.return_value.returncode = 0
+        rootdir = tmpdir.mkdir("rootdir").strpath
+
+        buildroots = [
+            ("/etc/mock/fedora-35-x86_64.cfg", "perl:devel:1:f26devel"),
+            ("/etc/mock/fedora-35-aarch64.cfg", "perl:devel:1:f26devel"),
+            ("/etc/mock/fedora-35-x86_64.cfg", "perl:devel:1:f27devel"),
+        ]
+
+        rootdirs = []
+        for index, (mock_cfg_path, label) in enumerate(buildroots):
+            batch_dir = tmpdir.mkdir("batch_{index}".format(index=index)).strpath
+            buildroot = MockBuildroot({"name": "perl"}, MockConfig(mock_cfg_path), batch_dir, 1, label, ".module_fc35",
+                                      "file:///batch_repo", [], [rootdir], "")
+            buildroot.run()
+
+            cmd = popen.call_args[0][0]
+            rootdirs += [a.split("=", 1)[1] for a in cmd if a.startswith("--rootdir=")]
+
+        assert rootdirs == [
+            os.path.join(rootdir, "fedora-35-x86_64-perl-1-f26devel"),
+            os.path.join(rootdir, "fedora-35-aarch64-perl-1-f26devel"),
+            os.path.join(rootdir, "fedora-35-x86_64-perl-1-f27devel"),
+        ]
+
+
+class TestMockBuilderCreaterepo:
+    @pytest.mark.parametrize("intermediate", (False, True))
+    @patch("module_build.builders.mock_builder.subprocess.Popen")
+    def test_createrepo_c_options(self, popen, intermediate, tmpdir):
+        """
+            Tests that only the repos used by the buildroots get the lightweight metadata.
+        """
+        popen.return_value.communicate.return_value = (None, None)
+        popen.return_value.returncode = 0
+
+        builder = MockBuilder("/etc/mock/fedora-35-x86_64.cfg", tmpdir.strpath, [], None, None, 1)
+        builder.call_createrepo_c_on_dir(tmpdir.strpath, intermediate=intermediate)
+
+        cmd = popen.call_args[0][0]
+        assert cmd[:2] == ["createrepo_c", tmpdir.strpath]
+        assert ("--no-database" in cmd) == intermediate
+        assert ("--update" in cmd) == intermediate
+
+    @patch("module_build.builders.mock_builder.subprocess.Popen")
+    def test_createrepo_c_update_md_path(self, popen, tmpdir):
+        """
+            Tests that the metadata of another repo can be reused.
+        """
+        popen.return_value.communicate.return_value = (None, None)
+        popen.return_value.returncode = 0
+
+        builder = MockBuilder("/etc/mock/fedora-35-x86_64.cfg", tmpdir.strpath, [], None, None, 1)
+        builder.call_createrepo_c_on_dir(tmpdir.strpath + "/final_repo", update_md_paths=[tmpdir.strpath + "/build_batches"])
+
+        cmd = popen.call_args[0][0]
+        assert "--update" in cmd
+        assert "--update-md-path={path}/build_batches".format(path=tmpdir.strpath) in cmd
+
+    @patch("module_build.builders.mock_builder.subprocess.Popen")
+    def test_modifyrepo_c_modules(self, popen, tmpdir):
+        """
+            Tests that the module index is added to the repodata after the repo is created.
+        """
+        popen.return_value.communicate.return_value = (None, None)
+        popen.return_value.returncode = 0
+        module_index = MagicMock()
+        module_index.dump_to_string.return_value = "document: modulemd\n"
+
+        builder = MockBuilder("/etc/mock/fedora-35-x86_64.cfg", tmpdir.strpath, [], None, None, 1)
+        builder.call_createrepo_c_on_dir(tmpdir.strpath, module_index=module_index)
+
+        assert popen.call_count == 2
+        cmd = popen.call_args[0][0]
+        assert cmd[0] == "modifyrepo_c"
+        assert "--mdtype=modules" in cmd
+        assert cmd[-2].endswith("/modules.yaml")
+        assert cmd[-1] == tmpdir.strpath + "/repodata"
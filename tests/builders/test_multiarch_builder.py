@@ -0,0 +1,166 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from module_build.builders.mock_builder import MockBuilder
+from module_build.builders.multiarch_builder import MultiArchBuilder
+from module_build.modulemd import Modulemd
+from module_build.stream import ModuleStream
+from tests import (fake_call_createrepo_c_on_dir, fake_get_artifacts,
+                   fake_pool_buildroot_run, mock_mmdv3_and_version)
+
+
+def fake_load_config(config_path, name, *args):
+    return {"target_arch": os.path.basename(name).rsplit("-", 1)[-1].split(".")[0], "dist": "fc35"}
+
+
+def create_mock_cfgs(tmpdir, *arches):
+    mock_cfg_dir = tmpdir.mkdir("mock")
+    mock_cfg_paths = []
+
+    for arch in arches:
+        path = mock_cfg_dir.join(f"fedora-35-{arch}.cfg")
+        path.write(f"config_opts['target_arch'] = '{arch}'\n")
+        mock_cfg_paths.append(str(path))
+
+    return mock_cfg_paths
+
+
+@patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+@patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config", side_effect=fake_load_config)
+def test_build_multiple_arches(mock_config, tmpdir):
+    """ All arches of a context are built by a shared pool, each into its own repos. """
+    cwd = tmpdir.mkdir("workdir").strpath
+    mock_cfg_paths = create_mock_cfgs(tmpdir, "x86_64", "aarch64")
+
+    builder = MultiArchBuilder(mock_cfg_paths, cwd, [], None, None, 2)
+
+    mmd, version = mock_mmdv3_and_version()
+    module_stream = ModuleStream(mmd, version)
+
+    with patch("module_build.builders.mock_builder.MockBuildroot.run", new=fake_pool_buildroot_run):
+        builder.build(module_stream, resume=False, context_to_build="f26devel")
+
+    expected_dirs = {
+        "perl-bootstrap:devel:20210925131649:f26devel:x86_64",
+        "perl-bootstrap:devel:20210925131649:f26devel:aarch64",
+    }
+    assert expected_dirs == {d for d in os.listdir(cwd) if os.path.isdir(os.path.join(cwd, d))}
+
+    for arch_builder in builder.builders:
+        build_context = arch_builder.build_contexts["f26devel"]
+        assert build_context["status"]["state"] == "finished"
+        assert build_context["nsvca"].endswith(arch_builder.arch)
+        assert os.path.isdir(build_context["final_repo_path"])
+        assert os.path.isfile(os.path.join(build_context["dir"], "finished"))
+
+
+@patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+@patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config", side_effect=fake_load_config)
+def test_build_combined_repo(mock_config, tmpdir):
+    """ The final repos of all arches are hardlinked into one combined repo. """
+    cwd = tmpdir.mkdir("workdir").strpath
+    mock_cfg_paths = create_mock_cfgs(tmpdir, "x86_64", "aarch64")
+
+    builder = MultiArchBuilder(mock_cfg_paths, cwd, [], None, None, 2, combined_repo=True)
+
+    mmd, version = mock_mmdv3_and_version()
+    module_stream = ModuleStream(mmd, version)
+
+    with patch("module_build.builders.mock_builder.MockBuildroot.run", new=fake_pool_buildroot_run):
+        builder.build(module_stream, resume=False, context_to_build="f26devel")
+
+    combined_repo_dir = os.path.join(cwd, "combined_repo")
+    combined_files = os.listdir(combined_repo_dir)
+
+    final_rpms = set()
+    for arch_builder in builder.builders:
+        final_repo_dir = arch_builder.build_contexts["f26devel"]["final_repo_path"]
+        final_rpms.update(f for f in os.listdir(final_repo_dir) if f.endswith("rpm"))
+
+    assert final_rpms == {f for f in combined_files if f.endswith("rpm")}
+
+    # the module streams of all arches are merged into one modules.yaml
+    module_index = Modulemd.ModuleIndex.new()
+    module_index.update_from_file(os.path.join(combined_repo_dir, "repodata", "modules.yaml"), True)
+    assert len(module_index.search_streams()) == 2
+    assert not builder.builders[0].combined_repo
+
+
+@patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+@patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config", side_effect=fake_load_config)
+def test_build_shares_resources(mock_config, tmpdir):
+    """ The batches of all arches split one budget of the host resources. """
+    cwd = tmpdir.mkdir("workdir").strpath
+    mock_cfg_paths = create_mock_cfgs(tmpdir, "x86_64", "aarch64")
+
+    builder = MultiArchBuilder(mock_cfg_paths, cwd, [], None, None, 2)
+
+    mmd, version = mock_mmdv3_and_version()
+    module_stream = ModuleStream(mmd, version)
+
+    pools = []
+    create_workers_pool = MockBuilder._create_workers_pool
+
+    def record_workers_pool(self, *args, **kwargs):
+        pools.append(create_workers_pool(self, *args, **kwargs))
+        return pools[-1]
+
+    with patch("module_build.builders.mock_builder.MockBuildroot.run", new=fake_pool_buildroot_run):
+        with patch.object(MockBuilder, "_create_workers_pool", new=record_workers_pool):
+            builder.build(module_stream, resume=False, context_to_build="f26devel")
+
+    assert len(pools) > 2
+    assert all(p.resources is pools[0].resources for p in pools)
+    assert pools[0].resources.workers == 2
+    # the shared pools log their progress under the batch and the context they build
+    assert all(p.shared for p in pools)
+    nsvcas = [b.build_contexts["f26devel"]["nsvca"] for b in builder.builders]
+    assert all(p.name.startswith("batch ") and p.name.split(" of ")[1] in nsvcas for p in pools)
+
+
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config", side_effect=fake_load_config)
+def test_build_same_arch_twice(mock_config, tmpdir):
+    """ Two mock configs can't build the same arch into the same working directory. """
+    cwd = tmpdir.mkdir("workdir").strpath
+    mock_cfg_paths = create_mock_cfgs(tmpdir, "x86_64")
+    other_cfg = tmpdir.mkdir("other").join("fedora-35-x86_64.cfg")
+    other_cfg.write("config_opts['target_arch'] = 'x86_64'\n")
+
+    builder = MultiArchBuilder(mock_cfg_paths + [str(other_cfg)], cwd, [], None, None, 2)
+
+    mmd, version = mock_mmdv3_and_version()
+    module_stream = ModuleStream(mmd, version)
+
+    with pytest.raises(Exception) as e:
+        builder.build(module_stream, resume=False)
+
+    assert "build the same architecture 'x86_64'" in e.value.args[0]
+    assert os.listdir(cwd) == []
+
+
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config", side_effect=fake_load_config)
+def test_build_remote_workers_without_local_pool(mock_config, tmpdir):
+    """ The remote workers build on their own hosts, so no local pool is created for them. """
+    cwd = tmpdir.mkdir("workdir").strpath
+    mock_cfg_paths = create_mock_cfgs(tmpdir, "x86_64", "aarch64")
+
+    builder = MultiArchBuilder(mock_cfg_paths, cwd, [], None, None, 2)
+    for b in builder.builders:
+        b.remote_workers = ["http://127.0.0.1:8710"]
+
+    mmd, version = mock_mmdv3_and_version()
+    module_stream = ModuleStream(mmd, version)
+
+    with patch("module_build.builders.multiarch_builder.Pool") as pool:
+        with patch("module_build.builders.multiarch_builder.Manager") as manager:
+            with patch.object(MockBuilder, "build") as build:
+                builder.build(module_stream, resume=False)
+
+    assert not pool.called
+    assert not manager.called
+    assert build.call_count == 2
+    assert all(b.process_pool is None for b in builder.builders)
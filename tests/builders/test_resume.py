@@ -6,8 +6,8 @@ import pytest
 from module_build.builders.mock_builder import MockBuilder
 from module_build.stream import ModuleStream
 from tests import (fake_buildroot_run, fake_call_createrepo_c_on_dir,
-                   fake_get_artifacts, get_full_data_path,
-                   mock_mmdv3_and_version)
+                   fake_get_artifacts, fake_pool_buildroot_run,
+                   get_full_data_path, mock_mmdv3_and_version)
 
 
 @patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
@@ -219,12 +219,10 @@ def test_resume_module_build_failed_to_create_batch_yaml_file(mock_config, tmpdi
     finished_file_path = batch_2_path + '/finished'
     os.remove(finished_file_path)
 
-    # the version on a batch yaml file is dynamic, so we have to search for it.
-    for file_name in os.listdir(batch_2_path):
-        if file_name.endswith("yaml"):
-            yaml_file_path = batch_2_path + "/" + file_name
+    # the modular metadata of the finished batches are in the repodata of the batch repo
+    yaml_file_path = build_batches_path + "/repodata/modules.yaml"
 
-    assert yaml_file_path
+    assert os.path.isfile(yaml_file_path)
     os.remove(yaml_file_path)
 
     # we run the build again on the same working directory with the resume option on
@@ -248,12 +246,6 @@ def test_resume_module_build_failed_to_create_batch_yaml_file(mock_config, tmpdi
         assert "finished" in context_dir
         assert "final_repo" in context_dir
 
-    # the version on a batch yaml file is dynamic, so we have to search for it.
-    for file_name in os.listdir(batch_2_path):
-        if file_name.endswith("yaml"):
-            yaml_file_path = batch_2_path + "/" + file_name
-
-    assert yaml_file_path
     assert os.path.isfile(yaml_file_path)
     assert os.path.isfile(finished_file_path)
 
@@ -529,3 +521,202 @@ def test_resume_module_build_first_specify_context_and_resume_without(mock_confi
         assert "repodata" in build_batches_dir
         assert "finished" in context_dir
         assert "final_repo" in context_dir
+
+
+@patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+@patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+       return_value={"target_arch": "x86_64", "dist": "fc35"})
+def test_rebuild_components(mock_config, tmpdir):
+    """ We test that only the selected component and the components of the later batches are
+    rebuilt and the artifacts of the other components are reused """
+    cwd = tmpdir.mkdir("workdir").strpath
+    workers = 1
+    rootdir = None
+    srpm_dir = None
+    mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+    external_repos = []
+
+    builder = MockBuilder(mock_cfg_path, cwd, external_repos, rootdir, srpm_dir, workers)
+
+    mmd, version = mock_mmdv3_and_version()
+
+    module_stream = ModuleStream(mmd, version)
+
+    with patch("module_build.builders.mock_builder.MockBuildroot.run",
+               new=fake_buildroot_run):
+        builder.build(module_stream, resume=False)
+
+    built_components = []
+
+    def record_component(self):
+        built_components.append(self.component["name"])
+        return fake_buildroot_run(self)
+
+    builder_rebuild = MockBuilder(mock_cfg_path, cwd, external_repos, rootdir, srpm_dir, workers)
+    with patch("module_build.builders.mock_builder.MockBuildroot.run",
+               new=record_component):
+        builder_rebuild.build(ModuleStream(mmd, version), resume=False, rebuild=["perl-Digest"])
+
+    expected_components = []
+    for build_context in builder_rebuild.build_contexts.values():
+        build_batches = build_context["build_batches"]
+        expected_components.append("perl-Digest")
+        for position in sorted(build_batches):
+            if position > 4:
+                expected_components += [c["name"] for c in build_batches[position]["components"]]
+
+        batch_4 = build_batches[4]
+        assert "perl-Digest" not in batch_4["reused_components"]
+        assert len(batch_4["reused_components"]) == len(batch_4["components"]) - 1
+
+        context_dir = os.listdir(build_context["dir"])
+        assert "finished" in context_dir
+        assert "final_repo" in context_dir
+
+        final_repo_dir = os.listdir(build_context["dir"] + "/final_repo")
+        assert "perl-Digest-0:1.0-1.module_fc35+f26devel.x86_64.rpm" in final_repo_dir
+
+    assert sorted(built_components) == sorted(expected_components)
+
+
+@patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+@patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+       return_value={"target_arch": "x86_64", "dist": "fc35"})
+def test_rebuild_removes_removed_components(mock_config, tmpdir):
+    """ We test that the result dir of a component which was removed from the module stream is
+    deleted, so its artifacts are not in the batch repo or in the final repo """
+    cwd = tmpdir.mkdir("workdir").strpath
+    workers = 1
+    rootdir = None
+    srpm_dir = None
+    mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+    external_repos = []
+
+    mmd, version = mock_mmdv3_and_version()
+
+    with patch("module_build.builders.mock_builder.MockBuildroot.run",
+               new=fake_buildroot_run):
+        builder = MockBuilder(mock_cfg_path, cwd, external_repos, rootdir, srpm_dir, workers)
+        builder.build(ModuleStream(mmd, version), resume=False, context_to_build="f26devel")
+
+        # the component was built by a previous version of the module stream
+        batch_4_dir = builder.build_contexts["f26devel"]["build_batches"][4]["dir"]
+        removed_comp_dir = os.path.join(batch_4_dir, "perl-Removed")
+        os.makedirs(removed_comp_dir)
+        with open(os.path.join(removed_comp_dir, "perl-Removed-0:1.0-1.module_fc35+f26devel.x86_64.rpm"), "w") as f:
+            f.write("dummy")
+
+        builder_rebuild = MockBuilder(mock_cfg_path, cwd, external_repos, rootdir, srpm_dir, workers)
+        builder_rebuild.build(ModuleStream(mmd, version), resume=False, context_to_build="f26devel",
+                              rebuild=["perl-Digest"])
+
+    build_context = builder_rebuild.build_contexts["f26devel"]
+    final_repo_dir = os.listdir(build_context["dir"] + "/final_repo")
+
+    assert not os.path.exists(removed_comp_dir)
+    assert "perl-Removed-0:1.0-1.module_fc35+f26devel.x86_64.rpm" not in final_repo_dir
+    assert "perl-Digest-0:1.0-1.module_fc35+f26devel.x86_64.rpm" in final_repo_dir
+
+
+@patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+@patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+       return_value={"target_arch": "x86_64", "dist": "fc35"})
+def test_rebuild_builds_added_components(mock_config, tmpdir):
+    """ We test that a component which was added to an earlier batch after the previous build is
+    built and the rebuild starts with its batch """
+    cwd = tmpdir.mkdir("workdir").strpath
+    workers = 1
+    rootdir = None
+    srpm_dir = None
+    mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+    external_repos = []
+
+    mmd, version = mock_mmdv3_and_version()
+
+    with patch("module_build.builders.mock_builder.MockBuildroot.run",
+               new=fake_buildroot_run):
+        builder = MockBuilder(mock_cfg_path, cwd, external_repos, rootdir, srpm_dir, workers)
+        builder.build(ModuleStream(mmd, version), resume=False, context_to_build="f26devel")
+
+    # the previous build did not know the component, so it has no result dir
+    build_batches = builder.build_contexts["f26devel"]["build_batches"]
+    first_position = min(build_batches)
+    added_component = build_batches[first_position]["components"][0]["name"]
+    shutil.rmtree(os.path.join(build_batches[first_position]["dir"], added_component))
+
+    built_components = []
+
+    def record_component(self):
+        built_components.append(self.component["name"])
+        return fake_buildroot_run(self)
+
+    builder_rebuild = MockBuilder(mock_cfg_path, cwd, external_repos, rootdir, srpm_dir, workers)
+    with patch("module_build.builders.mock_builder.MockBuildroot.run",
+               new=record_component):
+        builder_rebuild.build(ModuleStream(mmd, version), resume=False, context_to_build="f26devel",
+                              rebuild=["perl-Digest"])
+
+    build_context = builder_rebuild.build_contexts["f26devel"]
+    final_repo_dir = os.listdir(build_context["dir"] + "/final_repo")
+
+    assert built_components[0] == added_component
+    assert "perl-Digest" in built_components
+    assert added_component not in build_context["build_batches"][first_position]["reused_components"]
+    assert "{name}-0:1.0-1.module_fc35+f26devel.x86_64.rpm".format(name=added_component) in final_repo_dir
+
+
+@patch("module_build.builders.mock_builder.MockBuilder.call_createrepo_c_on_dir", new=fake_call_createrepo_c_on_dir)
+@patch("module_build.builders.mock_builder.MockBuilder.get_artifacts_nevra", new=fake_get_artifacts)
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+       return_value={"target_arch": "x86_64", "dist": "fc35"})
+def test_rebuild_components_pool(mock_config, tmpdir):
+    """ We test that the artifacts of the reused components are kept when the batch with the
+    rebuilt component is built in a pool """
+    cwd = tmpdir.mkdir("workdir").strpath
+    workers = 2
+    rootdir = None
+    srpm_dir = None
+    mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+    external_repos = []
+
+    mmd, version = mock_mmdv3_and_version()
+
+    with patch("module_build.builders.mock_builder.MockBuildroot.run",
+               new=fake_pool_buildroot_run):
+        builder = MockBuilder(mock_cfg_path, cwd, external_repos, rootdir, srpm_dir, workers)
+        builder.build(ModuleStream(mmd, version), resume=False, context_to_build="f26devel")
+
+        builder_rebuild = MockBuilder(mock_cfg_path, cwd, external_repos, rootdir, srpm_dir, workers)
+        builder_rebuild.build(ModuleStream(mmd, version), resume=False, context_to_build="f26devel",
+                              rebuild=["perl-Digest"])
+
+    build_context = builder_rebuild.build_contexts["f26devel"]
+    batch_4 = build_context["build_batches"][4]
+    finished_builds = [os.path.basename(a) for a in batch_4["finished_builds"]]
+    final_repo_dir = os.listdir(build_context["dir"] + "/final_repo")
+
+    assert len(finished_builds) == len(batch_4["components"])
+    for component in batch_4["components"]:
+        rpm_filename = "{name}-0:1.0-1.module_fc35+f26devel.x86_64.rpm".format(name=component["name"])
+        assert rpm_filename in finished_builds
+        assert rpm_filename in final_repo_dir
+
+
+@patch("module_build.builders.mock_builder.mockbuild.config.load_config",
+       return_value={"target_arch": "x86_64", "dist": "fc35"})
+def test_rebuild_unknown_component(mock_config, tmpdir):
+    """ We test that the build fails when a component to rebuild is not in the module stream """
+    cwd = tmpdir.mkdir("workdir").strpath
+    mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+    builder = MockBuilder(mock_cfg_path, cwd, [], None, None, 1)
+
+    mmd, version = mock_mmdv3_and_version()
+
+    with pytest.raises(Exception) as e:
+        builder.build(ModuleStream(mmd, version), resume=False, rebuild=["not-a-component"])
+
+    assert "['not-a-component']" in e.value.args[0]
@@ -33,3 +33,12 @@ def create_fake_srpm(request, tmp_path):
             raise Exception(f"Error creating fake srpm: {result.returncode}")
 
     return tmp_dir
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch):
+    """The tests must not read or modify the persistent cache of the user running them."""
+    cache_home = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+
+    return str(cache_home / "module-build")
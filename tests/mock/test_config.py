@@ -1,9 +1,14 @@
 
 import tempfile
 
-from module_build.constants import (KEY_MACROS_PREFIX, KEY_SCM_BRANCH,
-                                    KEY_SCM_ENABLE, KEY_SCM_METHOD,
-                                    KEY_SCM_PACKAGE)
+import pytest
+from module_build.constants import (KEY_DNF_COMMON_OPTS, KEY_MACROS_PREFIX,
+                                    KEY_SCM_BRANCH, KEY_SCM_ENABLE,
+                                    KEY_SCM_METHOD, KEY_SCM_PACKAGE,
+                                    KEY_TMPFS_ENABLE, KEY_TMPFS_MAX_SIZE,
+                                    KEY_YUM_CACHE_ENABLE)
+from module_build.mock.config import (MockConfig, check_content,
+                                      get_config_files)
 
 
 def test_enable_disable_mbs(mock_cfg):
@@ -54,3 +59,75 @@ def test_write_config(mock_cfg):
 
             assert KEY_SCM_ENABLE in lines[0]
             assert "include" in lines[4]
+
+
+def test_enable_disable_tmpfs(mock_cfg):
+    """
+        Test enabling/disabling the tmpfs plugin in mock config.
+    """
+    mock_cfg.enable_tmpfs(2048)
+
+    assert mock_cfg.tmpfs_size == 2048
+    assert mock_cfg.content[KEY_TMPFS_ENABLE] == "True"
+    assert mock_cfg.content[KEY_TMPFS_MAX_SIZE] == "'2048m'"
+
+    mock_cfg.disable_tmpfs()
+
+    assert mock_cfg.tmpfs_size is None
+    assert 0 == len(mock_cfg.content)
+
+
+def test_enable_package_cache(mock_cfg):
+    """
+        Test sharing the dnf cache between buildroots in mock config.
+    """
+    mock_cfg.enable_package_cache()
+
+    assert mock_cfg.content[KEY_YUM_CACHE_ENABLE] == "True"
+
+    # the host-wide cache of mock is used and the keepcache option extends the options of the
+    # base config, so it is set after the base config is included
+    lines = mock_cfg.to_string().splitlines()
+    assert not any("cache_topdir" in line for line in lines)
+    assert lines[-2].startswith("include(")
+    assert lines[-1].startswith(KEY_DNF_COMMON_OPTS) and "keepcache=True" in lines[-1]
+
+    restored = MockConfig.from_dict(mock_cfg.to_dict())
+
+    assert restored.to_string() == mock_cfg.to_string()
+
+
+def test_check_content(mock_cfg):
+    """
+        Test that only the keys and literal values written by MockConfig are accepted from the
+        remote builds.
+    """
+    mock_cfg.enable_mbs("dist", "pkg_name", "branch_name")
+    mock_cfg.enable_modules(["perl:5.30"])
+    mock_cfg.enable_tmpfs(2048)
+    mock_cfg.enable_package_cache()
+    mock_cfg.add_macros(["%_smp_build_ncpus 4", "%_smp_mflags '-j4'"])
+
+    check_content(mock_cfg.content)
+
+    with pytest.raises(ValueError):
+        check_content({"config_opts['chroot_setup_cmd']": "'install evil'"})
+
+    with pytest.raises(ValueError):
+        check_content({KEY_MACROS_PREFIX + "['%_smp_mflags']": "__import__('os').getcwd()"})
+
+
+def test_get_config_files(tmp_path, monkeypatch):
+    """
+        Test that all the included files are part of the mock config.
+    """
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "base.tpl").write_text("config_opts['dist'] = 'fc35'\n")
+    (tmp_path / "fedora.tpl").write_text("include('templates/base.tpl')\n")
+    cfg = tmp_path / "fedora-35-x86_64.cfg"
+    cfg.write_text("config_opts['target_arch'] = 'x86_64'\ninclude('fedora.tpl')\ninclude('templates/base.tpl')\n")
+
+    files = get_config_files(str(cfg))
+
+    assert files == [str(cfg), str(tmp_path / "fedora.tpl"), str(tmp_path / "templates" / "base.tpl")]
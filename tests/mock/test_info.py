@@ -47,3 +47,17 @@ def test_adding_srpm_bad_path(srpms):
 
     err_msg = e.value.args[0]
     assert "Wrong path object" in err_msg
+
+
+def test_removing_srpm():
+    mock_info = MockBuildInfo()
+    mock_info.add_srpm("flatpak", "/tmp/flatpak_0")
+    mock_info.add_srpm("flatpak", "/tmp/flatpak_1")
+    mock_info.add_srpm("gdb", "/tmp/gdb")
+
+    assert mock_info.remove_srpm("/tmp/flatpak_0") == "flatpak"
+    assert mock_info.get_srpm_path("flatpak") == "/tmp/flatpak_1"
+
+    assert mock_info.remove_srpm(Path("/tmp/gdb")) == "gdb"
+    assert mock_info.get_srpm_count() == 1
+    assert mock_info.remove_srpm("/tmp/gdb") is None
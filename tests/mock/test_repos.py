@@ -0,0 +1,66 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from module_build.mock.repos import download_repos_metadata, get_enabled_repos
+
+DNF_CONF = """
+[main]
+keepcache=1
+
+[fedora]
+name=fedora
+metalink=https://mirrors.fedoraproject.org/metalink?repo=fedora-$releasever&arch=$basearch
+
+[fedora-debuginfo]
+name=fedora-debuginfo
+metalink=https://mirrors.fedoraproject.org/metalink?repo=fedora-debug-$releasever&arch=$basearch
+
+[updates-testing]
+name=updates-testing
+enabled=0
+metalink=https://mirrors.fedoraproject.org/metalink?repo=updates-testing-f$releasever&arch=$basearch
+"""
+
+
+def test_get_enabled_repos():
+    """
+        Test that only the enabled repos of the dnf config are used.
+    """
+    assert get_enabled_repos(DNF_CONF) == ["fedora", "fedora-debuginfo"]
+
+
+@patch("module_build.mock.repos.subprocess.Popen")
+def test_download_repos_metadata(popen, tmpdir):
+    """
+        Test that the metadata of every enabled repo are found in the dnf cache.
+    """
+    popen.return_value.communicate.return_value = (b"", None)
+    popen.return_value.returncode = 0
+    cache_dir = tmpdir.mkdir("cache")
+    for repo_dir in ("fedora-0123456789abcdef", "fedora-old-0123456789abcdef", "updates-testing-0123456789abcdef"):
+        cache_dir.mkdir(repo_dir).mkdir("repodata").join("repomd.xml").write("")
+
+    repos = download_repos_metadata(DNF_CONF, cache_dir.strpath, "35", "x86_64")
+
+    assert repos == {"fedora": os.path.join(cache_dir.strpath, "fedora-0123456789abcdef"), "fedora-debuginfo": None}
+
+    cmd = popen.call_args[0][0]
+    assert cmd[:2] == ["dnf", "makecache"]
+    assert "--setopt=cachedir={path}".format(path=cache_dir.strpath) in cmd
+    assert "--releasever=35" in cmd
+    assert "--forcearch=x86_64" in cmd
+
+
+@patch("module_build.mock.repos.subprocess.Popen")
+def test_download_repos_metadata_failed(popen, tmpdir):
+    """
+        Test that a failure of dnf is reported.
+    """
+    popen.return_value.communicate.return_value = (b"Cannot download repomd.xml", None)
+    popen.return_value.returncode = 1
+
+    with pytest.raises(RuntimeError) as e:
+        download_repos_metadata(DNF_CONF, tmpdir.strpath)
+
+    assert "Cannot download repomd.xml" in e.value.args[0]
@@ -0,0 +1,90 @@
+from unittest.mock import patch
+
+import pytest
+from module_build.mock.resources import (MockBuildResources,
+                                         get_auto_workers)
+
+
+@pytest.mark.parametrize("workers, jobs, expected", [(8, 20, 4), (8, 4, 8), (8, 1, 32), (1, 5, 32), (64, 64, 1)])
+def test_smp_budget(workers, jobs, expected):
+    """
+        Test splitting of the CPUs between the concurrently running buildroots.
+    """
+    resources = MockBuildResources(workers, jobs, cpus=32)
+
+    assert resources.get_smp_budget() == expected
+
+
+def test_smp_budget_rebalance():
+    """
+        Test that buildroots started later in a batch get the CPUs of the finished ones.
+    """
+    resources = MockBuildResources(4, 6, cpus=16)
+
+    budgets = []
+    for _ in range(6):
+        budgets.append(resources.get_smp_budget())
+        resources.release()
+
+    assert budgets == [4, 4, 4, 5, 8, 16]
+
+
+def test_smp_macros():
+    """
+        Test the format of the generated rpm macros.
+    """
+    resources = MockBuildResources(2, 2, cpus=8)
+
+    macros = resources.get_smp_macros()
+
+    assert "%_smp_build_ncpus 4" in macros
+    assert "%_smp_mflags '-j4'" in macros
+
+
+def test_tmpfs_admission():
+    """
+        Test that tmpfs buildroots are admitted only while they fit into the memory budget.
+    """
+    resources = MockBuildResources(4, 4, cpus=4, memory=5000)
+
+    assert resources.reserve_tmpfs(2000)
+    assert resources.reserve_tmpfs(2000)
+    assert not resources.reserve_tmpfs(2000)
+
+    resources.release(2000)
+
+    assert resources.reserve_tmpfs(2000)
+
+
+def test_rootdir_striping(tmp_path):
+    """
+        Test that the buildroots are spread over all provided rootdirs.
+    """
+    rootdirs = [str(tmp_path / "disk1"), str(tmp_path / "disk2")]
+    resources = MockBuildResources(4, 4, cpus=4)
+
+    first = resources.acquire_rootdir(rootdirs)
+    second = resources.acquire_rootdir(rootdirs)
+
+    assert {first, second} == set(rootdirs)
+
+    resources.release(rootdir=first)
+
+    assert resources.acquire_rootdir(rootdirs) == first
+    assert resources.acquire_rootdir([]) is None
+
+
+@pytest.mark.parametrize("jobs, cpus, memory, free_gb, expected", [
+    (1, 32, 65536, 500, 1),
+    (100, 32, 65536, 500, 16),
+    (100, 32, 12288, 500, 4),
+    (100, 32, 65536, 24, 3),
+    (100, 32, 0, 500, 16),
+    (100, 1, 65536, 500, 1),
+])
+def test_auto_workers(jobs, cpus, memory, free_gb, expected):
+    """
+        Test that the number of workers is limited by every resource of the host and the batch size.
+    """
+    with patch("module_build.mock.resources.get_free_space", return_value=free_gb * 1024 ** 3):
+        assert get_auto_workers(jobs, ["/rootdir"], cpus=cpus, memory=memory) == expected
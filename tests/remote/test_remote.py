@@ -0,0 +1,224 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+import tests
+from module_build.constants import REMOTE_TOKEN_ENV
+from module_build.mock.config import MockConfig
+from module_build.remote.pool import RemoteBuildPool
+from module_build.remote.server import RepoServer
+from tests import get_full_data_path
+
+TOKEN = "secret"
+
+# runs the CLI of the build agent with the fake buildroot of the tests
+AGENT_CODE = (
+    "import os, sys\n"
+    "from unittest.mock import patch\n"
+    "from module_build.remote.agent import main\n"
+    "from tests import fake_buildroot_run\n"
+    "def run(self):\n"
+    "    return fake_buildroot_run(self, component_to_fail=os.environ.get('FAKE_COMPONENT_TO_FAIL'))\n"
+    "sys.argv[0] = 'module-build-agent'\n"
+    "with patch('module_build.builders.mock_builder.MockBuildroot.run', new=run):\n"
+    "    main()\n"
+)
+
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(proc, port, timeout=10):
+    """ Waits until the agent process listens on its port. """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("The build agent exited with {code}.".format(code=proc.returncode))
+
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+
+    raise RuntimeError("The build agent does not listen on port {port}.".format(port=port))
+
+
+def start_agents(tmp_path, component_to_fail=None):
+    """ Starts two build agent processes on the local host which stand in for remote build hosts. """
+    env = dict(os.environ)
+    env[REMOTE_TOKEN_ENV] = TOKEN
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(tests.__file__)))] + [p for p in [env.get("PYTHONPATH")] if p]
+    )
+    if component_to_fail:
+        env["FAKE_COMPONENT_TO_FAIL"] = component_to_fail
+
+    agents = []
+    for i in range(2):
+        port = get_free_port()
+        cmd = [
+            sys.executable,
+            "-c",
+            AGENT_CODE,
+            str(tmp_path / "agent{i}".format(i=i)),
+            "--port",
+            str(port),
+            "--workers",
+            "2",
+            "--mock-cfg-dir",
+            get_full_data_path("mock_cfg"),
+            "--no-stdout",
+        ]
+        agents.append((subprocess.Popen(cmd, env=env), port))
+
+    try:
+        for proc, port in agents:
+            wait_for_port(proc, port)
+    except Exception:
+        stop_agents(agents)
+        raise
+
+    return agents
+
+
+def stop_agents(agents):
+    for proc, _ in agents:
+        proc.terminate()
+        proc.wait()
+
+
+@pytest.fixture
+def agents(tmp_path):
+    processes = start_agents(tmp_path)
+
+    yield ["http://127.0.0.1:{port}".format(port=port) for _, port in processes]
+
+    stop_agents(processes)
+
+
+@pytest.fixture
+def failing_agents(tmp_path):
+    """ Build agents whose buildroots fail for the `perl` component. """
+    processes = start_agents(tmp_path, component_to_fail="perl")
+
+    yield ["http://127.0.0.1:{port}".format(port=port) for _, port in processes]
+
+    stop_agents(processes)
+
+
+@pytest.fixture
+def repo_server(tmp_path):
+    server = RepoServer([str(tmp_path)], "127.0.0.1")
+    server.start()
+
+    yield server
+
+    server.stop()
+
+
+def add_jobs(pool, workdir, names):
+    mock_cfg = MockConfig(get_full_data_path("mock_cfg/fedora-35-x86_64.cfg"))
+    batch_dir = os.path.join(workdir, "batch_0")
+    os.makedirs(batch_dir, exist_ok=True)
+
+    for name in names:
+        pool.add_job({"name": name}, mock_cfg, batch_dir, 0, "perl:devel:1:ctx", ".module_fc35+ctx", "file://" + workdir, [], [], "")
+
+    return batch_dir
+
+
+@patch.object(RemoteBuildPool, "poll_interval", 0.01)
+def test_remote_pool_build(agents, repo_server, tmp_path):
+    """ We test that the buildroots are run on the agents and their results are downloaded to the
+    local result dirs of the components. """
+    workdir = str(tmp_path / "workdir")
+    names = ["perl", "perl-Test", "perl-Module", "perl-Devel", "perl-Fake"]
+
+    pool = RemoteBuildPool(agents, repo_server, token=TOKEN)
+    assert len(pool.threads) == 4
+
+    batch_dir = add_jobs(pool, workdir, names)
+    pool.wait()
+
+    assert pool.all_tasks == 5
+    assert pool.finished_tasks == 5
+    assert not pool.failed
+    assert len(pool.artifacts) == 5
+
+    for name in names:
+        comp_dir = os.path.join(batch_dir, name)
+        files = os.listdir(comp_dir)
+        assert "finished" in files
+        assert "{name}_mock.cfg".format(name=name) in files
+        assert "{name}-0:1.0-1.module_fc35+ctx.x86_64.rpm".format(name=name) in files
+        assert os.path.join(comp_dir, "{name}-0:1.0-1.module_fc35+ctx.x86_64.rpm".format(name=name)) in pool.artifacts
+
+
+@patch.object(RemoteBuildPool, "poll_interval", 0.01)
+def test_remote_pool_failed_build(failing_agents, repo_server, tmp_path):
+    """ We test that a failed remote buildroot is reported by the pool. """
+    workdir = str(tmp_path / "workdir")
+
+    pool = RemoteBuildPool(failing_agents, repo_server, token=TOKEN)
+    add_jobs(pool, workdir, ["perl", "perl-Test"])
+    pool.wait()
+
+    assert pool.failed == 1
+    assert pool.finished_tasks == 1
+    assert len(pool.artifacts) == 1
+
+
+def test_repo_server_exported_dirs(repo_server, tmp_path):
+    """ We test that only files from the exported directories are served. """
+    file_path = tmp_path / "repodata.xml"
+    file_path.write_text("dummy")
+
+    with urllib.request.urlopen(repo_server.url_for(str(file_path))) as response:
+        assert response.read() == b"dummy"
+
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(repo_server.url_for("/etc/passwd"))
+
+
+def test_agent_requires_token(agents):
+    """ We test that the agent refuses requests without its token. """
+    for headers in ({}, {"Authorization": "Bearer wrong"}):
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(urllib.request.Request(agents[0] + "/info", headers=headers))
+
+        assert e.value.code == 401
+
+    request = urllib.request.Request(agents[0] + "/info", headers={"Authorization": "Bearer " + TOKEN})
+    with urllib.request.urlopen(request) as response:
+        assert json.loads(response.read()) == {"workers": 2}
+
+
+@pytest.mark.parametrize("content, base_path", [
+    ({"config_opts['plugin_conf']['root_cache_enable']": "True"}, "fedora-35-x86_64.cfg"),
+    ({"config_opts['module_enable']": "__import__('os').system('true')"}, "fedora-35-x86_64.cfg"),
+    ({}, "/tmp/fedora-35-x86_64-evil.cfg"),
+])
+def test_agent_rejects_invalid_mock_cfg(agents, content, base_path):
+    """ We test that the agent refuses jobs with mock config keys which the module build does not
+    set, code in the values and base configs which are not in its mock config dir. """
+    mock_cfg = MockConfig(base_path).to_dict()
+    mock_cfg["content"] = content
+    job = {"component": {"name": "perl"}, "mock_cfg": mock_cfg}
+
+    request = urllib.request.Request(agents[0] + "/jobs", data=json.dumps(job).encode(),
+                                     headers={"Authorization": "Bearer " + TOKEN})
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(request)
+
+    assert e.value.code == 400
@@ -0,0 +1,85 @@
+from module_build.buildorder import (RPMTAG_BASENAMES, RPMTAG_DIRINDEXES,
+                                     RPMTAG_DIRNAMES, RPMTAG_PROVIDENAME,
+                                     RPMTAG_REQUIRENAME, derive_buildorder,
+                                     find_relaxed_components,
+                                     get_rpm_provides, get_srpm_buildrequires)
+
+from tests import write_rpm
+
+
+def test_read_srpm_buildrequires(tmpdir):
+    path = tmpdir.join("perl-Carp-1.0-1.src.rpm").strpath
+    write_rpm(path, {RPMTAG_REQUIRENAME: ["perl-devel", "perl(Exporter)", "rpmlib(CompressedFileNames)"]})
+
+    assert get_srpm_buildrequires(path) == {"perl-devel", "perl(Exporter)"}
+
+
+def test_read_rpm_provides(tmpdir):
+    path = tmpdir.join("perl-1.0-1.x86_64.rpm").strpath
+    write_rpm(path, {RPMTAG_PROVIDENAME: ["perl", "perl(strict)"], RPMTAG_BASENAMES: ["perl", "perl.1"],
+                     RPMTAG_DIRNAMES: ["/usr/bin/", "/usr/share/man/man1/"]},
+              {RPMTAG_DIRINDEXES: [0, 1]})
+
+    assert get_rpm_provides(path) == {"perl", "perl(strict)", "/usr/bin/perl", "/usr/share/man/man1/perl.1"}
+
+
+def test_read_invalid_rpm(tmpdir):
+    path = tmpdir.join("dummy.rpm")
+    path.write("dummy")
+
+    assert get_rpm_provides(path.strpath) is None
+    assert get_srpm_buildrequires(tmpdir.join("missing.src.rpm").strpath) is None
+
+
+def test_derive_buildorder():
+    """ We test that the components are built as early as their BuildRequires allow without
+    breaking the declared order """
+    components = [
+        {"name": "perl", "buildorder": 10},
+        {"name": "perl-Carp", "buildorder": 20},
+        {"name": "perl-Exporter", "buildorder": 20},
+        {"name": "perl-Digest", "buildorder": 30},
+        {"name": "perl-Test", "buildorder": 40},
+        {"name": "perl-Bootstrap", "buildorder": 50},
+    ]
+    requires = {
+        "perl": {"gcc"},
+        "perl-Carp": {"perl-devel", "perl(Exporter)"},
+        "perl-Exporter": {"perl-devel"},
+        "perl-Digest": {"perl-devel"},
+        # the requires of the component are unknown
+        "perl-Test": None,
+        # perl-Test is required, but it is declared later
+        "perl-Bootstrap": {"perl(Carp)", "perl(Test)"},
+    }
+    provides = {
+        "perl": {"perl", "perl-devel"},
+        "perl-Carp": {"perl-Carp", "perl(Carp)"},
+        "perl-Exporter": {"perl-Exporter", "perl(Exporter)"},
+        "perl-Digest": {"perl-Digest", "perl(Digest)"},
+    }
+
+    buildorder, dependencies = derive_buildorder(components, requires, provides)
+
+    assert buildorder == {
+        "perl": 1,
+        "perl-Carp": 2,
+        "perl-Exporter": 2,
+        "perl-Digest": 2,
+        "perl-Test": 3,
+        "perl-Bootstrap": 4,
+    }
+    # perl-Exporter is declared in the same batch
+    assert dependencies["perl-Carp"] == ["perl"]
+    # perl-Test was never built, so everything declared after it waits for it
+    assert dependencies["perl-Bootstrap"] == ["perl-Carp", "perl-Test"]
+    assert dependencies["perl-Test"] == ["perl", "perl-Carp", "perl-Exporter", "perl-Digest"]
+
+    relaxed = find_relaxed_components(components, buildorder, dependencies)
+
+    assert relaxed == [
+        {"name": "perl-Digest", "declared_batch": 3, "derived_batch": 2, "waits_for": ["perl"]},
+        {"name": "perl-Test", "declared_batch": 4, "derived_batch": 3,
+         "waits_for": ["perl", "perl-Carp", "perl-Exporter", "perl-Digest"]},
+        {"name": "perl-Bootstrap", "declared_batch": 5, "derived_batch": 4, "waits_for": ["perl-Carp", "perl-Test"]},
+    ]
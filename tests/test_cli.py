@@ -1,9 +1,12 @@
 import os
+import subprocess
+import sys
 from collections import namedtuple
 from unittest.mock import patch
 
 import pytest
 from module_build.cli import get_arg_parser, main
+from module_build.constants import WORKERS_AUTO
 from module_build.stream import ModuleStream
 
 from tests import TestException, get_full_data_path
@@ -27,10 +30,13 @@ def test_debug_option(mock_config, tmpdir):
 
     Args = namedtuple("Args", ["modulemd", "mock_cfg", "debug", "workdir", "resume",
                                "module_name", "module_stream", "module_version",
-                               "add_repo", "rootdir", "module_context", "srpm_dir", "workers", "no_stdout"])
+                               "add_repo", "rootdir", "module_context", "srpm_dir", "workers", "no_stdout",
+                               "tmpfs", "remote_worker", "serve_address", "daemon_socket", "plan",
+                               "combined_repo", "rebuild", "watch", "derive_buildorder",
+                               "check_buildrequires", "shared_srpms"])
 
     args = Args(modulemd=full_path,
-                mock_cfg="/etc/mock/fedora-35-x86_64.cfg",
+                mock_cfg=["/etc/mock/fedora-35-x86_64.cfg"],
                 debug=True,
                 workdir=cwd,
                 resume=False,
@@ -42,7 +48,18 @@ def test_debug_option(mock_config, tmpdir):
                 module_context=None,
                 srpm_dir=None,
                 workers=1,
-                no_stdout=False)
+                no_stdout=False,
+                tmpfs=None,
+                remote_worker=[],
+                serve_address=None,
+                daemon_socket=None,
+                plan=False,
+                combined_repo=False,
+                rebuild=None,
+                watch=False,
+                derive_buildorder=False,
+                check_buildrequires=False,
+                shared_srpms=False)
 
     with patch("module_build.cli.get_arg_parser") as mock_parser:
         mock_parser.return_value.parse_args.return_value = args
@@ -65,10 +82,13 @@ def test_reraise_exception(mock_config, tmpdir):
 
     Args = namedtuple("Args", ["modulemd", "mock_cfg", "debug", "workdir", "resume",
                                "module_name", "module_stream", "module_version",
-                               "add_repo", "rootdir", "module_context", "srpm_dir", "workers", "no_stdout"])
+                               "add_repo", "rootdir", "module_context", "srpm_dir", "workers", "no_stdout",
+                               "tmpfs", "remote_worker", "serve_address", "daemon_socket", "plan",
+                               "combined_repo", "rebuild", "watch", "derive_buildorder",
+                               "check_buildrequires", "shared_srpms"])
 
     args = Args(modulemd=full_path,
-                mock_cfg="/etc/mock/fedora-35-x86_64.cfg",
+                mock_cfg=["/etc/mock/fedora-35-x86_64.cfg"],
                 debug=False,
                 workdir=cwd,
                 resume=False,
@@ -80,7 +100,18 @@ def test_reraise_exception(mock_config, tmpdir):
                 module_context=None,
                 srpm_dir=None,
                 workers=1,
-                no_stdout=False)
+                no_stdout=False,
+                tmpfs=None,
+                remote_worker=[],
+                serve_address=None,
+                daemon_socket=None,
+                plan=False,
+                combined_repo=False,
+                rebuild=None,
+                watch=False,
+                derive_buildorder=False,
+                check_buildrequires=False,
+                shared_srpms=False)
 
     with patch("module_build.cli.get_arg_parser") as mock_parser:
         mock_parser.return_value.parse_args.return_value = args
@@ -104,7 +135,7 @@ def test_convert_relative_paths_to_absolute():
     args = parser.parse_args(input_args)
 
     assert args.modulemd == dir_path + "/relative/path"
-    assert args.mock_cfg == dir_path + "/relative/path"
+    assert args.mock_cfg == [dir_path + "/relative/path"]
     assert type(args.add_repo) is list
     expected_paths = ["/not/relative/path", dir_path + "/relative/path"]
     for p in args.add_repo:
@@ -112,6 +143,34 @@ def test_convert_relative_paths_to_absolute():
     assert args.workdir == dir_path
 
 
+def test_parse_workers():
+    """
+    We test that the number of workers can be selected automatically
+    """
+    parser = get_arg_parser()
+    cli_args = ["-f", "modulemd.yaml", "-c", "mock.cfg", "workdir"]
+
+    assert parser.parse_args(cli_args + ["-w", "4"]).workers == 4
+    assert parser.parse_args(cli_args + ["-w", "auto"]).workers == WORKERS_AUTO
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(cli_args + ["-w", "0"])
+
+
+def test_parse_rebuild():
+    """
+    We test that the components to rebuild are parsed from a comma separated list
+    """
+    parser = get_arg_parser()
+    cli_args = ["-f", "modulemd.yaml", "-c", "mock.cfg", "workdir"]
+
+    assert parser.parse_args(cli_args).rebuild is None
+    assert parser.parse_args(cli_args + ["--rebuild", "perl,perl-Carp,"]).rebuild == ["perl", "perl-Carp"]
+
+    with pytest.raises(SystemExit):
+        parser.parse_args(cli_args + ["--rebuild", ","])
+
+
 def test_choose_context_to_build(tmpdir):
     """
     We test that the builder is called with a specific context
@@ -122,12 +181,15 @@ def test_choose_context_to_build(tmpdir):
 
     Args = namedtuple("Args", ["modulemd", "mock_cfg", "debug", "workdir", "resume",
                                "module_name", "module_stream", "module_version",
-                               "add_repo", "rootdir", "module_context", "srpm_dir", "workers", "no_stdout"])
+                               "add_repo", "rootdir", "module_context", "srpm_dir", "workers", "no_stdout",
+                               "tmpfs", "remote_worker", "serve_address", "daemon_socket", "plan",
+                               "combined_repo", "rebuild", "watch", "derive_buildorder",
+                               "check_buildrequires", "shared_srpms"])
 
     context_to_build = "f26devel"
 
     args = Args(modulemd=full_path,
-                mock_cfg="/etc/mock/fedora-35-x86_64.cfg",
+                mock_cfg=["/etc/mock/fedora-35-x86_64.cfg"],
                 debug=False,
                 workdir=cwd,
                 resume=False,
@@ -139,7 +201,18 @@ def test_choose_context_to_build(tmpdir):
                 module_context=context_to_build,
                 srpm_dir=None,
                 workers=1,
-                no_stdout=False)
+                no_stdout=False,
+                tmpfs=None,
+                remote_worker=[],
+                serve_address=None,
+                daemon_socket=None,
+                plan=False,
+                combined_repo=False,
+                rebuild=None,
+                watch=False,
+                derive_buildorder=False,
+                check_buildrequires=False,
+                shared_srpms=False)
 
     with patch("module_build.cli.get_arg_parser") as mock_parser:
         mock_parser.return_value.parse_args.return_value = args
@@ -154,3 +227,17 @@ def test_choose_context_to_build(tmpdir):
     assert not required_args[1]
     assert "context_to_build" in optional_args
     assert optional_args["context_to_build"] == context_to_build
+
+
+def test_cli_lazy_imports():
+    """ Importing the CLI and printing the help must not load libmodulemd or mock. """
+    code = (
+        "import sys\n"
+        "from module_build.cli import get_arg_parser\n"
+        "get_arg_parser().format_help()\n"
+        "print(' '.join(m for m in ('gi', 'mockbuild', 'module_build.modulemd') if m in sys.modules))\n"
+    )
+
+    result = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, check=True, universal_newlines=True)
+
+    assert not result.stdout.strip()
@@ -0,0 +1,86 @@
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from module_build.builders.mock_builder import MockBuilder
+from module_build.cli import get_arg_parser
+from module_build.daemon import BuildDaemon, submit_build
+from module_build.log import bind_build_context, logger
+
+from tests import get_full_data_path
+
+
+@pytest.fixture
+def build_daemon(tmpdir):
+    daemon = BuildDaemon(tmpdir.join("daemon.sock").strpath, 2)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+
+    yield daemon
+
+    daemon.server.shutdown()
+    thread.join()
+
+
+def get_build_args(tmpdir):
+    cwd = tmpdir.mkdir("workdir").strpath
+    full_path = get_full_data_path("modulemd/flatpak-runtime.yaml")
+    mock_cfg_path = get_full_data_path("mock_cfg/fedora-35-x86_64.cfg")
+
+    return get_arg_parser().parse_args(["-f", full_path, "-c", mock_cfg_path, "-n", "flatpak-runtime", "-s", "devel", "-o", cwd])
+
+
+def test_daemon_shares_cache_and_pool(build_daemon, tmpdir):
+    """ We test that all builds submitted to the daemon share its cache and worker pool. """
+    args = get_build_args(tmpdir)
+
+    with patch.object(MockBuilder, "build", autospec=True) as mock_build:
+        assert submit_build(build_daemon.socket_path, args) == 0
+        assert submit_build(build_daemon.socket_path, args) == 0
+
+    assert mock_build.call_count == 2
+
+    for call in mock_build.call_args_list:
+        builder = call[0][0]
+        assert builder.cache is build_daemon.cache
+        assert builder.process_pool[0] is build_daemon.pool
+        assert builder.process_pool[2] is build_daemon.resources
+        assert builder.workers == 2
+
+
+def test_daemon_build_failure(build_daemon, tmpdir):
+    """ We test that a failed build is reported to the client. """
+    args = get_build_args(tmpdir)
+
+    with patch.object(MockBuilder, "build", side_effect=Exception("Fake Exception Yay!")):
+        assert submit_build(build_daemon.socket_path, args) == 1
+
+
+def test_daemon_socket_permissions(build_daemon):
+    """ We test that only the user of the daemon can connect to its socket. """
+    assert stat.S_IMODE(os.stat(build_daemon.socket_path).st_mode) == 0o600
+
+
+def test_daemon_sends_logs_of_build_threads(build_daemon, tmpdir, capsys):
+    """ We test that the logs of the threads started by a build are sent to its client, but the
+    logs of other threads are not. """
+    args = get_build_args(tmpdir)
+    args.no_stdout = False
+
+    def fake_build(*args, **kwargs):
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(bind_build_context(logger.info), "Logged by a thread of the build").result()
+
+        thread = threading.Thread(target=logger.info, args=("Logged by another thread",))
+        thread.start()
+        thread.join()
+
+    with patch.object(MockBuilder, "build", side_effect=fake_build):
+        assert submit_build(build_daemon.socket_path, args) == 0
+
+    out = capsys.readouterr().out
+    assert "Logged by a thread of the build" in out
+    assert "Logged by another thread" not in out
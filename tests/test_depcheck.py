@@ -0,0 +1,142 @@
+import pytest
+from module_build.buildorder import (RPMTAG_REQUIREFLAGS, RPMTAG_REQUIRENAME,
+                                     RPMTAG_REQUIREVERSION)
+from module_build.depcheck import (RPMSENSE_EQUAL, RPMSENSE_GREATER,
+                                   BuildRequiresResolver, check_batches,
+                                   format_dep, get_repomd_primary_path,
+                                   get_srpm_buildrequires_deps)
+
+from tests import write_rpm
+
+PRIMARY_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://linux.duke.edu/metadata/common" xmlns:rpm="http://linux.duke.edu/metadata/rpm" packages="1">
+<package type="rpm">
+  <name>gcc</name>
+  <arch>x86_64</arch>
+  <version epoch="0" ver="11.2.1" rel="1.fc35"/>
+  <format>
+    <rpm:sourcerpm>gcc-11.2.1-1.fc35.src.rpm</rpm:sourcerpm>
+    <rpm:provides>
+      <rpm:entry name="gcc" flags="EQ" epoch="0" ver="11.2.1" rel="1.fc35"/>
+    </rpm:provides>
+    <file>/usr/bin/gcc</file>
+  </format>
+</package>
+</metadata>
+"""
+
+REPOMD_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<repomd xmlns="http://linux.duke.edu/metadata/repo" xmlns:rpm="http://linux.duke.edu/metadata/rpm">
+  <data type="primary">
+    <location href="repodata/primary.xml"/>
+  </data>
+</repomd>
+"""
+
+
+def create_repo(repo_dir):
+    repodata_dir = repo_dir.mkdir("repodata")
+    repodata_dir.join("repomd.xml").write(REPOMD_XML)
+    repodata_dir.join("primary.xml").write(PRIMARY_XML)
+
+
+def test_read_srpm_buildrequires_deps(tmpdir):
+    path = tmpdir.join("perl-Carp-1.0-1.src.rpm").strpath
+    write_rpm(path,
+              {RPMTAG_REQUIRENAME: ["perl-devel", "gcc", "rpmlib(CompressedFileNames)"],
+               RPMTAG_REQUIREVERSION: ["4:5.34", "", "3.0.4-1"]},
+              {RPMTAG_REQUIREFLAGS: [RPMSENSE_GREATER | RPMSENSE_EQUAL, 0, 0]})
+
+    deps = get_srpm_buildrequires_deps(path)
+
+    assert deps == [("perl-devel", RPMSENSE_GREATER | RPMSENSE_EQUAL, "4:5.34"), ("gcc", 0, "")]
+    assert [format_dep(d) for d in deps] == ["perl-devel >= 4:5.34", "gcc"]
+
+
+def test_repomd_primary_path(tmpdir):
+    repo_dir = tmpdir.mkdir("repo")
+    create_repo(repo_dir)
+
+    assert get_repomd_primary_path(repo_dir.strpath) == repo_dir.strpath + "/repodata/primary.xml"
+    assert get_repomd_primary_path(tmpdir.mkdir("empty").strpath) is None
+
+
+def test_repomd_primary_path_zck(tmpdir):
+    """ dnf caches only the zchunk primary metadata of the repos with zchunk enabled """
+    repo_dir = tmpdir.mkdir("repo")
+    repodata_dir = repo_dir.mkdir("repodata")
+    repodata_dir.join("repomd.xml").write(REPOMD_XML.replace("</repomd>", """  <data type="primary_zck">
+    <location href="repodata/primary.xml.zck"/>
+  </data>
+</repomd>"""))
+    repodata_dir.join("primary.xml.zck").write("")
+
+    assert get_repomd_primary_path(repo_dir.strpath) == repo_dir.strpath + "/repodata/primary.xml.zck"
+
+
+def test_check_batches():
+    """ We test that a BuildRequire must be provided by the repos or an earlier batch """
+    providers = {
+        "gcc": (True, set()),
+        "perl-devel": (False, {"perl"}),
+        "perl(Carp)": (False, {"perl-Carp"}),
+        "perl(Missing)": (False, set()),
+    }
+    requires = {
+        "perl": [("gcc", 0, "")],
+        "perl-Carp": [("perl-devel", 0, ""), ("perl(Missing)", 0, "")],
+        "perl-Exporter": [("perl(Carp)", 0, "")],
+    }
+    batches = [["perl"], ["perl-Carp", "perl-Exporter"]]
+
+    def get_providers(dep):
+        return providers[dep[0]]
+
+    unsatisfiable, unresolved = check_batches(batches, requires, get_providers, {"perl", "perl-Carp", "perl-Exporter"})
+
+    assert unsatisfiable == [
+        "batch 2: perl-Carp requires 'perl(Missing)'",
+        "batch 2: perl-Exporter requires 'perl(Carp)', which is provided only by the later or the same batch"
+        " components ['perl-Carp']",
+    ]
+    assert unresolved == []
+
+    # the provides of perl are unknown, so it can provide anything
+    unsatisfiable, unresolved = check_batches(batches, requires, get_providers, set())
+
+    assert unsatisfiable == []
+    assert unresolved == [
+        "batch 2: perl-Carp requires 'perl(Missing)', which may be provided only by the earlier components ['perl']"
+        " which were not built yet",
+        "batch 2: perl-Exporter requires 'perl(Carp)', which may be provided only by the earlier components ['perl']"
+        " which were not built yet",
+    ]
+
+
+def test_resolver(tmpdir):
+    pytest.importorskip("solv")
+
+    repo_dir = tmpdir.mkdir("repo")
+    create_repo(repo_dir)
+
+    resolver = BuildRequiresResolver("x86_64")
+    assert resolver.add_repo(repo_dir.strpath)
+    resolver.add_component("perl", [])
+
+    assert resolver.get_providers(("gcc", RPMSENSE_GREATER | RPMSENSE_EQUAL, "11")) == (True, set())
+    assert resolver.get_providers(("gcc", RPMSENSE_GREATER, "12")) == (False, set())
+    assert resolver.get_providers(("perl", 0, "")) == (False, {"perl"})
+
+
+def test_resolver_source_provides(tmpdir):
+    """ We test that the provides of the packages in the repos are found by their source packages """
+    pytest.importorskip("solv")
+
+    repo_dir = tmpdir.mkdir("repo")
+    create_repo(repo_dir)
+
+    resolver = BuildRequiresResolver("x86_64")
+    assert resolver.add_repo(repo_dir.strpath)
+    resolver.add_component("gcc", [])
+
+    assert resolver.get_source_provides(["gcc", "perl"]) == {"gcc": {"gcc", "/usr/bin/gcc"}}
@@ -0,0 +1,35 @@
+import pytest
+from module_build.plan import estimate_batch_makespan, estimate_context
+
+
+@pytest.mark.parametrize("durations, workers, expected", [
+    ([], 4, 0),
+    ([10, 20, 30], 1, 60),
+    ([10, 20, 30], 3, 30),
+    ([10, 20, 30], 8, 30),
+    ([30, 20, 20, 10], 2, 40),
+    ([5, 5, 5, 5, 5, 5], 4, 10),
+])
+def test_estimate_batch_makespan(durations, workers, expected):
+    """
+        Test the makespan of a batch for a number of workers.
+    """
+    assert estimate_batch_makespan(durations, workers) == expected
+
+
+def test_estimate_context():
+    """
+        Test that the batches are built one after another and the critical path goes through the
+        longest component of every batch.
+    """
+    batches = [
+        [("a", 10), ("b", 50)],
+        [],
+        [("c", 20), ("d", 20), ("e", 20)],
+    ]
+
+    estimate = estimate_context(batches, 2)
+
+    assert estimate["critical_path"] == ["b", "c"]
+    assert estimate["critical_path_duration"] == 70
+    assert estimate["makespan"] == 50 + 40
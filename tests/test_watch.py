@@ -0,0 +1,51 @@
+import os
+from types import SimpleNamespace
+
+from module_build.watch import SourceWatcher, get_changed_components
+
+
+def test_watcher_reports_changed_files(tmpdir):
+    """ We test that the added, changed and removed SRPMs and the modulemd file are reported """
+    srpm_dir = tmpdir.mkdir("srpms")
+    modulemd = tmpdir.join("module.yaml")
+    modulemd.write("document: modulemd-packager")
+    srpm_dir.join("perl-1.0-1.src.rpm").write("dummy")
+    srpm_dir.join("perl-Carp-1.0-1.src.rpm").write("dummy")
+    srpm_dir.join("notes.txt").write("dummy")
+
+    watcher = SourceWatcher(modulemd.strpath, srpm_dir.strpath, interval=0)
+
+    srpm_dir.join("perl-1.0-1.src.rpm").write("changed")
+    srpm_dir.join("perl-Carp-1.0-1.src.rpm").remove()
+    srpm_dir.join("perl-Digest-1.0-1.src.rpm").write("dummy")
+    srpm_dir.join("notes.txt").write("changed")
+
+    changed_paths = watcher.wait_for_changes()
+
+    assert changed_paths == sorted(os.path.join(srpm_dir.strpath, f) for f in (
+        "perl-1.0-1.src.rpm", "perl-Carp-1.0-1.src.rpm", "perl-Digest-1.0-1.src.rpm"))
+
+    modulemd.write("document: modulemd-packager\nversion: 3")
+
+    assert watcher.wait_for_changes() == [modulemd.strpath]
+
+
+def test_changed_components():
+    """ We test that only the added and changed components are rebuilt when the modulemd file
+    changes """
+    perl = {"name": "perl", "ref": "f35", "buildorder": 1}
+    carp = {"name": "perl-Carp", "ref": "f35", "buildorder": 2}
+
+    old_stream = SimpleNamespace(components=[perl, carp])
+
+    new_stream = SimpleNamespace(components=[perl, dict(carp, ref="main")])
+    assert get_changed_components(old_stream, new_stream) == ["perl-Carp"]
+
+    new_stream = SimpleNamespace(components=[perl, carp, {"name": "perl-Digest", "ref": "f35", "buildorder": 3}])
+    assert get_changed_components(old_stream, new_stream) == ["perl-Digest"]
+
+    # a removed component or a change outside of the components rebuilds everything
+    new_stream = SimpleNamespace(components=[dict(carp, ref="main")])
+    assert get_changed_components(old_stream, new_stream) == ["perl-Carp"]
+
+    assert get_changed_components(old_stream, old_stream) == ["perl", "perl-Carp"]